@@ -1,6 +1,7 @@
 import os
 import time
 import hashlib
+import itertools
 import random
 import subprocess
 from datetime import datetime
@@ -8,25 +9,62 @@ from datetime import datetime
 import uiautomator2 as u2
 
 import cv2
+import numpy as np
 import pyshine as ps
 
 from colorama import Fore, Style
 
+from .action_program import ProgramWriter, final_screen, make_step, screen_fingerprint, swipe_step
+from .anomaly import AnomalyAnalyzer
+from .async_device import AsyncDevice, SyncDevice
+from .device_metadata import for_device
+from .element_table import ElementTable
+from .event_log import EventLog, element_summary
+from .exploration import NoveltyScheduler, parts_signature, structure_parts, structure_signature
+from .hierarchy import parse_hierarchy, is_uninformative
+from .hierarchy_diff import APP_LEFT, IN_PLACE, NEW_SCREEN, NO_OP, OVERLAY, diff_hierarchies
+from .image_hash import HashIndex, phash
+from .list_clustering import covered_mask, find_clusters, mark_operated
+
+
+# operate_element_based_on_type 的操作 -> 回放时的 (操作, 输入文本)
+REPLAY_OPS = {
+    "click": ("click", None), "toggle": ("click", None), "select": ("click", None), "spinner": ("click", None),
+    "set_text": ("set_text", "test_input"), "seek": ("set_text", "50"),
+    "scroll": ("scroll", None), "long_click": ("long_click", None),
+}
 
 
 class AndroidUITraverser:
-    def __init__(self, device_serial=None, output_dir='ui_traversal', test_texts=None,max_depth=5,app_identifier='com.android.settings'):
+    def __init__(self, device_serial=None, output_dir='ui_traversal', test_texts=None,max_depth=5,app_identifier='com.android.settings',
+                 detect_anomalies=True, cluster_sample_size=None, time_budget=None, log_level="info",
+                 console_level="info"):
         """
         初始化 Android UI 遍历器 (基于uiautomator2)
 
         :param device_serial: 设备序列号
         :param output_dir: 输出目录
         :param test_texts: 测试用文本列表
+        :param detect_anomalies: 是否在后台检测黑屏、白屏、卡死与文字遮挡
+        :param cluster_sample_size: 结构相同的列表行每类只探索的行数，None表示不聚类
+        :param time_budget: 时间预算(秒)，设置后按新颖度优先探索并在到时后停止
+        :param log_level: 写入 output_dir/events.jsonl 的事件级别
+        :param console_level: 控制台输出的事件级别，None表示不输出
         """
         self.d = u2.connect(device_serial) if device_serial else u2.connect()
+        self.device = SyncDevice(AsyncDevice(self.d))  # 并发读取截图/UI树/当前应用，操作仍按顺序执行
+        self.xpath_accepts_source = True
         self.output_dir = output_dir
-        self.visited_hashes = set()  # 记录已访问的页面哈希
-        self.screen_width, self.screen_height = self.d.window_size()
+        self.visited_hashes = set()  # 已访问页面的UI树哈希
+        self.screen_hash_index = HashIndex(max_distance=6)  # 已访问的WebView/画布页面的感知哈希索引
+        self.last_hierarchy = None
+        self.snapshot_table = None  # 最近一次枚举元素时UI树的列式元素表，用于遮挡判断与坐标命中
+        self.last_capture = None  # 最近一次枚举元素时读取的 (当前应用, UI树, 截图)，作为第一个元素操作前的状态
+        self.cluster_sample_size = cluster_sample_size
+        self.cluster_explored = {}  # (页面签名, 列表行模板) -> 已操作的代表行数
+        self.list_clusters = []
+        self.cluster_covered_count = 0
+        self.device_meta = for_device(self.d)  # 屏幕尺寸、SDK版本、应用索引等静态信息
         self.test_texts = test_texts or ["测试", "hello", "123", "自动化"]
         self.visited_elements=set()
         self.all_unique_elememts=[]
@@ -39,24 +77,77 @@ class AndroidUITraverser:
         self.max_depth = max_depth  # 最大递归深度
         self.interaction_delay = 1.5
         os.makedirs(self.output_dir, exist_ok=True)
+        self.events = EventLog(self.output_dir, level=log_level, console_level=console_level)
+        self.anomaly_analyzer = AnomalyAnalyzer(self.output_dir) if detect_anomalies else None
+        self.snapshot_seq = 0  # 截图顺序号，异常检测按它恢复帧序
+        self.artifact_numbers = itertools.count(1)  # 输出文件序号，同一秒内的后台写入不会互相覆盖
+        self.input_since_snapshot = False  # 上次截图后是否执行过点击、滑动等输入
+        self.scheduler = NoveltyScheduler(time_budget) if time_budget else None
+        self.programs = ProgramWriter(self.output_dir)  # 发现新页面的操作路径，可由 ReplayEngine 回放
+        self.action_path = []  # 从应用启动到当前页面的回放步骤
+
+    @property
+    def screen_width(self):
+        return self.device_meta.width
+
+    @property
+    def screen_height(self):
+        return self.device_meta.height
 
     def get_screen_size(self):
         """获取屏幕尺寸"""
-        return self.d.window_size()
+        return self.device_meta.size
 
-    def get_window_hash(self):
-        """获取当前窗口的哈希值"""
-        screenshot = self.d.screenshot()
-        return hashlib.md5(screenshot.tobytes()).hexdigest()
+    def screen_key(self, hierarchy, screenshot=None):
+        """
+        页面标识，返回 (是否为感知哈希, 哈希)
+        UI树可区分页面时为UI树的md5；WebView、画布、视频等页面为截图的感知哈希，按汉明距离近似查重
+        """
+        if self.is_hierarchy_uninformative(hierarchy):
+            if screenshot is None:
+                screenshot = self.device.screenshot()
+            return True, phash(screenshot)
+        return False, hashlib.md5(hierarchy.encode('utf-8')).hexdigest()
+
+    def get_window_hash(self, screenshot=None, hierarchy=None):
+        """登记当前页面为已访问并返回其哈希"""
+        if hierarchy is None:
+            hierarchy = self.d.dump_hierarchy()
+        perceptual, key = self.screen_key(hierarchy, screenshot)
+        if perceptual:
+            return "phash:" + self.screen_hash_index.lookup_or_add(key)
+        self.visited_hashes.add(key)
+        return key
+
+    def is_screen_visited(self, hierarchy, screenshot=None):
+        """页面是否已探索过，感知哈希与已访问画面的汉明距离不超过阈值时视为同一页面"""
+        perceptual, key = self.screen_key(hierarchy, screenshot)
+        if perceptual:
+            nearest, distance = self.screen_hash_index.nearest(key)
+            return nearest is not None and distance <= self.screen_hash_index.max_distance
+        return key in self.visited_hashes
+
+    def is_hierarchy_uninformative(self, hierarchy=None):
+        """UI树中可用于区分页面的信息是否不足"""
+        try:
+            nodes = parse_hierarchy(hierarchy if hierarchy is not None else self.d.dump_hierarchy())
+        except Exception as e:
+            self.events.error(stage="parse_hierarchy", message=str(e))
+            return True
+        return is_uninformative(nodes, self.screen_width, self.screen_height)
     def get_current_window(self):
         """获取当前窗口信息"""
         try:
             # 获取当前活动窗口的包名和活动名
-            current = self.d.info['currentPackageName'] + '/' + self.d.app_current().get('activity', 'unknown')
-            return current
+            return self.window_of(self.d.app_current())
         except:
             return "unknown_window"
 
+    @staticmethod
+    def window_of(app):
+        """app_current() 的结果 -> 包名/活动名"""
+        return app['package'] + '/' + app.get('activity', 'unknown')
+
     def is_same_window(self,expect_window):
         """检查是否仍在同一窗口"""
         new_window = self.get_current_window()
@@ -67,35 +158,43 @@ class AndroidUITraverser:
 
     def save_ui_tree(self, prefix=''):
         """保存当前UI树到txt文件"""
-        timestamp = int(time.time())
-        filename = f"{prefix}_ui_tree_{timestamp}.txt"
-        filepath = os.path.join(self.output_dir, filename)
+        filepath = self.artifact_path(prefix, "ui_tree", "txt")
 
+        hierarchy = self.d.dump_hierarchy()
         with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(self.d.dump_hierarchy())
+            f.write(hierarchy)
+        self.record_hierarchy(hierarchy)
         return filepath
 
+    def record_hierarchy(self, hierarchy):
+        """以最近一次UI树更新设备旋转状态"""
+        self.device_meta.observe_hierarchy(hierarchy)
+        self.last_hierarchy = hierarchy
+
     def take_screenshot(self, prefix=''):
         """截图并返回文件路径"""
-        timestamp = int(time.time())
-        filename = f"{prefix}_screenshot_{timestamp}.png"
-        filepath = os.path.join(self.output_dir, filename)
+        filepath = self.artifact_path(prefix, "screenshot", "png")
         self.d.screenshot(filepath)
         return filepath
 
+    def artifact_path(self, prefix, kind, extension, number=None):
+        """输出文件路径: 时间戳便于人工查看，序号保证唯一"""
+        if number is None:
+            number = next(self.artifact_numbers)
+        return os.path.join(self.output_dir, f"{prefix}_{kind}_{int(time.time())}_{number:05d}.{extension}")
+
     def get_operable_elements(self):
         """获取当前页面所有可操作元素"""
         elements = []
         # 使用XPath获取所有可点击元素
         for element in self.d(classNameMatches=".*"):
             try:
-                info = element.info
-                print(info)
+                self.events.debug("element", element=lambda: element_summary(element.info))
                 elements.append(element)
             except Exception as e:
-                print(f"Error processing element: {str(e)}")
+                self.events.error(stage="get_operable_elements", message=str(e))
             continue
-        print(f'element size : {len(elements)}')
+        self.events.debug("elements", count=len(elements))
         return elements
 
     def get_input_fields(self):
@@ -120,13 +219,20 @@ class AndroidUITraverser:
         else:
             # 通过应用名启动
             try:
-                # 先获取所有应用
-                apps = self.d.app_list()
-                for app in apps:
-                    if app_identifier.lower() in app['name'].lower():
-                        self.d.app_start(app['package'])
-                        print(f"通过应用名启动: {app_identifier} (包名: {app['package']})")
-                        return True
+                package = self.device_meta.find_package(app_identifier)
+                if package:
+                    try:
+                        self.d.app_start(package)
+                    except Exception:
+                        # 缓存的包名可能已被卸载或换了包名重装，重建应用索引后重试一次
+                        self.device_meta.on_package_installed()
+                        refreshed = self.device_meta.find_package(app_identifier)
+                        if not refreshed or refreshed == package:
+                            raise
+                        package = refreshed
+                        self.d.app_start(package)
+                    print(f"通过应用名启动: {app_identifier} (包名: {package})")
+                    return True
                 print(f"未找到应用: {app_identifier}")
                 return False
             except Exception as e:
@@ -159,7 +265,7 @@ class AndroidUITraverser:
             return "点击搜索按钮"
 
         # 尝试按回车键
-        self.d.press('enter')
+        self.device.press('enter')
         time.sleep(2)
         return "按回车键搜索"
 
@@ -169,16 +275,16 @@ class AndroidUITraverser:
         distance_px = int(min(self.screen_width, self.screen_height) * distance)
 
         if direction == 'up':
-            self.d.swipe(center_x, center_y + distance_px // 2,
+            self.device.swipe(center_x, center_y + distance_px // 2,
                          center_x, center_y - distance_px // 2)
         elif direction == 'down':
-            self.d.swipe(center_x, center_y - distance_px // 2,
+            self.device.swipe(center_x, center_y - distance_px // 2,
                          center_x, center_y + distance_px // 2)
         elif direction == 'left':
-            self.d.swipe(center_x + distance_px // 2, center_y,
+            self.device.swipe(center_x + distance_px // 2, center_y,
                          center_x - distance_px // 2, center_y)
         elif direction == 'right':
-            self.d.swipe(center_x - distance_px // 2, center_y,
+            self.device.swipe(center_x - distance_px // 2, center_y,
                          center_x + distance_px // 2, center_y)
 
         time.sleep(1)
@@ -188,19 +294,77 @@ class AndroidUITraverser:
         """在随机位置执行触摸操作"""
         x = random.randint(100, self.screen_width - 100)
         y = random.randint(100, self.screen_height - 100)
-        self.d.click(x, y)
+        index = self.element_at(x, y)
+        self.events.debug("random_touch", x=x, y=y,
+                          text=lambda: self.snapshot_table.texts([index])[0] if index >= 0 else None)
+        self.device.click(x, y)
         time.sleep(1)
         return f"触摸: ({x}, {y})"
 
-    def dump_current_state(self, prefix=''):
-        """记录当前状态: 截图 + 保存UI树"""
-        window_hash = self.get_window_hash()
-        screenshot_path = self.take_screenshot(prefix)
-        ui_tree_path = self.save_ui_tree(prefix)
-        self.visited_hashes.add(window_hash)
-        print(f"状态记录: {screenshot_path}, {ui_tree_path}")
+    def dump_current_state(self, prefix='', capture=None):
+        """
+        记录当前状态: 截图 + 保存UI树
+        截图、UI树与当前应用并发读取，文件在后台写出，写完后再交给异常检测
+
+        :param capture: 已读取的 (截图, UI树, 当前应用)，None时重新读取
+        """
+        screenshot, hierarchy, app = capture or self.device.capture()
+        number = next(self.artifact_numbers)
+        screenshot_path = self.artifact_path(prefix, "screenshot", "png", number)
+        ui_tree_path = self.artifact_path(prefix, "ui_tree", "txt", number)
+        written = self.device.background(self.write_artifacts, screenshot, screenshot_path, hierarchy, ui_tree_path)
+        written.add_done_callback(self.log_background_failure("write_artifacts"))
+        self.snapshot_seq += 1
+        seq, after_input = self.snapshot_seq, self.input_since_snapshot
+        self.input_since_snapshot = False
+        if self.anomaly_analyzer:
+            def analyze(future):
+                # 文件写完的顺序不一定是截图顺序，由序号恢复；写入失败的帧不参与检测
+                if future.exception() is None:
+                    self.anomaly_analyzer.submit(screenshot_path, ui_tree_path, prefix, seq=seq, after_input=after_input)
+                else:
+                    self.anomaly_analyzer.discard(seq)
+            written.add_done_callback(analyze)
+
+        window_hash = self.get_window_hash(screenshot, hierarchy)
+        self.record_hierarchy(hierarchy)
+        self.events.snapshot(screenshot=screenshot_path, hierarchy=ui_tree_path, window_hash=window_hash)
         return screenshot_path, ui_tree_path
 
+    def log_background_failure(self, stage):
+        """返回记录后台任务异常的done回调"""
+        def check(future):
+            if not future.cancelled() and future.exception() is not None:
+                self.events.error(stage=stage, message=str(future.exception()))
+        return check
+
+    @staticmethod
+    def write_artifacts(screenshot, screenshot_path, hierarchy, ui_tree_path):
+        screenshot.save(screenshot_path)
+        with open(ui_tree_path, 'w', encoding='utf-8') as f:
+            f.write(hierarchy)
+
+    def close(self):
+        """结束遍历，等待后台写完文件与检测结果"""
+        self.device.close()
+        if self.anomaly_analyzer:
+            self.anomaly_analyzer.close()
+        if self.scheduler:
+            self.print_coverage_summary()
+        self.events.close()
+
+    def budget_exhausted(self):
+        return self.scheduler is not None and self.scheduler.expired()
+
+    def print_coverage_summary(self):
+        summary = self.scheduler.summary()
+        self.print_with_color(f"覆盖统计: 用时 {summary['elapsed_seconds']}s"
+                              f"{' (时间预算耗尽)' if summary['stopped_by_budget'] else ''}, "
+                              f"页面 {summary['screens']} 个 ({summary['screens_per_minute']}/分钟), "
+                              f"操作元素 {summary['operated_elements']} 个, "
+                              f"resource-id {summary['resource_ids']} 个, 控件类型 {summary['classes']} 种, "
+                              f"操作效果 {summary['effects']}", "cyan")
+
     def handle_input_fields(self, prefix):
         """处理当前页面的输入字段"""
         input_fields = self.get_input_fields()
@@ -217,12 +381,12 @@ class AndroidUITraverser:
                     # 执行输入
                     input_desc = self.perform_text_input(field, text)
                     actions.append(input_desc)
-                    print(input_desc)
+                    self.events.action(op="input", text=text)
 
                     # 尝试执行搜索
                     search_desc = self.perform_search()
                     actions.append(search_desc)
-                    print(search_desc)
+                    self.events.action(op="search", result=search_desc)
                     # 输入后记录状态
                     #self.dump_current_state(f'{prefix}_post_input_{text}')
 
@@ -230,7 +394,7 @@ class AndroidUITraverser:
                     time.sleep(2)
 
                 except Exception as e:
-                    print(f"输入操作失败: {str(e)}")
+                    self.events.error(stage="input", message=str(e))
                     continue
         return actions
 
@@ -242,66 +406,67 @@ class AndroidUITraverser:
 
 
     def operate_element_based_on_type(self, element):
-        """根据元素类型执行相应操作"""
+        """根据元素类型执行相应操作，返回执行的操作名，未操作时返回None"""
         element_info = element.info
 
         try:
             class_name = element_info['className']
-
-
-            print(f"操作元素: {element_info},")
+            operation = None
 
             # 按钮类元素
             if class_name in ['android.widget.Button', 'android.widget.ImageButton']:
+                operation = "click"
                 element.click()
 
             # 输入框
             elif class_name == 'android.widget.EditText':
-                print(f"在输入框输入文本: ")
+                operation = "set_text"
                 element.set_text("test_input")
                 time.sleep(0.5)  # 等待输入完成
 
             # 复选框
             elif class_name == 'android.widget.CheckBox':
-                current_state = element.info['checked']
-                print(f"切换复选框状态: {current_state} -> {not current_state}")
+                operation = "toggle"
                 element.click()
 
             # 单选按钮
             elif class_name == 'android.widget.RadioButton':
-                if not element.info['checked']:
-                    print(f"选择单选按钮: ")
+                if not element_info['checked']:
+                    operation = "select"
                     element.click()
 
             # 开关
             elif class_name in ['android.widget.Switch', 'android.widget.ToggleButton']:
-                current_state = element.info['checked']
-                print(f"切换开关状态: {current_state} -> {not current_state}")
+                operation = "toggle"
                 element.click()
 
             # 下拉菜单
             elif class_name == 'android.widget.Spinner':
-                print(f"操作下拉菜单: ")
+                operation = "spinner"
                 self.operate_spinner(element)
 
             # 滑动条
             elif class_name == 'android.widget.SeekBar':
-                print(f"调整滑动条: ")
+                operation = "seek"
                 element.set_text("50")  # 设置中间值
             elif class_name == 'androidx.recyclerview.widget.RecyclerView':
+                operation = "scroll"
                 self._handle_recyclerview(element)
             # 其他可点击元素
-            elif element.info['clickable']:
-                print(f"点击元素: ")
+            elif element_info['clickable']:
+                operation = "click"
                 element.click()
             elif element_info['longClickable']:
-                print(f"长击元素: ")
+                operation = "long_click"
                 element.long_click()
+            self.events.action(element=lambda: element_summary(element_info), op=operation, checked=element_info.get('checked'))
             time.sleep(0.3)  # 操作间隔
+            return operation
 
 
         except Exception as e:
-            print(f"操作元素时出错: {str(e)}")
+            self.events.error(stage="operate_element", element=lambda: element_summary(element_info), message=str(e))
+            return None
 
 
     def operate_spinner(self, spinner):
@@ -315,16 +480,15 @@ class AndroidUITraverser:
                                       clickable=True,
                                       enabled=True).first
                 if first_option.exists:
-                    print(f"选择下拉选项: {first_option.info.get('text', '')}")
+                    self.events.debug("spinner_option", text=first_option.info.get('text', ''))
                     first_option.click()
         except Exception as e:
-            print(f"操作下拉菜单时出错: {str(e)}")
+            self.events.error(stage="operate_spinner", message=str(e))
 
 
     def scroll_down(self):
         """向下滑动屏幕，返回是否成功滑动（未到达底部）"""
-        screen_width = self.d.info['displayWidth']
-        screen_height = self.d.info['displayHeight']
+        screen_width, screen_height = self.device_meta.size
 
         # 滑动参数
         start_x = screen_width // 2
@@ -332,7 +496,7 @@ class AndroidUITraverser:
         end_y = int(screen_height * 0.3)
 
         # 执行滑动
-        self.d.swipe(start_x, start_y, start_x, end_y, steps=10)
+        self.device.swipe(start_x, start_y, start_x, end_y, steps=10)
         time.sleep(1)  # 等待内容加载
 
         # 检查是否到达底部
@@ -355,7 +519,7 @@ class AndroidUITraverser:
         except:
             pass
 
-        return self.d.info['displayHeight']
+        return self.device_meta.height
 
 
     def get_all_interactable_elements(self) :
@@ -381,59 +545,113 @@ class AndroidUITraverser:
 
         elements = []
         unique_elements = []
-        screenshot_path, ui_tree_path=self.dump_current_state("tr"+self.get_page_signature())
+        capture = self.device.capture()
+        screenshot, hierarchy, app = capture
+        page_signature = self.page_signature_of(app)
+        current_window = self.window_of(app)
+        self.dump_current_state("tr"+page_signature, capture)
+        self.last_capture = (app, hierarchy, screenshot)
+        self.snapshot_table = ElementTable.from_hierarchy(hierarchy)
+        self.update_list_clusters(current_window)
         for query in xpath_queries:
             try:
-                found = self.d.xpath(query).all()
+                found = self.xpath_all(query, hierarchy)
                 elements.extend(found)
             except:
                 continue
         seen_element_ids = set()
         for elem in elements:
-            elem_id = self.get_element_signature(elem)
+            elem_id = self.get_element_signature(elem, current_window)
             if elem_id not in seen_element_ids:
                 seen_element_ids.add(elem_id)
                 unique_elements.append(elem)
         self.all_unique_elememts=unique_elements
-        current_time = datetime.now()
-        formatted_time = current_time.strftime("%Y%m%d%H%M%S")
-        self.draw_bbox_multi(screenshot_path, os.path.join(self.output_dir,f"{self.get_page_signature()}{formatted_time}labeled.png"), unique_elements)
+        formatted_time = datetime.now().strftime("%Y%m%d%H%M%S")
+        # 标记图在后台绘制，不阻塞下一步操作
+        labeled_path = os.path.join(self.output_dir, f"{page_signature}{formatted_time}_{next(self.artifact_numbers):05d}labeled.png")
+        drawn = self.device.background(self.draw_bbox_multi, cv2.cvtColor(np.asarray(screenshot.convert("RGB")), cv2.COLOR_RGB2BGR),
+                                       labeled_path, unique_elements)
+        drawn.add_done_callback(self.log_background_failure("draw_labels"))
         return self.filter_elements(unique_elements)
 
-    def filter_elements(self, elements):
-        filtered = []
-        for elem in elements:
-            # 检查黑名单
-            resource_id = elem.info["resourceId"]
-            if resource_id and any(
-                    black_item in resource_id for black_item in self.system_blacklist):
-                continue
-
-            # 检查可见性
-
-            # 检查大小(避免点击太小或空白的元素)
-            rect = elem.info['bounds']
-            if (rect['right']-rect['left']) < 10 or (rect['bottom']-rect['top']) < 10:
-                continue
+    def xpath_all(self, query, hierarchy):
+        """在已dump的UI树上执行XPath查询，uiautomator2不支持传入source时退回为每次重新dump"""
+        if self.xpath_accepts_source:
+            try:
+                return self.d.xpath(query, hierarchy).all()
+            except TypeError:
+                self.xpath_accepts_source = False
+        return self.d.xpath(query).all()
 
-            filtered.append(elem)
-        print(f"ui元素{len(filtered)}")
+    def filter_elements(self, elements):
+        """黑名单与大小过滤(避免点击太小或空白的元素)，每个元素只读取一次info"""
+        table = ElementTable.from_infos([elem.info for elem in elements])
+        keep = ~table.blacklist_mask(self.system_blacklist) & table.size_mask(10, 10)
+        if self.list_clusters:
+            # 重复列表行只探索代表行，其余行视为已被代表行覆盖
+            covered = covered_mask(table.bounds, self.list_clusters) & keep
+            self.cluster_covered_count += int(covered.sum())
+            keep &= ~covered
+        if self.snapshot_table is not None:
+            # 被绘制在其上方的可点击元素(弹层、悬浮按钮等)遮挡的元素点击不到，跳过
+            obscured = np.array([bool(ok) and self.is_bounds_obscured(box) for box, ok in zip(table.bounds.tolist(), keep)],
+                                dtype=bool)
+            keep &= ~obscured
+        filtered = [elem for elem, ok in zip(elements, keep) if ok]
+        self.events.debug("filter", kept=len(filtered), total=len(elements))
         return filtered
 
+    def update_list_clusters(self, current_window=""):
+        """对最近一次快照中的重复列表行聚类，已操作行数按页面(窗口 + 结构签名)分别累计"""
+        if not self.cluster_sample_size or not self.last_hierarchy:
+            self.list_clusters = []
+            return
+        try:
+            screen = f"{current_window}:{structure_signature(self.last_hierarchy)}"
+            self.list_clusters = find_clusters(self.last_hierarchy, sample_size=self.cluster_sample_size,
+                                               explored=self.cluster_explored, screen=screen)
+        except Exception as e:
+            self.events.error(stage="list_clustering", message=str(e))
+            self.list_clusters = []
+            return
+        for cluster in self.list_clusters:
+            self.events.debug("list_cluster", template=cluster['template'], class_path=cluster['class_path'],
+                              rows=len(cluster['rows']), explored=len(cluster['representatives']))
+
+    def element_at(self, x, y, clickable_only=False):
+        """最近一次快照中坐标处最上层的节点下标，没有时返回-1"""
+        if self.snapshot_table is None:
+            return -1
+        mask = self.snapshot_table.has_flag("clickable") if clickable_only else None
+        return self.snapshot_table.hit_test(x, y, mask)
+
+    def is_bounds_obscured(self, bounds, min_ratio=0.5):
+        """bounds处的节点是否被快照中绘制在其上方的可点击节点遮挡超过min_ratio"""
+        table = self.snapshot_table
+        if table is None:
+            return False
+        index = table.index_of(bounds)
+        if index < 0:
+            return False
+        return bool(table.occluders(index, min_ratio, table.has_flag("clickable")))
+
     def get_page_signature(self) :
         """生成页面唯一签名"""
-        activity = self.d.app_current().get('activity', 'unknown')
-        source = self.d.info['currentPackageName']
-        window_size = self.d.window_size()
+        return self.page_signature_of(self.d.app_current())
+
+    def page_signature_of(self, app):
+        activity = app.get('activity', 'unknown')
+        source = app['package']
+        window_size = self.device_meta.size
         hash_obj = hashlib.md5(source.encode('utf-8'))
         source_hash = hash_obj.hexdigest()
         return f"{activity}:{window_size[0]}x{window_size[1]}:{source_hash}"
 
-    def get_element_signature(self, element) :
-        """生成元素唯一签名"""
+    def get_element_signature(self, element, current_window=None) :
+        """生成元素唯一签名，同一页面的多个元素可传入已读取的current_window"""
 
         element_id = self.get_element_identifier(element)
-        current_window = self.get_current_window()
+        current_window = current_window or self.get_current_window()
         return f"{current_window}:{element_id}"
 
     def get_element_identifier(self, element):
@@ -461,68 +679,59 @@ class AndroidUITraverser:
         if not element.exists:
             return False
 
-            # 获取屏幕尺寸
-        window_size = self.d.window_size()
-        screen_width, screen_height = window_size
-
-        # 获取元素坐标
-        bounds = element.info['bounds']
-        left, top, right, bottom = bounds['left'], bounds['top'], bounds['right'], bounds['bottom']
-
-        # 判断元素是否在屏幕内
-        return (0 <= left <= screen_width and
-                0 <= top <= screen_height and
-                0 <= right <= screen_width and
-                0 <= bottom <= screen_height)
+        # 判断元素四条边是否都在屏幕内
+        table = ElementTable.from_infos([element.info])
+        return bool(table.visible_mask(*self.device_meta.size)[0])
 
 
     def scroll_to_element(self, element):
         """将元素滚动到视图中心"""
-        window_center = self.d.window_size()[1] /2
-        elem_center = (element.info['bounds']['top'] + element.info['bounds']['bottom']) /2
+        screen_width, screen_height = self.device_meta.size
+        window_center = screen_height /2
+        bounds = element.info['bounds']
+        elem_center = (bounds['top'] + bounds['bottom']) /2
 
         # 计算需要滑动的距离（像素）
         scroll_distance = elem_center - window_center
 
         if scroll_distance > 0:  # 需要向下滑动
-            self.d.swipe(self.d.window_size()[0] // 2, window_center,
-                         self.d.window_size()[0] // 2, window_center - scroll_distance)
+            self.device.swipe(screen_width // 2, window_center,
+                         screen_width // 2, window_center - scroll_distance)
         else:  # 需要向上滑动
-            self.d.swipe(self.d.window_size()[0] // 2, window_center,
-                         self.d.window_size()[0] // 2, window_center - scroll_distance)
+            self.device.swipe(screen_width // 2, window_center,
+                         screen_width // 2, window_center - scroll_distance)
         time.sleep(1)
 
     def _handle_recyclerview(self, element):
         """处理RecyclerView滑动"""
-        print("检测到RecyclerView，执行滑动操作")
         bounds = element.info['bounds']
         start_x = (bounds['left'] + bounds['right']) / 2
         start_y = (bounds['top'] + bounds['bottom']) * 0.8  # 底部80%位置
         end_y = (bounds['top'] + bounds['bottom']) * 0.2  # 顶部20%位置
 
         # 缓慢滑动（400ms持续时间）
-        self.d.swipe(start_x, start_y, start_x, end_y, duration=0.4)
+        self.device.swipe(start_x, start_y, start_x, end_y, duration=0.4)
         time.sleep(1)
-        print("滑动操作结束")
     def smart_scroll_to_element(self, element):
         """智能滚动到元素（计算最佳滑动距离）"""
-        elem_center = (element.info['bounds']['top'] + element.info['bounds']['bottom']) / 2
-        window_center = self.d.window_size()[1] /2
+        bounds = element.info['bounds']
+        elem_center = (bounds['top'] + bounds['bottom']) / 2
+        screen_width, screen_height = self.device_meta.size
+        window_center = screen_height /2
         scroll_distance = elem_center - window_center
 
         if abs(scroll_distance) > 100:  # 需要滑动
-            self.d.swipe(
-                self.d.window_size()[0] / 2,
+            self.device.swipe(
+                screen_width / 2,
                 window_center,
-                self.d.window_size()[0] / 2,
+                screen_width / 2,
                 window_center - scroll_distance * 0.8,  # 滑动80%距离
                 duration=0.5
             )
 
     def swipe_up_half_screen_if_element_at_bottom(self,element):
         # 获取屏幕尺寸
-        window_size = self.d.window_size()
-        screen_width, screen_height = window_size[0], window_size[1]
+        screen_width, screen_height = self.device_meta.size
 
         # 获取元素位置
         bounds = element.info['bounds']
@@ -534,21 +743,21 @@ class AndroidUITraverser:
             start_x = screen_width // 2
             start_y = screen_height * 3 // 4
             end_y = screen_height // 4
-            self.d.swipe(start_x, start_y, start_x, end_y, duration=0.2)
+            self.device.swipe(start_x, start_y, start_x, end_y, duration=0.2)
             return True
         return False
 
     def _is_at_bottom(self):
         """判断是否滑动到底部"""
         last_screen = self.d.dump_hierarchy()
-        self.d.swipe(0.5, 0.8, 0.5, 0.2, duration=0.5)  # 尝试滑动
+        self.device.swipe(0.5, 0.8, 0.5, 0.2, duration=0.5)  # 尝试滑动
         time.sleep(1)
         new_screen = self.d.dump_hierarchy()
         return last_screen == new_screen  # 如果滑动前后UI树相同，说明到底部
 
     def _smart_swipe_down(slef):
         """智能滑动（根据屏幕尺寸自适应）"""
-        w, h = slef.d.window_size()
+        w, h = slef.device_meta.size
         slef.d.swipe(w * 0.5, h * 0.7, w * 0.5, h * 0.3, duration=0.2)
 
     def start_main_window(self):
@@ -559,7 +768,7 @@ class AndroidUITraverser:
     def reset_to_main_window(self):
         """重置测试环境到初始状态"""
         self.d.app_stop_all()
-        self.d.press('home')
+        self.device.press('home')
         self.start_app(self.app_identifier)
         time.sleep(3)
         return self.get_current_window()
@@ -567,30 +776,108 @@ class AndroidUITraverser:
     def reset_to_before_window(self,current,swipe_count):
         """在异常情况时重置到操作元素前环境，最好的做法是记忆元素操作路径来恢复环境，缺点是在多层操作元素时会耗时太久，
         当前用activity取代  后续补充fragement 处理方式"""
+        self.events.recovery(method="restart", window=current, swipes=swipe_count)
         self.d.app_stop_all()
-        self.d.press('home')
+        self.device.press('home')
         self.d.app_start(current.split('/')[0],current.split('/')[1])
+        self.input_since_snapshot = False  # 重启后的画面不与卡死判定的前一帧比较输入响应
         time.sleep(3)
         self.handle_swipe_with_times(swipe_count)
         return self.get_current_window()
 
-    def operate_with_recovery(self,element, current_depth,current_swipe_count):
-        """递归操作元素，操作完回到操作前页面"""
-        before_window = self.get_current_window()
+    def dismiss_overlay(self, before_hierarchy, package):
+        """按返回键关闭弹窗，回到弹窗出现前的界面时返回True"""
+        self.device.press('back')
+        time.sleep(1)
+        effect = diff_hierarchies(before_hierarchy, self.d.dump_hierarchy(), package)["effect"]
+        self.events.recovery(method="back", result=effect)
+        return effect in (NO_OP, IN_PLACE)
+
+    def operate_with_recovery(self,element, current_depth,current_swipe_count, clusters=None, before=None):
+        """
+        递归操作元素，按操作效果决定是否需要回到操作前页面
+
+        :param clusters: 元素所在页面的列表行聚类，操作成功后为代表行计数
+        :param before: 已读取的操作前 (当前应用, UI树, 截图)，读取后没有再操作设备时可直接使用，None时重新读取
+        :return: 操作后仍在原页面时返回操作后的 (当前应用, UI树, 截图)，可作为下一个元素的操作前状态；否则返回None
+        """
+        try:
+            # 当前应用、操作前UI树与截图并发读取
+            app, before_hierarchy, before_screenshot = before or self.device.read_many(
+                self.d.app_current, self.d.dump_hierarchy, self.d.screenshot)
+            before_window = self.window_of(app)
+        except Exception:
+            app, before_window, before_hierarchy, before_screenshot = None, self.get_current_window(), None, None
+        package = before_window.split('/')[0]
         try:
-            print(f"\n[Depth {current_depth}] 操作元素: {element.info}")
+            info = element.info
+            if before_hierarchy is None:
+                before_hierarchy = self.d.dump_hierarchy()
+            if app is None:
+                app = self.d.app_current()
+            # 回放时用于免dump校验的操作前指纹
+            step_fingerprint = screen_fingerprint(app, before_screenshot if before_screenshot is not None else self.d.screenshot())
 
             # 执行元素操作
-            self.operate_element_based_on_type(element)
+            operation = self.operate_element_based_on_type(element)
+            self.input_since_snapshot = True
+            if clusters:
+                bounds = info['bounds']
+                mark_operated(clusters, (bounds['left'], bounds['top'], bounds['right'], bounds['bottom']),
+                              self.cluster_explored)
             time.sleep(2)  # 等待界面稳定
 
-            # 继续递归处理子元素
-            if current_depth < self.max_depth:
-                self.handle_current_level(current_depth+1)
-            else:
+            after_app, after_hierarchy, after_screenshot = self.device.read_many(
+                self.d.app_current, self.d.dump_hierarchy, self.d.screenshot)
+            after_parts = structure_parts(after_hierarchy)
+            after_fingerprint = parts_signature(after_parts)
+            before_fingerprint = structure_signature(before_hierarchy)
+            diff = diff_hierarchies(before_hierarchy, after_hierarchy, package, app, after_app, info['bounds'])
+            effect = diff["effect"]
+            self.events.transition(depth=current_depth, element=lambda: element_summary(info), effect=effect,
+                                   added=len(diff['added']), removed=len(diff['removed']), changed=len(diff['changed']))
+            if self.scheduler:
+                moved = effect in (NEW_SCREEN, OVERLAY)
+                new_screen = moved and self.scheduler.visit_screen(after_fingerprint, after_parts)
+                self.scheduler.record(info, effect, new_screen, after_fingerprint if moved else None, before_fingerprint)
+            if effect in (NO_OP, IN_PLACE):
+                # 仍在原页面(如开关切换)，无需恢复
+                return after_app, after_hierarchy, after_screenshot
+            if effect == APP_LEFT:
                 self.reset_to_before_window(before_window, current_swipe_count)
+                return
+            if self.is_screen_visited(after_hierarchy, after_screenshot):
+                # 已探索过的页面(含近似相同的WebView/画布画面)不再递归，直接回到操作前页面
+                self.events.debug("skip_visited_screen", depth=current_depth, effect=effect)
+                if effect != OVERLAY or not self.dismiss_overlay(before_hierarchy, package):
+                    self.reset_to_before_window(before_window, current_swipe_count)
+                return
+
+            # 到达当前页面需要的回放步骤: 本层的翻页次数 + 本次操作
+            replay_op, text = REPLAY_OPS.get(operation, ("click", None))
+            steps = [swipe_step()] * current_swipe_count + [make_step(replay_op, info, step_fingerprint, text)]
+            self.programs.write(package, self.action_path + steps,
+                                final_screen(after_app, *self.screen_key(after_hierarchy, after_screenshot)))
+            self.action_path.extend(steps)
+            try:
+                if effect == OVERLAY:
+                    if current_depth < self.max_depth:
+                        self.handle_current_level(current_depth+1)
+                    if self.budget_exhausted():
+                        return
+                    if not self.dismiss_overlay(before_hierarchy, package):
+                        self.reset_to_before_window(before_window, current_swipe_count)
+                    return
+
+                # 继续递归处理子元素
+                if current_depth < self.max_depth:
+                    self.handle_current_level(current_depth+1)
+                elif not self.budget_exhausted():
+                    self.reset_to_before_window(before_window, current_swipe_count)
+            finally:
+                del self.action_path[len(self.action_path) - len(steps):]
         except Exception as e:
-            print(f"操作失败: {str(e)}")
+            self.events.error(stage="operate_with_recovery", depth=current_depth, message=str(e))
             self.reset_to_before_window(before_window,current_swipe_count)
 
 
@@ -598,19 +885,31 @@ class AndroidUITraverser:
         """处理当前层级的所有元素"""
         need_swipe=True
         current_swipe_count=0
-        print(f"\n{'=' * 20} 开始遍历深度 {current_depth} {'=' * 20}")
+        self.events.emit("level", depth=current_depth)
         while need_swipe and current_swipe_count <5:
+            if self.budget_exhausted():
+                return
             elements = self.get_all_interactable_elements()
+            clusters = self.list_clusters  # 递归进入子页面会覆盖 self.list_clusters
+            # 上一次读取之后没有操作过设备时，下一个元素直接使用该状态，省去一次读取
+            prefetched = self.last_capture
+            if self.scheduler:
+                # 按预期新颖度排序，优先探索更可能打开新页面的元素；每操作一个元素后按新结果重新排序
+                screen_parts = structure_parts(self.last_hierarchy)
+                screen_signature = parts_signature(screen_parts)
+                self.scheduler.discover_screen(screen_signature, screen_parts)
+                elements = self.scheduler.iter_ranked(elements, [elem.info for elem in elements], screen_signature)
             for element in elements:
+                if self.budget_exhausted():
+                    self.events.emit("budget_exhausted", depth=current_depth)
+                    return
                 element_signature=self.get_element_signature(element)
                 if element_signature not in self.visited_elements:
                     self.visited_elements.add(element_signature)
-                    self.operate_with_recovery(element, current_depth,current_swipe_count)
+                    prefetched = self.operate_with_recovery(element, current_depth,current_swipe_count, clusters, prefetched)
                 else:
-                    print("element operate already")
+                    self.events.debug("skip_visited", element=element_signature)
                     continue
-                print("当前元素深度遍历结束开始下一个元素深度遍历")
-                print(current_depth)
                 if current_depth==self.max_depth:
                     current_depth=1 #下个元素操作需重制元素初始化深度
             before=self.get_current_window()
@@ -627,25 +926,26 @@ class AndroidUITraverser:
         """处理需要滑动的内容"""
         swipe_count = 0
         while swipe_count < times:
-            self.d.swipe(0.5, 0.8, 0.5, 0.2, duration=0.5)
+            self.device.swipe(0.5, 0.8, 0.5, 0.2, duration=0.5)
+            self.input_since_snapshot = True
             time.sleep(1.5)
             swipe_count=swipe_count+1
 
 
     def draw_bbox_multi(self, img_path, output_path, elem_list, record_mode=True, dark_mode=False):
-        """标记当前页面元素"""
-        imgcv = cv2.imread(img_path)
+        """标记当前页面元素，img_path 可以是图片路径或BGR数组"""
+        imgcv = cv2.imread(img_path) if isinstance(img_path, str) else img_path
         count = 1
         for elem in elem_list:
             try:
-
-                left, top = elem.info['bounds']['left'], elem.info['bounds']['top']
-                right, bottom = elem.info['bounds']['right'], elem.info['bounds']['bottom']
+                info = elem.info
+                left, top = info['bounds']['left'], info['bounds']['top']
+                right, bottom = info['bounds']['right'], info['bounds']['bottom']
                 label = str(count)
                 if record_mode:
-                    if elem.info['clickable'] :
+                    if info['clickable'] :
                         color = (250, 0, 0)
-                    elif elem.info['focusable'] :
+                    elif info['focusable'] :
                         color = (0, 0, 250)
                     else:
                         color = (0, 250, 0)
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import time
+import xml.etree.ElementTree as ET
+
+from .hierarchy import parse_bounds
+from .image_hash import hamming, phash
+
+
+PROGRAM_VERSION = 2
+
+# 元素info字段 -> dump_hierarchy() xml属性
+SELECTOR_ATTRS = {"resourceId": "resource-id", "text": "text", "description": "content-desc", "className": "class"}
+
+
+def make_selector(info):
+    """由元素info生成选择器，只保留非空字段"""
+    values = {"resourceId": info.get("resourceId"), "text": info.get("text"),
+              "description": info.get("contentDescription"), "className": info.get("className")}
+    return {key: value for key, value in values.items() if value}
+
+
+def window_of(app):
+    """app_current() 的结果 -> 包名/活动名"""
+    return app['package'] + '/' + app.get('activity', 'unknown')
+
+
+def screen_fingerprint(app, screenshot):
+    """操作前页面的廉价指纹: 当前窗口 + 截图感知哈希，回放时无需dump UI树即可校验"""
+    return {"window": window_of(app), "phash": phash(screenshot)}
+
+
+def final_screen(app, perceptual, key):
+    """
+    程序的最终页面: 窗口 + 遍历时判断页面是否已访问的key
+
+    :param perceptual: key为截图感知哈希(WebView、画布等)时为True，否则key为UI树md5
+    """
+    return {"window": window_of(app), "perceptual": perceptual, "key": key}
+
+
+def make_step(op, info, fingerprint, text=None):
+    """
+    一步操作: 选择器 + 录制时的坐标 + 操作前页面的指纹(见 screen_fingerprint)
+
+    :param op: click / long_click / set_text / swipe / scroll
+    """
+    bounds = info.get("bounds") or {}
+    step = {
+        "op": op,
+        "selector": make_selector(info),
+        "point": [(bounds.get("left", 0) + bounds.get("right", 0)) // 2,
+                  (bounds.get("top", 0) + bounds.get("bottom", 0)) // 2],
+        "bounds": [bounds.get("left", 0), bounds.get("top", 0), bounds.get("right", 0), bounds.get("bottom", 0)],
+        "fingerprint": fingerprint,
+    }
+    if text is not None:
+        step["text"] = text
+    return step
+
+
+def swipe_step():
+    """列表翻页，与 handle_swipe_with_times 相同的手势"""
+    return {"op": "swipe"}
+
+
+def make_program(app, steps, final, name=None):
+    return {"version": PROGRAM_VERSION, "name": name, "app": app, "steps": list(steps), "final": final}
+
+
+def find_node(hierarchy_xml, selector):
+    """在dump出的UI树中按选择器查找第一个节点的bounds，没有时返回None"""
+    root = ET.fromstring(hierarchy_xml.encode('utf-8') if isinstance(hierarchy_xml, str) else hierarchy_xml)
+    wanted = [(SELECTOR_ATTRS[key], value) for key, value in selector.items() if key in SELECTOR_ATTRS]
+    if not wanted:
+        return None
+    for element in root.iter("node"):
+        if all(element.get(attr) == value for attr, value in wanted):
+            return parse_bounds(element.get("bounds"))
+    return None
+
+
+def load_programs(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class ProgramWriter:
+    def __init__(self, output_dir, filename="programs.jsonl"):
+        """遍历中发现的新页面路径，每行一个可回放的操作程序；文件已存在时续写并沿用其中已记录的页面"""
+        self.path = os.path.join(output_dir, filename)
+        existing = load_programs(self.path) if os.path.exists(self.path) else []
+        self.screens = {(program["final"]["window"], program["final"]["key"]) for program in existing
+                        if program.get("version") == PROGRAM_VERSION}
+        self.count = len(existing)
+
+    def write(self, app, steps, final):
+        """同一页面(窗口 + 页面key，见 final_screen)只记录第一次(深度优先下通常是最短)的路径，写入时返回True"""
+        screen = (final["window"], final["key"])
+        if screen in self.screens:
+            return False
+        self.screens.add(screen)
+        self.count += 1
+        program = make_program(app, steps, final, name=f"path_{self.count:04d}")
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(program, ensure_ascii=False, separators=(",", ":")) + "\n")
+        return True
+
+
+class ReplayEngine:
+    def __init__(self, device, verify=True, settle=0.5, launch_wait=2.0, max_distance=6):
+        """
+        回放操作程序: 当前窗口与截图感知哈希与录制时一致时直接按缓存坐标操作，不dump UI树；
+        不一致时才dump一次UI树按选择器定位
+
+        :param device: uiautomator2 设备
+        :param verify: False时跳过每步的指纹检查，只在最后校验
+        :param settle: 每步操作后的等待时间(秒)
+        :param launch_wait: 启动应用后的等待时间(秒)
+        :param max_distance: 截图感知哈希的汉明距离不超过该值视为同一画面
+        """
+        self.d = device
+        self.verify = verify
+        self.settle = settle
+        self.launch_wait = launch_wait
+        self.max_distance = max_distance
+
+    def run(self, program):
+        """返回 {"name", "passed", "steps", "fallbacks", "failed_step", "error", "duration"}"""
+        started = time.time()
+        result = {"name": program.get("name"), "passed": False, "steps": 0, "fallbacks": 0,
+                  "failed_step": None, "error": None}
+        try:
+            self.d.app_start(program["app"], stop=True)
+            time.sleep(self.launch_wait)
+            for index, step in enumerate(program["steps"]):
+                point = None
+                if step["op"] != "swipe":
+                    point = self._resolve(step, result)
+                    if point is None:
+                        result["failed_step"] = index
+                        result["error"] = f"找不到元素: {step.get('selector')}"
+                        break
+                self._perform(step, point)
+                result["steps"] += 1
+                time.sleep(self.settle)
+            else:
+                result["passed"] = self._matches_final(program["final"])
+                if not result["passed"]:
+                    result["error"] = "最终页面与录制时不一致"
+        except Exception as e:
+            result["error"] = str(e)
+        result["duration"] = round(time.time() - started, 2)
+        return result
+
+    def _same_picture(self, expected_hash):
+        return hamming(phash(self.d.screenshot()), expected_hash) <= self.max_distance
+
+    def _matches_final(self, final):
+        """最终页面与录制时为同一页面: 窗口相同，且UI树md5相同(或截图感知哈希相近)"""
+        if window_of(self.d.app_current()) != final["window"]:
+            return False
+        if final["perceptual"]:
+            return self._same_picture(final["key"])
+        return hashlib.md5(self.d.dump_hierarchy().encode('utf-8')).hexdigest() == final["key"]
+
+    def _resolve(self, step, result):
+        """返回本步操作的坐标"""
+        if not self.verify:
+            return step["point"]
+        fingerprint = step["fingerprint"]
+        if window_of(self.d.app_current()) == fingerprint["window"] and self._same_picture(fingerprint["phash"]):
+            return step["point"]
+        # 窗口或画面与录制时不同(版本变化、列表位置不同等)，dump UI树按选择器重新定位
+        result["fallbacks"] += 1
+        box = find_node(self.d.dump_hierarchy(), step["selector"])
+        if box is None:
+            return None
+        return [(box[0] + box[2]) // 2, (box[1] + box[3]) // 2]
+
+    def _perform(self, step, point):
+        op = step["op"]
+        if op == "swipe":
+            self.d.swipe(0.5, 0.8, 0.5, 0.2, duration=0.5)
+        elif op == "long_click":
+            self.d.long_click(*point)
+        elif op == "set_text":
+            self.d.click(*point)
+            self.d.send_keys(step.get("text", ""), clear=True)
+        elif op == "scroll":
+            left, top, right, bottom = step["bounds"]
+            x = (left + right) / 2
+            self.d.swipe(x, (top + bottom) * 0.8, x, (top + bottom) * 0.2, duration=0.4)
+        else:
+            self.d.click(*point)
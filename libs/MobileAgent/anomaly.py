@@ -0,0 +1,211 @@
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from .hierarchy import parse_hierarchy
+
+
+DEFAULT_THRESHOLDS = {
+    "uniform_ratio": 0.97,      # 与主色相同的像素占比超过该值视为纯色屏
+    "color_tolerance": 12,      # 与主色的通道差不超过该值视为同色
+    "black_level": 24,          # 主色亮度低于该值为黑屏
+    "white_level": 232,         # 主色亮度高于该值为白屏
+    "freeze_diff": 0.5,         # 相邻帧平均像素差低于该值视为画面未变化
+    "overlap_ratio": 0.3,       # 两个文字控件重叠面积占较小者的比例超过该值视为遮挡
+    "sample_step": 4,           # 像素采样步长
+}
+
+
+def load_frame(path, step):
+    """读取截图并按步长降采样为 H x W x 3 的uint8数组"""
+    with Image.open(path) as image:
+        return np.asarray(image.convert("RGB"))[::step, ::step]
+
+
+def uniform_color(frame, tolerance):
+    """返回(主色, 与主色接近的像素占比)"""
+    pixels = frame.reshape(-1, 3)
+    quantized = (pixels // 16).astype(np.int32)
+    codes = quantized[:, 0] * 256 + quantized[:, 1] * 16 + quantized[:, 2]
+    dominant_code = np.bincount(codes, minlength=4096).argmax()
+    dominant = pixels[codes == dominant_code].mean(axis=0)
+    close = np.all(np.abs(pixels.astype(np.int16) - dominant.astype(np.int16)) <= tolerance, axis=1)
+    return dominant, float(close.mean())
+
+
+def frame_difference(frame, prev_frame):
+    if prev_frame is None or prev_frame.shape != frame.shape:
+        return None
+    return float(np.abs(frame.astype(np.int16) - prev_frame.astype(np.int16)).mean())
+
+
+def text_occlusions(nodes, overlap_ratio):
+    """文字控件两两求交，返回重叠比例超过阈值且互不包含的控件对"""
+    leaves = [node for node in nodes if (node["text"] or node["desc"]) and not node["has_text_child"]]
+    if len(leaves) < 2:
+        return []
+    boxes = np.array([node["box"] for node in leaves], dtype=np.float64)
+    top_left = np.maximum(boxes[:, None, :2], boxes[None, :, :2])
+    bottom_right = np.minimum(boxes[:, None, 2:], boxes[None, :, 2:])
+    wh = np.clip(bottom_right - top_left, 0, None)
+    inter = wh[..., 0] * wh[..., 1]
+    area = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    smaller = np.minimum(area[:, None], area[None, :])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(smaller > 0, inter / smaller, 0)
+    # 完全包含通常是布局嵌套而不是遮挡
+    contains = np.all(boxes[:, None, :2] <= boxes[None, :, :2], axis=2) & np.all(boxes[:, None, 2:] >= boxes[None, :, 2:], axis=2)
+    flagged = (ratio > overlap_ratio) & ~contains & ~contains.T
+    pairs = np.argwhere(np.triu(flagged, k=1))
+    return [{"a": leaves[i]["text"] or leaves[i]["desc"], "b": leaves[j]["text"] or leaves[j]["desc"],
+             "ratio": round(float(ratio[i, j]), 3)} for i, j in pairs]
+
+
+def analyze_frame(screenshot_path, hierarchy_path, prev_screenshot_path, thresholds):
+    """在工作进程中执行的单帧检测，返回检测结果字典"""
+    step = thresholds["sample_step"]
+    frame = load_frame(screenshot_path, step)
+    result = {"screenshot": screenshot_path, "flags": []}
+
+    dominant, ratio = uniform_color(frame, thresholds["color_tolerance"])
+    if ratio >= thresholds["uniform_ratio"]:
+        luminance = float(dominant @ np.array([0.299, 0.587, 0.114]))
+        if luminance <= thresholds["black_level"]:
+            result["flags"].append({"type": "black_screen", "ratio": round(ratio, 4)})
+        elif luminance >= thresholds["white_level"]:
+            result["flags"].append({"type": "white_screen", "ratio": round(ratio, 4)})
+
+    if prev_screenshot_path:
+        result["diff"] = frame_difference(frame, load_frame(prev_screenshot_path, step))
+
+    if hierarchy_path:
+        with open(hierarchy_path, encoding='utf-8') as f:
+            nodes = parse_hierarchy(f.read())
+        occlusions = text_occlusions(nodes, thresholds["overlap_ratio"])
+        if occlusions:
+            result["flags"].append({"type": "text_occlusion", "pairs": occlusions})
+    return result
+
+
+class AnomalyAnalyzer:
+    def __init__(self, output_dir, workers=2, freeze_frames=3, thresholds=None, first_seq=1):
+        """
+        异步检测黑屏、白屏、画面卡死与文字遮挡，不阻塞遍历主流程
+
+        :param output_dir: 结果写入 output_dir/anomalies.jsonl
+        :param workers: 检测进程数
+        :param freeze_frames: 连续多少次输入操作(点击、滑动)后画面都无变化判定为卡死
+        :param thresholds: 覆盖 DEFAULT_THRESHOLDS 中的阈值
+        :param first_seq: 带序号提交时第一帧的序号
+        """
+        self.record_path = os.path.join(output_dir, "anomalies.jsonl")
+        self.freeze_frames = freeze_frames
+        self.thresholds = dict(DEFAULT_THRESHOLDS, **(thresholds or {}))
+        self._queue = queue.Queue()
+        # 遍历进程中有后台线程在运行，fork出的子进程可能继承被持有的锁，使用spawn启动检测进程
+        self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        self._write_lock = threading.Lock()
+        self._pending = []
+        self._reorder = {}
+        self._next_seq = first_seq
+        self._unchanged = 0
+        self.flagged = 0
+        self._thread = threading.Thread(target=self._dispatch, daemon=True)
+        self._thread.start()
+
+    def submit(self, screenshot_path, hierarchy_path=None, action=None, seq=None, after_input=True):
+        """
+        登记一帧，立即返回
+
+        :param seq: 截图顺序号，文件写完的顺序可能与截图顺序不同，按序号恢复帧序；None表示按提交顺序
+        :param after_input: 该帧是否在一次输入操作之后截取，只有这样的帧参与卡死判定
+        """
+        self._queue.put((seq, (screenshot_path, hierarchy_path, action, time.time(), after_input)))
+
+    def discard(self, seq):
+        """序号为seq的帧不会提交(如截图写入失败)，后续帧不再等待它"""
+        self._queue.put((seq, None))
+
+    def _dispatch(self):
+        prev_path = None
+        while True:
+            try:
+                item = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                self._drain(block=False)
+                continue
+            if item is None:
+                break
+            for frame in self._in_order(*item):
+                prev_path = self._analyze(frame, prev_path)
+            self._drain(block=False)
+        # 结束时缺失序号的帧不再等待
+        for seq in sorted(self._reorder):
+            if self._reorder[seq] is not None:
+                prev_path = self._analyze(self._reorder[seq], prev_path)
+        self._reorder.clear()
+        self._drain(block=True)
+
+    def _in_order(self, seq, frame):
+        """返回按序号可以处理的帧"""
+        if seq is None:
+            return [frame] if frame is not None else []
+        self._reorder[seq] = frame
+        ready = []
+        while self._next_seq in self._reorder:
+            frame = self._reorder.pop(self._next_seq)
+            if frame is not None:
+                ready.append(frame)
+            self._next_seq += 1
+        return ready
+
+    def _analyze(self, frame, prev_path):
+        screenshot_path, hierarchy_path, action, captured_at, after_input = frame
+        future = self._pool.submit(analyze_frame, screenshot_path, hierarchy_path, prev_path, self.thresholds)
+        self._pending.append((future, action, captured_at, after_input))
+        return screenshot_path
+
+    def _drain(self, block):
+        # 按提交顺序收集结果，保证卡死判定的帧序
+        while self._pending and (block or self._pending[0][0].done()):
+            future, action, captured_at, after_input = self._pending.pop(0)
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"flags": [{"type": "analysis_error", "error": str(e)}]}
+            self._check_freeze(result, after_input)
+            if result["flags"]:
+                result["action"] = action
+                result["captured_at"] = captured_at
+                self._write(result)
+
+    def _check_freeze(self, result, after_input):
+        # 没有输入操作时画面不变是正常的静态页面，不计入也不打断计数
+        diff = result.get("diff")
+        if diff is None or not after_input:
+            return
+        if diff < self.thresholds["freeze_diff"]:
+            self._unchanged += 1
+            if self._unchanged == self.freeze_frames:
+                result["flags"].append({"type": "frozen", "frames": self._unchanged})
+        else:
+            self._unchanged = 0
+
+    def _write(self, result):
+        with self._write_lock:
+            self.flagged += 1
+            with open(self.record_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+    def close(self):
+        """等待已提交的帧检测完成"""
+        self._queue.put(None)
+        self._thread.join()
+        self._pool.shutdown()
@@ -1,9 +1,6 @@
-import base64
 import requests
 
-def encode_image(image_path):
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode('utf-8')
+from .image_payload import encode_image
 
 
 def inference_chat(chat, API_TOKEN):    
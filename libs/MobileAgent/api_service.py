@@ -1,29 +1,167 @@
-import base64
-import requests
+import asyncio
+import atexit
+import gzip
 import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from .image_payload import encode_image
+
+MODEL_NAME = "pre-Mobile_Agent_Server-1664"
+
+
+class MobileAgentServerError(Exception):
+    """Mobile Agent服务端返回非2xx响应"""
+    def __init__(self, status_code, body):
+        super().__init__(f"Mobile Agent server error {status_code}: {body[:200]}")
+        self.status_code = status_code
+        self.body = body
+
+
+class MobileAgentClient:
+    def __init__(self, url, token, timeout=(5, 60), compress=False, max_workers=4, max_metrics=1000):
+        """
+        Mobile Agent服务端客户端，每个session_id复用一个长连接
+
+        :param url: 服务地址
+        :param token: 鉴权token
+        :param timeout: (连接超时, 读取超时) 秒
+        :param compress: 是否gzip压缩请求体，需服务端支持 Content-Encoding: gzip，默认关闭
+        :param max_workers: submit/异步调用使用的并发请求数
+        :param max_metrics: 保留最近多少步的耗时记录
+        """
+        self.url = url
+        self.token = token
+        self.timeout = timeout
+        self.compress = compress
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.metrics = deque(maxlen=max_metrics)
+
+    def _get_session(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = requests.Session()
+                session.headers.update({
+                    'Authorization': self.token,
+                    'Content-Type': 'application/json'
+                })
+                if self.compress:
+                    session.headers['Content-Encoding'] = 'gzip'
+                self._sessions[session_id] = session
+            return session
 
-def encode_image(image_path):
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode('utf-8')
+    def get_action(self, image_path, query, session_id):
+        """发送一步请求，与原 get_action 一致返回 requests.Response，不检查状态码"""
+        start = time.perf_counter()
+        image_base = encode_image(image_path, MODEL_NAME)
+        data = {
+            "model": MODEL_NAME,
+            "input": {
+                "screenshot": image_base,
+                "query": query,
+                "session_id": session_id
+            }
+        }
+        body = json.dumps(data).encode('utf-8')
+        raw_size = len(body)
+        if self.compress:
+            body = gzip.compress(body, compresslevel=5)
+        encoded = time.perf_counter()
+
+        response = self._get_session(session_id).post(self.url, data=body, timeout=self.timeout)
+        finished = time.perf_counter()
+        self._record(session_id, start, encoded, finished, raw_size, len(body), response.status_code)
+        return response
+
+    def get_result(self, image_path, query, session_id):
+        """发送一步请求并返回解析后的JSON，非2xx时抛出 MobileAgentServerError"""
+        response = self.get_action(image_path, query, session_id)
+        if not 200 <= response.status_code < 300:
+            raise MobileAgentServerError(response.status_code, response.text)
+        return response.json()
 
+    def submit(self, image_path, query, session_id):
+        """提交请求但不等待结果，返回Future(结果为requests.Response)，便于与下一步准备工作重叠"""
+        return self._executor.submit(self.get_action, image_path, query, session_id)
 
-def get_action(image_base, query, session_id, url, token):    
-    image_base = encode_image(image_base)
+    async def get_action_async(self, image_path, query, session_id):
+        """asyncio调用入口，返回requests.Response"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.get_action, image_path, query, session_id)
 
-    headers = {
-        'Authorization': token,
-        'Content-Type': 'application/json'
-    }
+    def _record(self, session_id, start, encoded, finished, raw_size, sent_size, status_code):
+        with self._lock:
+            self.metrics.append({
+                "session_id": session_id,
+                "encode_ms": (encoded - start) * 1000,
+                "request_ms": (finished - encoded) * 1000,
+                "total_ms": (finished - start) * 1000,
+                "raw_bytes": raw_size,
+                "sent_bytes": sent_size,
+                "status_code": status_code,
+            })
 
-    data = {
-        "model": "pre-Mobile_Agent_Server-1664",
-        "input": {
-            "screenshot": image_base,
-            "query": query,
-            "session_id": session_id
+    def latency_summary(self):
+        """返回各阶段平均耗时与最近一步的耗时"""
+        with self._lock:
+            metrics = list(self.metrics)
+        if not metrics:
+            return {"steps": 0}
+        count = len(metrics)
+        return {
+            "steps": count,
+            "avg_encode_ms": sum(m["encode_ms"] for m in metrics) / count,
+            "avg_request_ms": sum(m["request_ms"] for m in metrics) / count,
+            "avg_total_ms": sum(m["total_ms"] for m in metrics) / count,
+            "last": metrics[-1],
         }
-    }
 
-    response = requests.post(url, headers=headers, data=json.dumps(data))
+    def close_session(self, session_id):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is not None:
+            session.close()
+
+    def close(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+        self._executor.shutdown(wait=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_action(image_base, query, session_id, url, token):
+    """兼容原接口: 返回 requests.Response，按 (url, token) 复用客户端"""
+    with _clients_lock:
+        client = _clients.get((url, token))
+        if client is None:
+            client = _clients[(url, token)] = MobileAgentClient(url, token)
+    return client.get_action(image_base, query, session_id)
+
 
-    return response
\ No newline at end of file
+@atexit.register
+def close_clients():
+    """关闭 get_action 复用的所有客户端及其连接"""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
@@ -0,0 +1,157 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncDevice:
+    def __init__(self, device, max_workers=4):
+        """
+        uiautomator2 设备的 asyncio 封装: 互不依赖的读取(截图、UI树、当前应用)并发执行，操作严格按提交顺序执行
+
+        - 操作开始前等待已提交的读取完成，读取不会看到操作进行中的界面
+        - 操作之后提交的读取等到操作完成才开始
+        - spawn() 提交的分析任务不参与排序，数据到手即可开始
+
+        :param device: uiautomator2 设备
+        :param max_workers: 执行阻塞调用的线程数
+        """
+        self.d = device
+        self.loop = asyncio.new_event_loop()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="device")
+        self.loop.set_default_executor(self._executor)
+        self._reads = set()
+        self._spawned = set()
+        self._last_action = None
+        self._action_lock = None
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def _call(self, fn, *args, **kwargs):
+        return self.loop.run_in_executor(None, functools.partial(fn, *args, **kwargs))
+
+    async def read(self, fn, *args, **kwargs):
+        """执行一次只读调用，可与其他读取并发"""
+        # 在第一次await之前登记，之后提交的操作会等待本次读取
+        slot = self.loop.create_future()
+        self._reads.add(slot)
+        try:
+            if self._last_action is not None and not self._last_action.done():
+                await asyncio.shield(self._last_action)
+            return await self._call(fn, *args, **kwargs)
+        finally:
+            self._reads.discard(slot)
+            slot.set_result(None)
+
+    async def act(self, fn, *args, **kwargs):
+        """执行一次操作，与其他操作按提交顺序串行"""
+        done = self.loop.create_future()
+        previous, self._last_action = self._last_action, done
+        # 只等待本次操作之前提交的读取
+        earlier_reads = list(self._reads)
+        if self._action_lock is None:
+            self._action_lock = asyncio.Lock()
+        try:
+            async with self._action_lock:
+                if previous is not None and not previous.done():
+                    await asyncio.shield(previous)
+                if earlier_reads:
+                    await asyncio.gather(*earlier_reads)
+                return await self._call(fn, *args, **kwargs)
+        finally:
+            done.set_result(None)
+
+    def spawn(self, fn, *args, **kwargs):
+        """在线程池中执行分析或写文件等任务，不等待设备操作"""
+        future = self._call(fn, *args, **kwargs)
+        self._spawned.add(future)
+        future.add_done_callback(self._spawned.discard)
+        return future
+
+    async def screenshot(self):
+        return await self.read(self.d.screenshot)
+
+    async def dump_hierarchy(self):
+        return await self.read(self.d.dump_hierarchy)
+
+    async def app_current(self):
+        return await self.read(self.d.app_current)
+
+    async def capture(self):
+        """并发获取 (截图, UI树, 当前应用)"""
+        return await asyncio.gather(self.screenshot(), self.dump_hierarchy(), self.app_current())
+
+    async def click(self, x, y):
+        return await self.act(self.d.click, x, y)
+
+    async def swipe(self, *args, **kwargs):
+        return await self.act(self.d.swipe, *args, **kwargs)
+
+    async def press(self, key):
+        return await self.act(self.d.press, key)
+
+    async def drain(self):
+        """等待所有读取与分析任务完成"""
+        pending = list(self._reads) + list(self._spawned)
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self.drain(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self._executor.shutdown()
+
+
+class SyncDevice:
+    def __init__(self, async_device):
+        """
+        供同步代码(AndroidUITraverser)使用的适配层，每个方法阻塞到结果返回；
+        submit()/background() 返回 concurrent.futures.Future，可先提交后取结果
+        """
+        self.device = async_device
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.device.loop)
+
+    def run(self, coro):
+        return self.submit(coro).result()
+
+    def background(self, fn, *args, **kwargs):
+        """在后台执行fn，返回 concurrent.futures.Future"""
+        async def spawned():
+            return await self.device.spawn(fn, *args, **kwargs)
+        return self.submit(spawned())
+
+    def screenshot(self):
+        return self.run(self.device.screenshot())
+
+    def dump_hierarchy(self):
+        return self.run(self.device.dump_hierarchy())
+
+    def app_current(self):
+        return self.run(self.device.app_current())
+
+    def capture(self):
+        return self.run(self.device.capture())
+
+    def read_many(self, *fns):
+        """并发执行多个只读调用，按参数顺序返回结果"""
+        async def gather():
+            return await asyncio.gather(*(self.device.read(fn) for fn in fns))
+        return self.run(gather())
+
+    def act(self, fn, *args, **kwargs):
+        return self.run(self.device.act(fn, *args, **kwargs))
+
+    def click(self, x, y):
+        return self.run(self.device.click(x, y))
+
+    def swipe(self, *args, **kwargs):
+        return self.run(self.device.swipe(*args, **kwargs))
+
+    def press(self, key):
+        return self.run(self.device.press(key))
+
+    def close(self):
+        self.device.close()
@@ -0,0 +1,67 @@
+import numpy as np
+
+
+def cxcywh_to_xyxy(boxes, width, height):
+    """将归一化的(cx, cy, w, h)批量转换为像素坐标(x1, y1, x2, y2)，取整方式与逐行转换一致"""
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    boxes = boxes * np.array([width, height, width, height], dtype=np.float32)
+    top_left = boxes[:, :2] - boxes[:, 2:] / 2
+    bottom_right = boxes[:, 2:] + top_left
+    return np.concatenate([top_left, bottom_right], axis=1).astype(np.int64)
+
+
+def box_area(boxes):
+    boxes = np.asarray(boxes).reshape(-1, 4)
+    return (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+
+
+def box_iou_matrix(boxes1, boxes2):
+    """计算两组框两两之间的IoU矩阵"""
+    boxes1 = np.asarray(boxes1, dtype=np.float64).reshape(-1, 4)
+    boxes2 = np.asarray(boxes2, dtype=np.float64).reshape(-1, 4)
+    top_left = np.maximum(boxes1[:, None, :2], boxes2[None, :, :2])
+    bottom_right = np.minimum(boxes1[:, None, 2:], boxes2[None, :, 2:])
+    wh = np.clip(bottom_right - top_left, 0, None)
+    inter = wh[..., 0] * wh[..., 1]
+    union = box_area(boxes1)[:, None] + box_area(boxes2)[None, :] - inter
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return inter / union
+
+
+def area_mask(boxes, max_area):
+    """面积不超过max_area的框为True"""
+    return box_area(boxes) <= max_area
+
+
+def nms_in_order(boxes, iou_threshold=0.5, candidates=None):
+    """
+    按下标顺序做贪心NMS: 保留的框会抑制所有与其IoU >= 阈值的框
+
+    :param boxes: N x 4 的 (x1, y1, x2, y2)
+    :param iou_threshold: IoU阈值
+    :param candidates: 参与NMS的布尔掩码，未参与的框直接丢弃
+    :return: 保留框的下标数组
+    """
+    boxes = np.asarray(boxes).reshape(-1, 4)
+    alive = np.ones(len(boxes), dtype=bool) if candidates is None else np.array(candidates, dtype=bool)
+    if not alive.any():
+        return np.zeros(0, dtype=np.int64)
+    suppress = box_iou_matrix(boxes, boxes) >= iou_threshold
+    np.fill_diagonal(suppress, False)
+    keep = []
+    for i in np.flatnonzero(alive):
+        if not alive[i]:
+            continue
+        keep.append(i)
+        alive &= ~suppress[i]
+    return np.array(keep, dtype=np.int64)
+
+
+def pad_boxes(boxes, pad, width, height):
+    """将框向四周扩展pad像素并裁剪到图像范围内"""
+    boxes = np.asarray(boxes).reshape(-1, 4)
+    padded = boxes + np.array([-pad, -pad, pad, pad])
+    padded[:, :2] = np.maximum(padded[:, :2], 0)
+    padded[:, 2] = np.minimum(padded[:, 2], width)
+    padded[:, 3] = np.minimum(padded[:, 3], height)
+    return padded
@@ -0,0 +1,231 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+import psutil
+import torch
+from PIL import Image
+
+from MobileAgent.box_ops import box_iou_matrix, pad_boxes
+from MobileAgent.crop import crops_for_clip, clip_for_icon
+from MobileAgent.icon_localization import det, detect_boxes
+from MobileAgent.text_localization import detect_text, recognize_batch, locate_text, ocr
+
+
+def rescale_boxes(boxes, factor, size):
+    """把 (x1, y1, x2, y2) 按factor缩放并裁剪到size范围内"""
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4) * factor
+    limits = np.array([size[0], size[1], size[0], size[1]])
+    return np.minimum(boxes.astype(np.int64), limits)
+
+
+def torch_module(model):
+    """返回模型本身或modelscope pipeline内部的torch模块"""
+    if isinstance(model, torch.nn.Module):
+        return model
+    module = getattr(model, "model", None)
+    return module if isinstance(module, torch.nn.Module) else None
+
+
+class CPUInferenceProfile:
+    def __init__(self, num_threads=None, channels_last=True, quantize=False, det_max_side=1024, ocr_max_side=1600):
+        """
+        CPU推理配置
+
+        :param num_threads: torch/OpenCV线程数，默认使用全部物理核
+        :param channels_last: 卷积模型使用channels_last内存布局
+        :param quantize: 对CLIP与OCR识别模型做动态int8量化
+        :param det_max_side: GroundingDINO输入图片长边上限
+        :param ocr_max_side: OCR文字检测输入图片长边上限(识别仍使用原图裁剪)
+        """
+        # 超线程共享计算单元，线程数超过物理核后卷积/矩阵运算反而变慢；无法获取物理核数时退回逻辑核数
+        self.num_threads = num_threads or psutil.cpu_count(logical=False) or os.cpu_count()
+        self.channels_last = channels_last
+        self.quantize = quantize
+        self.det_max_side = det_max_side
+        self.ocr_max_side = ocr_max_side
+
+    def apply(self, models):
+        """就地调整load_models()返回的模型字典并返回它"""
+        torch.set_num_threads(self.num_threads)
+        cv2.setNumThreads(self.num_threads)
+
+        for name in ("groundingdino_model", "ocr_detection", "ocr_recognition", "clip_model"):
+            module = torch_module(models.get(name))
+            if module is None:
+                continue
+            module.eval()
+            if self.channels_last:
+                module.to(memory_format=torch.channels_last)
+
+        if self.quantize:
+            models["clip_model"] = self._quantize(models["clip_model"].float())
+            recognizer = models["ocr_recognition"]
+            module = torch_module(recognizer)
+            if module is not None and module is not recognizer:
+                recognizer.model = self._quantize(module)
+        return models
+
+    def _quantize(self, module):
+        return torch.ao.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8)
+
+    def det(self, input_image_path, caption, groundingdino_model, box_threshold=0.05, text_threshold=0.5):
+        # 在缩小的图上检测，检测框先还原到原图坐标，再按原图像素留边，与det()的留边一致
+        image = Image.open(input_image_path)
+        if max(image.size) <= self.det_max_side:
+            with torch.inference_mode():
+                return det(input_image_path, caption, groundingdino_model, box_threshold, text_threshold)
+
+        scale = self.det_max_side / max(image.size)
+        small = image.convert("RGB").resize((int(image.size[0] * scale), int(image.size[1] * scale)), Image.BILINEAR)
+        caption = caption.lower().strip()
+        if not caption.endswith('.'):
+            caption = caption + '.'
+        with tempfile.TemporaryDirectory() as temp_dir:
+            small_path = os.path.join(temp_dir, "det_input.jpg")
+            small.save(small_path, quality=95)
+            with torch.inference_mode():
+                boxes = detect_boxes(small_path, caption, groundingdino_model, box_threshold, text_threshold, small.size)
+        boxes = rescale_boxes(boxes, 1 / scale, image.size)
+        return (pad_boxes(boxes, 10, image.size[0], image.size[1]).tolist(),
+                pad_boxes(boxes, 25, image.size[0], image.size[1]).tolist())
+
+    def ocr(self, image_path, prompt, ocr_detection, ocr_recognition, x, y):
+        image_full = cv2.imread(image_path)
+        ih, iw = image_full.shape[:2]
+        with torch.inference_mode():
+            points, crops = detect_text(image_full, ocr_detection, self.ocr_max_side)
+            texts = recognize_batch(ocr_recognition, crops)
+        return locate_text(points, texts, prompt, iw, ih, x, y)
+
+    def clip_for_icon(self, clip_model, clip_preprocess, images, prompt):
+        # 与 crop.clip_for_icon 相同的批量编码，模型已由 apply() 调整
+        return clip_for_icon(clip_model, clip_preprocess, images, prompt)
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def benchmark(fixtures, baseline_models, profiled_models, profile):
+    """
+    在样例截图上对比全精度与CPU配置的结果偏差和耗时
+
+    :param fixtures: [{"image": 截图路径, "texts": [文字查询], "icons": [[图标描述, 位置]]}]
+    :param baseline_models: 未调整的模型字典
+    :param profiled_models: 经过profile.apply()的模型字典
+    :param profile: CPUInferenceProfile
+    """
+    report = {"ocr": {"queries": 0, "same": 0, "base_ms": 0.0, "profile_ms": 0.0},
+              "det": {"queries": 0, "box_iou": 0.0, "base_ms": 0.0, "profile_ms": 0.0},
+              "clip": {"queries": 0, "same": 0, "base_ms": 0.0, "profile_ms": 0.0}}
+    for fixture in fixtures:
+        image_path = fixture["image"]
+        iw, ih = Image.open(image_path).size
+        for text in fixture.get("texts", []):
+            base, base_ms = _timed(ocr, image_path, text, baseline_models["ocr_detection"],
+                                   baseline_models["ocr_recognition"], iw, ih)
+            result, profile_ms = _timed(profile.ocr, image_path, text, profiled_models["ocr_detection"],
+                                        profiled_models["ocr_recognition"], iw, ih)
+            stats = report["ocr"]
+            stats["queries"] += 1
+            stats["same"] += int(base == result)
+            stats["base_ms"] += base_ms
+            stats["profile_ms"] += profile_ms
+
+        for caption, position in fixture.get("icons", []):
+            base_boxes, base_ms = _timed(det, image_path, caption, baseline_models["groundingdino_model"])
+            boxes, profile_ms = _timed(profile.det, image_path, caption, profiled_models["groundingdino_model"])
+            stats = report["det"]
+            stats["queries"] += 1
+            stats["base_ms"] += base_ms
+            stats["profile_ms"] += profile_ms
+            if base_boxes[0] and boxes[0]:
+                stats["box_iou"] += float(box_iou_matrix(base_boxes[0], boxes[0]).max(axis=1).mean())
+            elif not base_boxes[0] and not boxes[0]:
+                stats["box_iou"] += 1.0
+
+            if not base_boxes[0]:
+                continue
+            crops, _ = crops_for_clip(image_path, base_boxes[0], position)
+            if not crops:
+                continue
+            base_pos, base_ms = _timed(clip_for_icon, baseline_models["clip_model"],
+                                       baseline_models["clip_preprocess"], crops, caption)
+            pos, profile_ms = _timed(profile.clip_for_icon, profiled_models["clip_model"],
+                                     profiled_models["clip_preprocess"], crops, caption)
+            stats = report["clip"]
+            stats["queries"] += 1
+            stats["same"] += int(base_pos == pos)
+            stats["base_ms"] += base_ms
+            stats["profile_ms"] += profile_ms
+
+    for stats in report.values():
+        count = max(stats["queries"], 1)
+        stats["base_ms"] /= count
+        stats["profile_ms"] /= count
+        if "same" in stats:
+            stats["agreement"] = stats["same"] / count
+        if "box_iou" in stats:
+            stats["box_iou"] /= count
+    return report
+
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "tests", "fixtures",
+                                "cpu_profile", "fixtures.json")
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", type=str, default=DEFAULT_FIXTURES,
+                        help="样例截图描述json文件，图片路径相对该文件")
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--quantize", action="store_true")
+    parser.add_argument("--det-max-side", type=int, default=1024)
+    parser.add_argument("--ocr-max-side", type=int, default=1600)
+    parser.add_argument("--min-agreement", type=float, default=0.9, help="OCR/CLIP结果一致率下限")
+    parser.add_argument("--min-box-iou", type=float, default=0.8, help="det检测框平均IoU下限")
+    return parser.parse_args()
+
+
+def load_fixtures(path):
+    with open(path, encoding='utf-8') as f:
+        fixtures = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(path))
+    for fixture in fixtures:
+        fixture["image"] = os.path.join(base_dir, fixture["image"])
+    return fixtures
+
+
+def check_drift(report, min_agreement, min_box_iou):
+    """返回超出允许偏差的检查项"""
+    failures = []
+    for name in ("ocr", "clip"):
+        if report[name]["queries"] and report[name]["agreement"] < min_agreement:
+            failures.append(f"{name} agreement {report[name]['agreement']:.2f} < {min_agreement}")
+    if report["det"]["queries"] and report["det"]["box_iou"] < min_box_iou:
+        failures.append(f"det box_iou {report['det']['box_iou']:.2f} < {min_box_iou}")
+    return failures
+
+
+if __name__ == '__main__':
+    from MobileAgent.vision_server import load_models
+
+    args = get_args()
+    fixtures = load_fixtures(args.fixtures)
+    profile = CPUInferenceProfile(args.threads, quantize=args.quantize,
+                                  det_max_side=args.det_max_side, ocr_max_side=args.ocr_max_side)
+    baseline_models = load_models("cpu")
+    profiled_models = profile.apply(load_models("cpu"))
+    report = benchmark(fixtures, baseline_models, profiled_models, profile)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    failures = check_drift(report, args.min_agreement, args.min_box_iou)
+    for failure in failures:
+        print(f"精度偏差超出阈值: {failure}")
+    exit(1 if failures else 0)
@@ -1,41 +1,37 @@
 import math
+import threading
+import weakref
+from collections import OrderedDict
 import cv2
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 import clip
 import torch
+from MobileAgent.image_payload import load_image
 
 
-def crop_image(img, position):
+def order_quads(positions):
+    """批量把四点框整理为 左上、右上、左下、右下 的顺序，返回 N x 4 x 2"""
+    quads = np.asarray(positions, dtype=np.float32).reshape(-1, 4, 2)
+    quads = np.take_along_axis(quads, np.argsort(quads[:, :, 0], axis=1, kind='stable')[:, :, None], axis=1)
+    left = np.take_along_axis(quads[:, :2], np.argsort(quads[:, :2, 1], axis=1, kind='stable')[:, :, None], axis=1)
+    right = np.take_along_axis(quads[:, 2:], np.argsort(quads[:, 2:, 1], axis=1, kind='stable')[:, :, None], axis=1)
+    return np.stack([left[:, 0], right[:, 0], left[:, 1], right[:, 1]], axis=1)
+
+
+def axis_aligned_mask(quads, tolerance=1.0):
+    """四条边与坐标轴的偏差都不超过tolerance像素的框为True"""
+    top_left, top_right, bottom_left, bottom_right = quads[:, 0], quads[:, 1], quads[:, 2], quads[:, 3]
+    return ((np.abs(top_left[:, 1] - top_right[:, 1]) <= tolerance)
+            & (np.abs(bottom_left[:, 1] - bottom_right[:, 1]) <= tolerance)
+            & (np.abs(top_left[:, 0] - bottom_left[:, 0]) <= tolerance)
+            & (np.abs(top_right[:, 0] - bottom_right[:, 0]) <= tolerance))
+
+
+def warp_quad(img, corners):
     def distance(x1,y1,x2,y2):
         return math.sqrt(pow(x1 - x2, 2) + pow(y1 - y2, 2))    
-    position = position.tolist()
-    for i in range(4):
-        for j in range(i+1, 4):
-            if(position[i][0] > position[j][0]):
-                tmp = position[j]
-                position[j] = position[i]
-                position[i] = tmp
-    if position[0][1] > position[1][1]:
-        tmp = position[0]
-        position[0] = position[1]
-        position[1] = tmp
-
-    if position[2][1] > position[3][1]:
-        tmp = position[2]
-        position[2] = position[3]
-        position[3] = tmp
-
-    x1, y1 = position[0][0], position[0][1]
-    x2, y2 = position[2][0], position[2][1]
-    x3, y3 = position[3][0], position[3][1]
-    x4, y4 = position[1][0], position[1][1]
-
-    corners = np.zeros((4,2), np.float32)
-    corners[0] = [x1, y1]
-    corners[1] = [x2, y2]
-    corners[2] = [x4, y4]
-    corners[3] = [x3, y3]
+    (x1, y1), (x2, y2), (x4, y4), (x3, y3) = corners.tolist()
 
     img_width = distance((x1+x4)/2, (y1+y4)/2, (x2+x3)/2, (y2+y3)/2)
     img_height = distance((x1+x2)/2, (y1+y2)/2, (x4+x3)/2, (y4+y3)/2)
@@ -46,11 +42,42 @@ def crop_image(img, position):
     corners_trans[2] = [0, img_height - 1]
     corners_trans[3] = [img_width - 1, img_height - 1]
 
-    transform = cv2.getPerspectiveTransform(corners, corners_trans)
+    transform = cv2.getPerspectiveTransform(corners.astype(np.float32), corners_trans)
     dst = cv2.warpPerspective(img, transform, (int(img_width), int(img_height)))
     return dst
 
 
+def crop_image_batch(img, positions, tolerance=1.0):
+    """
+    批量裁剪文字框: 接近水平的矩形直接返回numpy切片(不复制)，只有旋转的文字才做透视变换
+
+    :param img: 整图 (H x W x C)
+    :param positions: N个四点框
+    :param tolerance: 判定为水平矩形的最大偏差(像素)
+    """
+    if len(positions) == 0:
+        return []
+    h, w = img.shape[:2]
+    quads = order_quads(positions)
+    aligned = axis_aligned_mask(quads, tolerance)
+    x1 = np.clip(np.rint(quads[:, [0, 2], 0].mean(axis=1)), 0, w).astype(int)
+    x2 = np.clip(np.rint(quads[:, [1, 3], 0].mean(axis=1)), 0, w).astype(int)
+    y1 = np.clip(np.rint(quads[:, [0, 1], 1].mean(axis=1)), 0, h).astype(int)
+    y2 = np.clip(np.rint(quads[:, [2, 3], 1].mean(axis=1)), 0, h).astype(int)
+
+    crops = []
+    for i in range(len(quads)):
+        if aligned[i] and x2[i] > x1[i] and y2[i] > y1[i]:
+            crops.append(img[y1[i]:y2[i], x1[i]:x2[i]])
+        else:
+            crops.append(warp_quad(img, quads[i]))
+    return crops
+
+
+def crop_image(img, position):
+    return crop_image_batch(img, [position])[0]
+
+
 def calculate_size(box):
     return (box[2]-box[0]) * (box[3]-box[1])
 
@@ -82,6 +109,16 @@ def crop(image, box, i, text_data=None):
 
     cropped_image = image.crop(box)
     cropped_image.save(f"./temp/{i}.jpg")
+
+
+def crop_images(image, boxes, text_data=None):
+    """在内存中批量裁剪，返回PIL图片列表，不写临时文件"""
+    image = load_image(image)
+    if text_data:
+        image = image.copy()
+        draw = ImageDraw.Draw(image)
+        draw.rectangle(((text_data[0], text_data[1]), (text_data[2], text_data[3])), outline="red", width=5)
+    return [image.crop(tuple(box)) for box in boxes]
     
 
 def in_box(box, target):
@@ -90,10 +127,8 @@ def in_box(box, target):
     else:
         return False
 
-    
-def crop_for_clip(image, box, i, position):
-    image = Image.open(image)
-    w, h = image.size
+
+def position_bound(w, h, position):
     if position == "left":
         bound = [0, 0, w/2, h]
     elif position == "right":
@@ -112,6 +147,13 @@ def crop_for_clip(image, box, i, position):
         bound = [w/2, h/2, w, h]
     else:
         bound = [0, 0, w, h]
+    return bound
+
+    
+def crop_for_clip(image, box, i, position):
+    image = Image.open(image)
+    w, h = image.size
+    bound = position_bound(w, h, position)
     
     if in_box(box, bound):
         cropped_image = image.crop(box)
@@ -119,23 +161,67 @@ def crop_for_clip(image, box, i, position):
         return True
     else:
         return False
+
+
+def crops_for_clip(image, boxes, position):
+    """在内存中裁剪位于position区域内的框，返回(裁剪图列表, 对应的框下标)"""
+    image = load_image(image)
+    w, h = image.size
+    bound = position_bound(w, h, position)
+    indexes = [i for i, box in enumerate(boxes) if in_box(box, bound)]
+    return [image.crop(tuple(boxes[i])) for i in indexes], indexes
+
+
+_text_feature_cache = weakref.WeakKeyDictionary()
+_text_feature_lock = threading.Lock()
+TEXT_FEATURE_CACHE_SIZE = 128
+
+
+def encode_prompt(clip_model, prompt):
+    """返回归一化后的文本特征，按模型与prompt做LRU缓存"""
+    with _text_feature_lock:
+        cache = _text_feature_cache.setdefault(clip_model, OrderedDict())
+        if prompt in cache:
+            cache.move_to_end(prompt)
+            return cache[prompt]
+
+    with torch.inference_mode():
+        text = clip.tokenize([prompt]).to(next(clip_model.parameters()).device)
+        text_features = clip_model.encode_text(text)
+        text_features = text_features / text_features.norm(dim=-1, keepdim=True)
+
+    with _text_feature_lock:
+        cache[prompt] = text_features
+        while len(cache) > TEXT_FEATURE_CACHE_SIZE:
+            cache.popitem(last=False)
+    return text_features
     
     
-def clip_for_icon(clip_model, clip_preprocess, images, prompt):
-    image_features = []
-    for image_file in images:
-        image = clip_preprocess(Image.open(image_file)).unsqueeze(0).to(next(clip_model.parameters()).device)
-        image_feature = clip_model.encode_image(image)
-        image_features.append(image_feature)
-    image_features = torch.cat(image_features)
-    
-    text = clip.tokenize([prompt]).to(next(clip_model.parameters()).device)
-    text_features = clip_model.encode_text(text)
+def encode_icons(clip_model, clip_preprocess, images):
+    device = next(clip_model.parameters()).device
+    with torch.inference_mode():
+        batch = torch.stack([clip_preprocess(image) for image in images]).to(device)
+        image_features = clip_model.encode_image(batch)
+    return image_features / image_features.norm(dim=-1, keepdim=True)
 
-    image_features /= image_features.norm(dim=-1, keepdim=True)
-    text_features /= text_features.norm(dim=-1, keepdim=True)
+
+def best_icon(clip_model, image_features, prompt):
+    text_features = encode_prompt(clip_model, prompt)
     similarity = (100.0 * image_features @ text_features.T).softmax(dim=0).squeeze(0)
     _, max_pos = torch.max(similarity, dim=0)
-    pos = max_pos.item()
+    return max_pos.item()
+
+
+def score_icons(clip_model, clip_preprocess, images, prompt):
+    image_features = encode_icons(clip_model, clip_preprocess, images)
+    return best_icon(clip_model, image_features, prompt)
+    
     
-    return pos
+def clip_for_icon(clip_model, clip_preprocess, images, prompt, cache=None):
+    images = [load_image(image) for image in images]
+    if cache is None:
+        return score_icons(clip_model, clip_preprocess, images, prompt)
+
+    image_keys = [cache.image_key(image) for image in images]
+    key = cache.make_key("clip", clip_model, image_keys, prompt)
+    return cache.get_or_compute(key, lambda: score_icons(clip_model, clip_preprocess, images, prompt))
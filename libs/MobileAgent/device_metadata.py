@@ -0,0 +1,118 @@
+import re
+
+
+ROTATION_PATTERN = re.compile(r'<hierarchy[^>]*\brotation="(\d+)"')
+DENSITY_PATTERN = re.compile(r"(?:Override|Physical) density:\s*(\d+)")
+
+
+class DeviceMetadata:
+    def __init__(self, device, labels=None):
+        """
+        设备静态信息缓存: 屏幕尺寸、密度、SDK版本与已安装应用的 名称->包名 索引
+        只在首次使用、屏幕旋转或应用安装后向设备查询
+
+        :param device: uiautomator2 设备
+        :param labels: 额外的 应用名->包名 映射，用于设备无法提供应用名的情况
+        """
+        self.d = device
+        self.extra_labels = {label.lower(): package for label, package in (labels or {}).items()}
+        self.rotation = None
+        self.width = None
+        self.height = None
+        self.density = None
+        self.sdk = None
+        self._label_index = None
+        self._packages = None
+        self.refresh_display()
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+    def refresh_display(self):
+        """重新读取屏幕尺寸、旋转方向、密度与SDK版本"""
+        info = self.d.info
+        self.rotation = info.get('displayRotation', 0)
+        self.sdk = info.get('sdkInt')
+        self.width, self.height = self.d.window_size()
+        if self.density is None:
+            try:
+                match = DENSITY_PATTERN.search(self.d.shell("wm density").output)
+                self.density = int(match.group(1)) if match else None
+            except Exception as e:
+                print(f"读取屏幕密度失败: {str(e)}")
+
+    def observe_hierarchy(self, hierarchy_xml):
+        """从 dump_hierarchy() 的根节点读取旋转方向，旋转后刷新屏幕尺寸，无需额外查询"""
+        match = ROTATION_PATTERN.search(hierarchy_xml[:512])
+        if match and int(match.group(1)) != self.rotation:
+            print(f"屏幕旋转: {self.rotation} -> {match.group(1)}")
+            self.refresh_display()
+
+    def refresh_apps(self):
+        """重建已安装应用索引"""
+        index, packages = {}, set()
+        for app in self.d.app_list():
+            if isinstance(app, dict):
+                package = app.get('package') or app.get('packageName')
+                label = app.get('name') or app.get('label')
+            else:
+                package, label = app, None
+            if not package:
+                continue
+            packages.add(package)
+            if label:
+                index.setdefault(label.lower(), package)
+        self._label_index = index
+        self._packages = packages
+
+    def on_package_installed(self):
+        """应用安装/卸载后调用，下次查询时重建索引"""
+        self._label_index = None
+        self._packages = None
+
+    def find_package(self, app_name):
+        """
+        按应用名查找包名: 先精确匹配，再按包含关系匹配应用名与包名，找不到时刷新一次索引
+        包含关系匹配到多个时取最短的应用名(或包名)，最短的有多个且包名不同时抛出ValueError
+        """
+        for attempt in range(2):
+            if self._label_index is None or attempt:
+                self.refresh_apps()
+            package = self._lookup(app_name.lower())
+            if package:
+                return package
+        return None
+
+    def _lookup(self, name):
+        package = self.extra_labels.get(name) or self._label_index.get(name)
+        if package:
+            return package
+        labels = dict(self._label_index, **self.extra_labels)
+        candidates = sorted((label, package) for label, package in labels.items() if name in label)
+        if not candidates:
+            candidates = sorted((package.lower(), package) for package in self._packages if name in package.lower())
+        if not candidates:
+            return None
+        shortest = min(len(text) for text, _ in candidates)
+        packages = sorted({package for text, package in candidates if len(text) == shortest})
+        if len(packages) > 1:
+            raise ValueError(f"应用名 {name} 匹配到多个应用: {', '.join(packages)}")
+        return packages[0]
+
+
+_devices = {}
+
+
+def for_device(device):
+    """按设备序列号共享的元数据缓存，同一序列号重新连接(新的设备对象)后重新读取"""
+    serial = getattr(device, 'serial', None) or id(device)
+    meta = _devices.get(serial)
+    if meta is None or meta.d is not device:
+        meta = _devices[serial] = DeviceMetadata(device)
+    return meta
+
+
+def invalidate(serial):
+    """丢弃设备的元数据缓存，如设备断开或更换后"""
+    _devices.pop(serial, None)
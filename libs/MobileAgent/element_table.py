@@ -0,0 +1,190 @@
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from .hierarchy import parse_bounds
+
+
+FLAG_NAMES = ("clickable", "focusable", "longClickable", "scrollable", "checkable", "checked", "enabled", "selected")
+FLAG_BITS = {name: 1 << i for i, name in enumerate(FLAG_NAMES)}
+# dump_hierarchy() xml 中的属性名
+XML_FLAG_NAMES = {"clickable": "clickable", "focusable": "focusable", "longClickable": "long-clickable",
+                  "scrollable": "scrollable", "checkable": "checkable", "checked": "checked",
+                  "enabled": "enabled", "selected": "selected"}
+
+
+class StringPool:
+    """字符串驻留表，表中只保存整数id"""
+    def __init__(self):
+        self.strings = [""]
+        self._ids = {"": 0}
+
+    def intern(self, value):
+        value = value or ""
+        string_id = self._ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            self._ids[value] = string_id
+            self.strings.append(value)
+        return string_id
+
+    def lookup(self, ids):
+        return [self.strings[i] for i in ids]
+
+    def match(self, ids, predicate):
+        """只对ids中出现的不同字符串各判断一次，返回与ids对齐的布尔数组"""
+        ids = np.asarray(ids, dtype=np.int32)
+        if len(ids) == 0:
+            return np.zeros(0, dtype=bool)
+        unique, inverse = np.unique(ids, return_inverse=True)
+        matched = np.fromiter((bool(predicate(self.strings[i])) for i in unique.tolist()), dtype=bool, count=len(unique))
+        return matched[inverse.reshape(ids.shape)]
+
+
+class ElementTable:
+    def __init__(self, bounds, flags, class_ids, text_ids, desc_ids, resource_ids, pool, parents=None, cell_size=128):
+        """
+        一次UI快照中所有节点的列式表，配合网格空间索引做向量化过滤与坐标命中
+
+        :param bounds: N x 4 (left, top, right, bottom)
+        :param flags: N 位掩码，见 FLAG_BITS
+        :param parents: 父节点下标，来自 from_infos 时为None
+        :param cell_size: 空间索引网格边长(像素)
+        """
+        self.bounds = np.asarray(bounds, dtype=np.int32).reshape(-1, 4)
+        self.flags = np.asarray(flags, dtype=np.uint16)
+        self.class_ids = np.asarray(class_ids, dtype=np.int32)
+        self.text_ids = np.asarray(text_ids, dtype=np.int32)
+        self.desc_ids = np.asarray(desc_ids, dtype=np.int32)
+        self.resource_ids = np.asarray(resource_ids, dtype=np.int32)
+        self.pool = pool
+        self.parents = None if parents is None else np.asarray(parents, dtype=np.int32)
+        self.cell_size = cell_size
+        self._grid = None
+
+    def __len__(self):
+        return len(self.bounds)
+
+    @classmethod
+    def from_infos(cls, infos, pool=None):
+        """由uiautomator2元素的info字典构建，每个元素只读一次info"""
+        pool = pool or StringPool()
+        bounds, flags, class_ids, text_ids, desc_ids, resource_ids = [], [], [], [], [], []
+        for info in infos:
+            rect = info.get("bounds") or {}
+            bounds.append([rect.get("left", 0), rect.get("top", 0), rect.get("right", 0), rect.get("bottom", 0)])
+            flags.append(sum(bit for name, bit in FLAG_BITS.items() if info.get(name)))
+            class_ids.append(pool.intern(info.get("className")))
+            text_ids.append(pool.intern(info.get("text")))
+            desc_ids.append(pool.intern(info.get("contentDescription")))
+            resource_ids.append(pool.intern(info.get("resourceId") or info.get("resourceName")))
+        return cls(bounds, flags, class_ids, text_ids, desc_ids, resource_ids, pool)
+
+    @classmethod
+    def from_hierarchy(cls, hierarchy_xml, pool=None):
+        """由 dump_hierarchy() 的xml构建，按文档顺序(即绘制顺序)排列"""
+        pool = pool or StringPool()
+        root = ET.fromstring(hierarchy_xml.encode('utf-8') if isinstance(hierarchy_xml, str) else hierarchy_xml)
+        bounds, flags, class_ids, text_ids, desc_ids, resource_ids, parents = [], [], [], [], [], [], []
+        stack = [(child, -1) for child in reversed(list(root))]
+        while stack:
+            element, parent = stack.pop()
+            index = parent
+            if element.tag == "node":
+                box = parse_bounds(element.get("bounds"))
+                if box is not None:
+                    index = len(bounds)
+                    bounds.append(box)
+                    flags.append(sum(FLAG_BITS[name] for name, attr in XML_FLAG_NAMES.items() if element.get(attr) == "true"))
+                    class_ids.append(pool.intern(element.get("class")))
+                    text_ids.append(pool.intern(element.get("text")))
+                    desc_ids.append(pool.intern(element.get("content-desc")))
+                    resource_ids.append(pool.intern(element.get("resource-id")))
+                    parents.append(parent)
+            stack.extend((child, index) for child in reversed(list(element)))
+        return cls(bounds, flags, class_ids, text_ids, desc_ids, resource_ids, pool, parents)
+
+    def has_flag(self, name):
+        return (self.flags & FLAG_BITS[name]) != 0
+
+    @property
+    def widths(self):
+        return self.bounds[:, 2] - self.bounds[:, 0]
+
+    @property
+    def heights(self):
+        return self.bounds[:, 3] - self.bounds[:, 1]
+
+    def size_mask(self, min_width=10, min_height=10):
+        return (self.widths >= min_width) & (self.heights >= min_height)
+
+    def visible_mask(self, screen_width, screen_height):
+        """四条边都在屏幕范围内"""
+        b = self.bounds
+        return ((b[:, 0] >= 0) & (b[:, 0] <= screen_width) & (b[:, 2] >= 0) & (b[:, 2] <= screen_width)
+                & (b[:, 1] >= 0) & (b[:, 1] <= screen_height) & (b[:, 3] >= 0) & (b[:, 3] <= screen_height))
+
+    def blacklist_mask(self, blacklist):
+        """resourceId 包含黑名单中任意一项的节点为True"""
+        return self.pool.match(self.resource_ids, lambda s: s and any(item in s for item in blacklist))
+
+    def _build_grid(self):
+        grid = {}
+        cells = np.maximum(self.bounds, 0) // self.cell_size
+        for index, (left, top, right, bottom) in enumerate(cells.tolist()):
+            for cx in range(left, right + 1):
+                for cy in range(top, bottom + 1):
+                    grid.setdefault((cx, cy), []).append(index)
+        self._grid = {key: np.array(value, dtype=np.int32) for key, value in grid.items()}
+
+    def candidates(self, x, y):
+        if self._grid is None:
+            self._build_grid()
+        return self._grid.get((int(x) // self.cell_size, int(y) // self.cell_size), np.zeros(0, dtype=np.int32))
+
+    def hit_test(self, x, y, mask=None):
+        """返回坐标(x, y)处最上层(绘制顺序最后)的节点下标，没有时返回-1"""
+        indexes = self.candidates(x, y)
+        if len(indexes) == 0:
+            return -1
+        b = self.bounds[indexes]
+        inside = (b[:, 0] <= x) & (x < b[:, 2]) & (b[:, 1] <= y) & (y < b[:, 3])
+        if mask is not None:
+            inside &= mask[indexes]
+        hits = indexes[inside]
+        return int(hits.max()) if len(hits) else -1
+
+    def index_of(self, bounds):
+        """按bounds(字典或四元组)查找节点，有多个时返回最上层的，没有时返回-1"""
+        if isinstance(bounds, dict):
+            bounds = [bounds["left"], bounds["top"], bounds["right"], bounds["bottom"]]
+        matches = np.flatnonzero(np.all(self.bounds == np.asarray(bounds, dtype=np.int32), axis=1))
+        return int(matches[-1]) if len(matches) else -1
+
+    def is_ancestor(self, ancestor, index):
+        if self.parents is None:
+            b = self.bounds
+            return bool(np.all(b[ancestor, :2] <= b[index, :2]) and np.all(b[ancestor, 2:] >= b[index, 2:]))
+        while index >= 0:
+            index = self.parents[index]
+            if index == ancestor:
+                return True
+        return False
+
+    def occluders(self, index, min_ratio=0.5, mask=None):
+        """返回绘制在index之上、覆盖其面积超过min_ratio的非祖先/后代节点"""
+        b = self.bounds
+        later = np.arange(index + 1, len(b))
+        if mask is not None:
+            later = later[mask[later]]
+        if len(later) == 0:
+            return []
+        wh = np.clip(np.minimum(b[later, 2:], b[index, 2:]) - np.maximum(b[later, :2], b[index, :2]), 0, None)
+        inter = wh[:, 0] * wh[:, 1]
+        area = max(int(self.widths[index]) * int(self.heights[index]), 1)
+        covering = later[inter / area > min_ratio]
+        return [int(i) for i in covering if not self.is_ancestor(index, i) and not self.is_ancestor(i, index)]
+
+    def texts(self, indexes=None):
+        ids = self.text_ids if indexes is None else self.text_ids[indexes]
+        return self.pool.lookup(ids)
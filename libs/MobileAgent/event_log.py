@@ -0,0 +1,206 @@
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+
+# 事件类型
+SNAPSHOT = "snapshot"      # 截图与UI树快照
+ACTION = "action"          # 对元素的操作
+TRANSITION = "transition"  # 操作效果(hierarchy_diff分类)
+RECOVERY = "recovery"      # 恢复到操作前页面
+ERROR_EVENT = "error"      # 异常
+
+
+def parse_level(level):
+    """接受 10/20/30/40 或 "debug"/"info"/"warning"/"error" """
+    if isinstance(level, int):
+        return level
+    for value, name in LEVEL_NAMES.items():
+        if name == str(level).upper():
+            return value
+    raise ValueError(f"unknown level: {level}")
+
+
+def element_summary(info):
+    """只保留定位元素所需的字段，代替完整的info字典"""
+    bounds = info.get('bounds') or {}
+    return {
+        "class": (info.get('className') or "").rsplit('.', 1)[-1],
+        "rid": info.get('resourceId') or "",
+        "text": (info.get('text') or info.get('contentDescription') or "")[:30],
+        "bounds": [bounds.get('left', 0), bounds.get('top', 0), bounds.get('right', 0), bounds.get('bottom', 0)],
+    }
+
+
+class JsonlSink:
+    def __init__(self, path, max_bytes=8 * 1024 * 1024, backups=5):
+        """
+        按大小轮转的JSONL文件: path, path.1, ..., path.{backups}
+
+        :param max_bytes: 单个文件超过该大小时轮转
+        :param backups: 保留的历史文件数
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._file = open(path, 'a', encoding='utf-8')
+        self._size = self._file.tell()
+
+    def write(self, lines):
+        data = "".join(lines)
+        size = len(data.encode('utf-8'))
+        if self._size and self._size + size > self.max_bytes:
+            self._rotate()
+        self._file.write(data)
+        self._file.flush()
+        self._size += size
+
+    def _rotate(self):
+        self._file.close()
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._size = 0
+
+    def close(self):
+        self._file.close()
+
+
+class ConsoleRenderer:
+    def __init__(self, level=INFO):
+        """把事件渲染为一行简短文本"""
+        self.level = level
+
+    def render(self, event):
+        kind = event["type"]
+        fields = " ".join(f"{key}={self._format(value)}" for key, value in event.items()
+                          if key not in ("ts", "seq", "type", "level"))
+        stamp = time.strftime("%H:%M:%S", time.localtime(event["ts"]))
+        return f"{stamp} {LEVEL_NAMES.get(event['level'], event['level'])[0]} {kind:<10} {fields}"
+
+    @staticmethod
+    def _format(value):
+        if isinstance(value, dict) and "class" in value and "bounds" in value:
+            label = value["rid"].rsplit('/', 1)[-1] or value["text"]
+            return f"{value['class']}({label})@{value['bounds']}"
+        return value
+
+    def __call__(self, event):
+        if event["level"] >= self.level:
+            print(self.render(event))
+
+
+class EventLog:
+    def __init__(self, output_dir=None, level=INFO, console_level=INFO, filename="events.jsonl",
+                 max_bytes=8 * 1024 * 1024, backups=5, flush_interval=0.5, batch_size=256):
+        """
+        结构化事件日志，调用方只把事件放入队列，序列化、写文件与控制台输出都在后台线程完成
+
+        :param output_dir: 事件写入 output_dir/filename，None表示不写文件
+        :param level: 低于该级别的事件直接丢弃
+        :param console_level: 控制台输出级别，None表示不输出到控制台
+        :param flush_interval: 后台线程等待新事件的超时(秒)
+        :param batch_size: 单次最多写出的事件数
+        """
+        self.level = parse_level(level)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.sink = JsonlSink(os.path.join(output_dir, filename), max_bytes, backups) if output_dir else None
+        self.subscribers = []
+        if console_level is not None:
+            self.subscribers.append(ConsoleRenderer(parse_level(console_level)))
+        self._queue = queue.SimpleQueue()
+        self._counter = itertools.count(1)
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def subscribe(self, callback):
+        """在后台线程中按顺序接收每个事件字典"""
+        self.subscribers.append(callback)
+
+    def enabled_for(self, level):
+        return level >= self.level and not self._closed
+
+    def emit(self, kind, level=INFO, **fields):
+        """记录事件；可调用的字段值只在事件未被级别过滤时才调用求值，用于延迟构造开销大的字段"""
+        if not self.enabled_for(level):
+            return
+        for key, value in fields.items():
+            if callable(value):
+                fields[key] = value()
+        fields.update(ts=time.time(), seq=next(self._counter), type=kind, level=level)
+        self._queue.put(fields)
+
+    def snapshot(self, **fields):
+        self.emit(SNAPSHOT, **fields)
+
+    def action(self, **fields):
+        self.emit(ACTION, **fields)
+
+    def transition(self, **fields):
+        self.emit(TRANSITION, **fields)
+
+    def recovery(self, **fields):
+        self.emit(RECOVERY, WARNING, **fields)
+
+    def error(self, **fields):
+        self.emit(ERROR_EVENT, ERROR, **fields)
+
+    def debug(self, kind, **fields):
+        self.emit(kind, DEBUG, **fields)
+
+    def _run(self):
+        while True:
+            try:
+                event = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            # 取出队列中已有的事件一起写出
+            batch = []
+            while event is not None:
+                batch.append(event)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    event = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            self._flush(batch)
+            if event is None:
+                break
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        if self.sink:
+            try:
+                self.sink.write([json.dumps(event, ensure_ascii=False, default=str) + "\n" for event in batch])
+            except Exception as e:
+                print(f"写入事件日志失败: {str(e)}")
+        for event in batch:
+            for callback in self.subscribers:
+                try:
+                    callback(event)
+                except Exception as e:
+                    print(f"事件处理失败: {str(e)}")
+
+    def close(self):
+        """写出剩余事件并停止后台线程"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        if self.sink:
+            self.sink.close()
@@ -0,0 +1,186 @@
+import hashlib
+import time
+import xml.etree.ElementTree as ET
+
+
+DEFAULT_WEIGHTS = {
+    "unseen_resource_id": 3.0,   # 从未操作过的resource-id
+    "unseen_class": 1.5,         # 从未操作过的控件类型
+    "target_novelty": 2.0,       # 元素(或同类元素)历史上到达的页面越少被访问、与其他已知页面差异越大越高
+    "kind_yield": 4.0,           # 同类元素历史上打开新页面的比例
+}
+
+
+def element_kind(info):
+    """同类元素: 相同控件类型与resource-id(无id时只看类型)"""
+    return info.get("className") or "", info.get("resourceId") or ""
+
+
+def element_key(info, screen_signature=None):
+    """同一页面上的同一元素: 页面签名、元素类型与文字"""
+    return screen_signature, element_kind(info), info.get("text") or ""
+
+
+def structure_parts(hierarchy_xml):
+    """页面中去重后的(package, class, resource-id)集合"""
+    root = ET.fromstring(hierarchy_xml.encode('utf-8') if isinstance(hierarchy_xml, str) else hierarchy_xml)
+    return frozenset((element.get("package") or "", element.get("class") or "", element.get("resource-id") or "")
+                     for element in root.iter("node"))
+
+
+def parts_signature(parts):
+    return hashlib.md5(repr(sorted(parts)).encode('utf-8')).hexdigest()
+
+
+def structure_signature(hierarchy_xml):
+    """页面结构签名: 窗口包名与去重后的(class, resource-id)集合，不受文字与列表滚动位置影响"""
+    return parts_signature(structure_parts(hierarchy_xml))
+
+
+def jaccard_distance(a, b):
+    union = len(a | b)
+    return 1.0 - len(a & b) / union if union else 0.0
+
+
+class NoveltyScheduler:
+    def __init__(self, time_budget=None, weights=None):
+        """
+        按预期新颖度给待探索元素排序，并在时间预算耗尽时停止
+
+        :param time_budget: 时间预算(秒)，None表示不限时
+        :param weights: 覆盖 DEFAULT_WEIGHTS 中的权重
+        """
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self.started_at = time.monotonic()
+        self.deadline = None if time_budget is None else self.started_at + time_budget
+        self.seen_resource_ids = set()
+        self.seen_classes = set()
+        self.screen_visits = {}
+        self.screen_parts = {}  # 页面签名 -> structure_parts，用于计算页面间距离
+        self.element_targets = {}  # element_key -> 操作后到达的页面签名
+        self.kind_targets = {}  # 元素类型 -> {到达过的页面签名}
+        self._distances = {}  # 页面签名 -> 与其他已知页面的最小距离，登记新页面时清空
+        self.kind_stats = {}  # 元素类型 -> [操作次数, 打开新页面次数]
+        self.effects = {}
+        self.operated = 0
+        self.stopped_by_budget = False
+
+    def remaining(self):
+        if self.deadline is None:
+            return float("inf")
+        return self.deadline - time.monotonic()
+
+    def expired(self):
+        if self.remaining() <= 0:
+            self.stopped_by_budget = True
+            return True
+        return False
+
+    def _register_parts(self, signature, parts):
+        if parts is not None and signature not in self.screen_parts:
+            self.screen_parts[signature] = parts
+            self._distances.clear()
+
+    def visit_screen(self, signature, parts=None):
+        """登记一次页面访问，首次访问返回True"""
+        self._register_parts(signature, parts)
+        visits = self.screen_visits.get(signature, 0)
+        self.screen_visits[signature] = visits + 1
+        return visits == 0
+
+    def discover_screen(self, signature, parts=None):
+        """页面未登记过时登记，已登记时不增加访问次数"""
+        self._register_parts(signature, parts)
+        if signature in self.screen_visits:
+            return False
+        self.screen_visits[signature] = 1
+        return True
+
+    def screen_distance(self, signature):
+        """页面与其他已知页面的最小Jaccard距离，结构未知或没有其他页面时为1"""
+        distance = self._distances.get(signature)
+        if distance is None:
+            parts = self.screen_parts.get(signature)
+            others = [other for key, other in self.screen_parts.items() if key != signature]
+            distance = 1.0 if parts is None or not others else min(jaccard_distance(parts, other) for other in others)
+            self._distances[signature] = distance
+        return distance
+
+    def target_novelty(self, signature):
+        """到达页面的新颖度: 与其他已知页面差异越大、被访问次数越少越高"""
+        return self.screen_distance(signature) / (1 + self.screen_visits.get(signature, 0))
+
+    def novelty(self, info, screen_signature=None):
+        """
+        元素的预期新颖度，取值0~1
+        元素本身操作过时按其到达的页面计算，否则按同类元素到达过的页面平均，都没有时为1
+        """
+        target = self.element_targets.get(element_key(info, screen_signature))
+        if target is not None:
+            return self.target_novelty(target)
+        targets = self.kind_targets.get(element_kind(info))
+        if not targets:
+            return 1.0
+        return sum(self.target_novelty(t) for t in targets) / len(targets)
+
+    def score(self, info, screen_signature=None):
+        kind = element_kind(info)
+        attempts, found = self.kind_stats.get(kind, (0, 0))
+        w = self.weights
+        score = 0.0
+        if kind[1] and kind[1] not in self.seen_resource_ids:
+            score += w["unseen_resource_id"]
+        if kind[0] not in self.seen_classes:
+            score += w["unseen_class"]
+        score += w["target_novelty"] * self.novelty(info, screen_signature)
+        # 拉普拉斯平滑，未尝试过的类型按0.5估计
+        score += w["kind_yield"] * (found + 1) / (attempts + 2)
+        return score
+
+    def order(self, elements, infos, screen_signature=None):
+        """按当前分数从高到低一次性排序，分数相同时保持原顺序"""
+        scores = [self.score(info, screen_signature) for info in infos]
+        ranked = sorted(range(len(elements)), key=lambda i: -scores[i])
+        return [elements[i] for i in ranked]
+
+    def iter_ranked(self, elements, infos, screen_signature=None):
+        """每次取出剩余元素中分数最高的一个，两次取出之间 record() 的结果会影响后续排序"""
+        remaining = list(range(len(elements)))
+        while remaining:
+            best = max(remaining, key=lambda i: (self.score(infos[i], screen_signature), -i))
+            remaining.remove(best)
+            yield elements[best]
+
+    def record(self, info, effect, new_screen, target=None, screen_signature=None):
+        """
+        登记一次操作结果
+
+        :param target: 操作后到达的页面签名，仍在原页面时为None
+        :param screen_signature: 元素所在页面签名
+        """
+        kind = element_kind(info)
+        if target is not None:
+            self.element_targets[element_key(info, screen_signature)] = target
+            self.kind_targets.setdefault(kind, set()).add(target)
+        stats = self.kind_stats.setdefault(kind, [0, 0])
+        stats[0] += 1
+        stats[1] += int(bool(new_screen))
+        if kind[1]:
+            self.seen_resource_ids.add(kind[1])
+        self.seen_classes.add(kind[0])
+        self.effects[effect] = self.effects.get(effect, 0) + 1
+        self.operated += 1
+
+    def summary(self):
+        elapsed = time.monotonic() - self.started_at
+        screens = len(self.screen_visits)
+        return {
+            "elapsed_seconds": round(elapsed, 1),
+            "stopped_by_budget": self.stopped_by_budget,
+            "screens": screens,
+            "screens_per_minute": round(screens / max(elapsed / 60, 1e-9), 2),
+            "operated_elements": self.operated,
+            "resource_ids": len(self.seen_resource_ids),
+            "classes": len(self.seen_classes),
+            "effects": dict(self.effects),
+        }
@@ -0,0 +1,71 @@
+import re
+import xml.etree.ElementTree as ET
+
+
+BOUNDS_PATTERN = re.compile(r"\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]")
+
+# UI树无法描述其中文字的控件
+OPAQUE_CLASSES = (
+    "android.webkit.WebView",
+    "android.view.SurfaceView",
+    "android.view.TextureView",
+    "android.widget.ImageView",
+    "android.widget.VideoView",
+)
+
+
+def parse_bounds(bounds):
+    match = BOUNDS_PATTERN.match(bounds or "")
+    if not match:
+        return None
+    return [int(v) for v in match.groups()]
+
+
+def parse_hierarchy(hierarchy_xml):
+    """解析 dump_hierarchy() 的xml，返回节点列表: {class, text, desc, resource_id, box, has_text_child}"""
+    root = ET.fromstring(hierarchy_xml.encode('utf-8') if isinstance(hierarchy_xml, str) else hierarchy_xml)
+    nodes = []
+
+    def visit(element):
+        has_text = False
+        for child in element:
+            has_text = visit(child) or has_text
+        if element.tag != "node":
+            return has_text
+        box = parse_bounds(element.get("bounds"))
+        text = element.get("text") or ""
+        desc = element.get("content-desc") or ""
+        if box is not None:
+            nodes.append({
+                "class": element.get("class") or "",
+                "text": text,
+                "desc": desc,
+                "resource_id": element.get("resource-id") or "",
+                "box": box,
+                "has_text_child": has_text,
+            })
+        return has_text or bool(text or desc)
+
+    visit(root)
+    return nodes
+
+
+def is_uninformative(nodes, width, height, min_labelled=3, opaque_ratio=0.5):
+    """
+    判断UI树是否不足以区分画面: 有标识的节点太少，或者WebView/画布等占据了大部分屏幕
+
+    :param nodes: parse_hierarchy() 的结果
+    :param min_labelled: 有text/content-desc/resource-id的节点少于该数量视为不足
+    :param opaque_ratio: 无文字描述的不透明控件面积占比超过该值视为不足
+    """
+    labelled = sum(1 for node in nodes if node["text"] or node["desc"] or node["resource_id"])
+    if labelled < min_labelled:
+        return True
+    screen_area = max(width * height, 1)
+    for node in nodes:
+        if node["has_text_child"] or not node["class"].startswith(OPAQUE_CLASSES):
+            continue
+        left, top, right, bottom = node["box"]
+        if max(0, right - left) * max(0, bottom - top) > opaque_ratio * screen_area:
+            return True
+    return False
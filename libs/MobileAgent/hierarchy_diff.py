@@ -0,0 +1,148 @@
+import xml.etree.ElementTree as ET
+
+from .hierarchy import parse_bounds
+
+
+NO_OP = "no_op"              # 界面没有变化
+IN_PLACE = "in_place"        # 原地变化，如开关、复选框状态切换或被点击元素自身的内容变化
+OVERLAY = "overlay"          # 弹出对话框、菜单等新窗口
+NEW_SCREEN = "new_screen"    # 进入了新页面
+APP_LEFT = "app_left"        # 离开了被测应用
+
+# 参与比较的节点属性
+CONTENT_ATTRS = ("text", "content-desc", "checked", "selected", "focused", "enabled", "bounds")
+# 只有这些状态属性变化时，无论发生在哪里都视为原地变化
+STATE_ATTRS = ("checked", "selected", "focused")
+
+
+def index_nodes(hierarchy_xml):
+    """
+    按结构路径索引UI树节点
+
+    :return: (windows, nodes)，windows为顶层窗口key列表，nodes为 {路径key: element}
+    路径key由窗口标识与逐层的(class, index)组成，不受文字内容影响
+    """
+    root = ET.fromstring(hierarchy_xml.encode('utf-8') if isinstance(hierarchy_xml, str) else hierarchy_xml)
+    windows, nodes = [], {}
+    for window in root:
+        if window.tag != "node":
+            continue
+        # 顶层窗口以包名、类名与范围标识，窗口插入时其余窗口的key保持不变
+        window_key = (window.get("package") or "", window.get("class") or "", window.get("bounds") or "")
+        windows.append(window_key)
+        stack = [(window, (window_key,))]
+        while stack:
+            element, key = stack.pop()
+            nodes[key] = element
+            for position, child in enumerate(element):
+                if child.tag == "node":
+                    stack.append((child, key + ((child.get("class") or "", child.get("index") or str(position)),)))
+    return windows, nodes
+
+
+def window_packages(windows):
+    return {package for package, _, _ in windows if package}
+
+
+def window_area(window):
+    box = parse_bounds(window[2])
+    if box is None:
+        return 0
+    return max(0, box[2] - box[0]) * max(0, box[3] - box[1])
+
+
+def common_prefix(keys):
+    """多个路径key的最长公共前缀，即变化节点的最近公共祖先"""
+    keys = list(keys)
+    if not keys:
+        return ()
+    prefix = keys[0]
+    for key in keys[1:]:
+        length = 0
+        for a, b in zip(prefix, key):
+            if a != b:
+                break
+            length += 1
+        prefix = prefix[:length]
+    return prefix
+
+
+def bounds_text(bounds):
+    """uiautomator2 info中的bounds字典转为xml中的 [left,top][right,bottom] 格式"""
+    if isinstance(bounds, dict):
+        return f"[{bounds['left']},{bounds['top']}][{bounds['right']},{bounds['bottom']}]"
+    return bounds
+
+
+def target_subtree(nodes, target_bounds, max_nodes):
+    """
+    被操作元素在UI树中的路径key，bounds相同的多个节点取最外层的
+
+    :return: 子树节点数不超过max_nodes时返回key，否则返回None
+    """
+    target = bounds_text(target_bounds)
+    keys = [key for key, element in nodes.items() if element.get("bounds") == target]
+    if not keys:
+        return None
+    target_key = min(keys, key=len)
+    size = sum(1 for key in nodes if key[:len(target_key)] == target_key)
+    return target_key if size <= max_nodes else None
+
+
+def diff_hierarchies(before_xml, after_xml, app_package=None, before_app=None, after_app=None, target_bounds=None,
+                     in_place_nodes=30, overlay_area=0.9):
+    """
+    比较操作前后的UI树，对操作效果分类
+    原地变化只包括: 仅有选中/勾选/焦点状态变化，或全部变化都在被操作元素的(较小)子树内；
+    结构相同而其他位置文字变化的子页面视为新页面
+
+    :param app_package: 被测应用包名，操作后所有窗口都不属于该包时判定为离开应用
+    :param before_app: 操作前 app_current() 的结果，与after_app的包名或activity不同时判定为新页面
+    :param after_app: 操作后 app_current() 的结果
+    :param target_bounds: 被操作元素的bounds(字典或xml格式)
+    :param in_place_nodes: 被操作元素子树节点数超过该值时，其中的变化不视为原地变化
+    :param overlay_area: 只导出活动窗口时，新窗口面积小于原窗口的该比例视为弹窗
+    :return: {"effect", "changed", "added", "removed", "subtree_key", "subtree"}，
+             subtree为操作后树中包含全部变化的最小子树(xml字符串)，无变化或子树已被移除时为None
+    """
+    before_windows, before_nodes = index_nodes(before_xml)
+    after_windows, after_nodes = index_nodes(after_xml)
+    before_keys, after_keys = before_nodes.keys(), after_nodes.keys()
+    added = [key for key in after_nodes if key not in before_nodes]
+    removed = [key for key in before_nodes if key not in after_nodes]
+    changed = [key for key in before_keys & after_keys
+               if any(before_nodes[key].get(attr) != after_nodes[key].get(attr) for attr in CONTENT_ATTRS)]
+    result = {"added": added, "removed": removed, "changed": changed, "subtree_key": None, "subtree": None}
+
+    if app_package and app_package not in window_packages(after_windows):
+        result["effect"] = APP_LEFT
+        return result
+    if before_app and after_app and any(before_app.get(k) != after_app.get(k) for k in ("package", "activity")):
+        result["effect"] = NEW_SCREEN
+        return result
+    if not (added or removed or changed):
+        result["effect"] = NO_OP
+        return result
+
+    subtree_key = common_prefix(added + removed + changed)
+    if subtree_key in after_nodes:
+        result["subtree_key"] = subtree_key
+        result["subtree"] = ET.tostring(after_nodes[subtree_key], encoding="unicode")
+
+    new_windows = [window for window in after_windows if window not in before_windows]
+    surviving = [window for window in before_windows if window in after_windows]
+    state_only = not (added or removed) and all(
+        before_nodes[key].get(attr) == after_nodes[key].get(attr)
+        for key in changed for attr in CONTENT_ATTRS if attr not in STATE_ATTRS)
+    target_key = None if target_bounds is None else target_subtree(before_nodes, target_bounds, in_place_nodes)
+    in_target = target_key is not None and all(key[:len(target_key)] == target_key for key in added + removed + changed)
+    largest_before = max((window_area(window) for window in before_windows), default=0)
+    if new_windows and (surviving or all(window_area(window) < overlay_area * largest_before for window in new_windows)):
+        # 原窗口仍在(或只导出了活动窗口而新窗口明显小于原窗口)，新增了对话框、菜单等窗口
+        result["effect"] = OVERLAY
+    elif state_only or in_target:
+        result["effect"] = IN_PLACE
+    else:
+        result["effect"] = NEW_SCREEN
+    return result
+
@@ -1,39 +1,19 @@
-import torch
-from crop import calculate_size, calculate_iou
+import numpy as np
+from MobileAgent.box_ops import cxcywh_to_xyxy, area_mask, nms_in_order, pad_boxes
 from PIL import Image
 
 
 def remove_boxes(boxes_filt, size, iou_threshold=0.5):
-    boxes_to_remove = set()
-
-    for i in range(len(boxes_filt)):
-        if calculate_size(boxes_filt[i]) > 0.05*size[0]*size[1]:
-            boxes_to_remove.add(i)
-        for j in range(len(boxes_filt)):
-            if calculate_size(boxes_filt[j]) > 0.05*size[0]*size[1]:
-                boxes_to_remove.add(j)
-            if i == j:
-                continue
-            if i in boxes_to_remove or j in boxes_to_remove:
-                continue
-            iou = calculate_iou(boxes_filt[i], boxes_filt[j])
-            if iou >= iou_threshold:
-                boxes_to_remove.add(j)
-
-    boxes_filt = [box for idx, box in enumerate(boxes_filt) if idx not in boxes_to_remove]
+    if len(boxes_filt) == 0:
+        return []
+    boxes = np.asarray(boxes_filt)
+    candidates = area_mask(boxes, 0.05*size[0]*size[1])
+    keep = nms_in_order(boxes, iou_threshold, candidates)
     
-    return boxes_filt
+    return boxes[keep].tolist()
 
 
-def det(input_image_path, caption, groundingdino_model, box_threshold=0.05, text_threshold=0.5):
-    image = Image.open(input_image_path)
-    size = image.size
-
-    caption = caption.lower()
-    caption = caption.strip()
-    if not caption.endswith('.'):
-        caption = caption + '.'
-    
+def detect_boxes(input_image_path, caption, groundingdino_model, box_threshold, text_threshold, size):
     inputs = {
         'IMAGE_PATH': input_image_path,
         'TEXT_PROMPT': caption,
@@ -44,19 +24,26 @@ def det(input_image_path, caption, groundingdino_model, box_threshold=0.05, text
     result = groundingdino_model(inputs)
     boxes_filt = result['boxes']
 
-    H, W = size[1], size[0]
-    for i in range(boxes_filt.size(0)):
-        boxes_filt[i] = boxes_filt[i] * torch.Tensor([W, H, W, H])
-        boxes_filt[i][:2] -= boxes_filt[i][2:] / 2
-        boxes_filt[i][2:] += boxes_filt[i][:2]
+    boxes_filt = cxcywh_to_xyxy(boxes_filt.cpu().numpy(), size[0], size[1])
+    return remove_boxes(boxes_filt, size)
+
 
-    boxes_filt = boxes_filt.cpu().int().tolist()
-    filtered_boxes = remove_boxes(boxes_filt, size)
+def det(input_image_path, caption, groundingdino_model, box_threshold=0.05, text_threshold=0.5, cache=None):
+    image = Image.open(input_image_path)
+    size = image.size
+
+    caption = caption.lower()
+    caption = caption.strip()
+    if not caption.endswith('.'):
+        caption = caption + '.'
+    
+    if cache is None:
+        filtered_boxes = detect_boxes(input_image_path, caption, groundingdino_model, box_threshold, text_threshold, size)
+    else:
+        key = cache.make_key("det", groundingdino_model, cache.image_key(image), (caption, box_threshold, text_threshold))
+        filtered_boxes = cache.get_or_compute(key, lambda: detect_boxes(input_image_path, caption, groundingdino_model, box_threshold, text_threshold, size))
     
-    coordinate = []
-    image_data = []
-    for box in filtered_boxes:
-        image_data.append([max(0, box[0]-10), max(0, box[1]-10), min(box[2]+10, size[0]), min(box[3]+10, size[1])])
-        coordinate.append([max(0, box[0]-25), max(0, box[1]-25), min(box[2]+25, size[0]), min(box[3]+25, size[1])])
+    image_data = pad_boxes(filtered_boxes, 10, size[0], size[1]).tolist()
+    coordinate = pad_boxes(filtered_boxes, 25, size[0], size[1]).tolist()
 
     return image_data, coordinate
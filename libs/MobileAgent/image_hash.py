@@ -0,0 +1,92 @@
+import hashlib
+
+import numpy as np
+from PIL import Image
+
+from .image_payload import load_image
+
+
+def content_hash(image):
+    """解码后像素的精确哈希(含尺寸与色彩模式)，任何像素变化都会得到不同结果"""
+    image = load_image(image)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode('utf-8'))
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def dhash(image, hash_size=16):
+    """差值哈希: 缩放为(hash_size+1) x hash_size灰度图，比较相邻像素，返回十六进制字符串"""
+    gray = load_image(image).convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = np.asarray(gray, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).reshape(-1)
+    return np.packbits(bits).tobytes().hex()
+
+
+_dct_matrices = {}
+
+
+def _dct_matrix(n):
+    if n not in _dct_matrices:
+        k = np.arange(n)[:, None]
+        x = np.arange(n)[None, :]
+        _dct_matrices[n] = np.cos(np.pi * (2 * x + 1) * k / (2 * n))
+    return _dct_matrices[n]
+
+
+def phash(image, hash_size=8, highfreq_factor=4):
+    """DCT感知哈希: 取缩略图DCT低频部分与中位数比较，返回十六进制字符串"""
+    size = hash_size * highfreq_factor
+    gray = load_image(image).convert("L").resize((size, size), Image.BILINEAR)
+    pixels = np.asarray(gray, dtype=np.float64)
+    matrix = _dct_matrix(size)
+    low = (matrix @ pixels @ matrix.T)[:hash_size, :hash_size]
+    bits = (low > np.median(low)).reshape(-1)
+    return np.packbits(bits).tobytes().hex()
+
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def hamming(hash1, hash2):
+    """两个十六进制哈希之间的汉明距离"""
+    a = np.frombuffer(bytes.fromhex(hash1), dtype=np.uint8)
+    b = np.frombuffer(bytes.fromhex(hash2), dtype=np.uint8)
+    return int(_POPCOUNT[a ^ b].sum())
+
+
+class HashIndex:
+    def __init__(self, max_distance=6):
+        """
+        感知哈希近似查重索引，一次向量化计算与所有已知哈希的汉明距离
+
+        :param max_distance: 汉明距离不超过该值视为同一画面
+        """
+        self.max_distance = max_distance
+        self.keys = []
+        self._bits = None
+
+    def __len__(self):
+        return len(self.keys)
+
+    def nearest(self, key):
+        """返回(最接近的已知哈希, 距离)，索引为空时返回(None, None)"""
+        if not self.keys:
+            return None, None
+        query = np.frombuffer(bytes.fromhex(key), dtype=np.uint8)
+        distances = _POPCOUNT[self._bits ^ query].sum(axis=1, dtype=np.int32)
+        index = int(np.argmin(distances))
+        return self.keys[index], int(distances[index])
+
+    def add(self, key):
+        row = np.frombuffer(bytes.fromhex(key), dtype=np.uint8)[None, :]
+        self._bits = row.copy() if self._bits is None else np.vstack([self._bits, row])
+        self.keys.append(key)
+
+    def lookup_or_add(self, key):
+        """已有近似画面时返回其哈希，否则登记为新画面并返回自身"""
+        nearest, distance = self.nearest(key)
+        if nearest is not None and distance <= self.max_distance:
+            return nearest
+        self.add(key)
+        return key
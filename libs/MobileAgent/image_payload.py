@@ -0,0 +1,146 @@
+import base64
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+from PIL import Image
+
+
+# 各模型的上传分辨率(长边像素)与JPEG质量，max_side为None时保持原分辨率
+MODEL_PROFILES = {
+    "default": {"max_side": 1280, "quality": 80},
+    "deepseek-chat": {"max_side": 1280, "quality": 80},
+    # Mobile Agent服务端返回的是截图上的点击坐标，缩放后坐标无法对应到屏幕，只压缩不缩放
+    "pre-Mobile_Agent_Server-1664": {"max_side": None, "quality": 85},
+}
+
+
+def get_profile(model=None):
+    """获取模型对应的压缩参数，未配置的模型使用default"""
+    return MODEL_PROFILES.get(model, MODEL_PROFILES["default"])
+
+
+def load_image(image):
+    """
+    路径、PIL图片或numpy数组统一转换为PIL图片
+
+    numpy数组按OpenCV约定视为BGR/BGRA(cv2.imread、cv2截图的结果)，转换为RGB/RGBA；单通道数组按灰度图处理
+    """
+    if isinstance(image, Image.Image):
+        return image
+    if isinstance(image, np.ndarray):
+        if image.ndim == 3 and image.shape[2] == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        elif image.ndim == 3 and image.shape[2] == 4:
+            image = cv2.cvtColor(image, cv2.COLOR_BGRA2RGBA)
+        return Image.fromarray(image)
+    return Image.open(image)
+
+
+def compress_image(raw, max_side, quality):
+    """在内存中缩放并压缩为JPEG，返回JPEG字节；max_side为None时不缩放"""
+    image = Image.open(io.BytesIO(raw))
+    width, height = image.size
+    scale = max_side / max(width, height) if max_side else 1
+    if scale < 1:
+        image = image.resize((max(1, int(width * scale)), max(1, int(height * scale))), Image.LANCZOS)
+    buffer = io.BytesIO()
+    image.convert("RGB").save(buffer, "JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+class ImagePayloadCache:
+    def __init__(self, max_entries=64, max_bytes=64 * 1024 * 1024):
+        """
+        按内容哈希缓存编码后的图片(base64)
+
+        :param max_entries: 最大缓存条目数
+        :param max_bytes: 缓存的base64总字节上限
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.raw_bytes = 0
+        self.sent_bytes = 0
+
+    def encode(self, image, model=None):
+        """
+        返回图片的base64编码，重复图片直接命中缓存
+
+        :param image: 图片路径或原始字节
+        :param model: 模型名，决定分辨率与质量
+        """
+        if isinstance(image, (bytes, bytearray)):
+            raw = bytes(image)
+        else:
+            with open(image, "rb") as image_file:
+                raw = image_file.read()
+        profile = get_profile(model)
+        key = (hashlib.sha1(raw).hexdigest(), profile["max_side"], profile["quality"])
+
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.raw_bytes += len(raw)
+                self.sent_bytes += len(payload) * 3 // 4
+                return payload
+
+        jpeg = compress_image(raw, profile["max_side"], profile["quality"])
+        # 原图本身是更小的JPEG时直接使用原图
+        if len(jpeg) >= len(raw) and raw[:3] == b"\xff\xd8\xff":
+            jpeg = raw
+        payload = base64.b64encode(jpeg).decode('utf-8')
+
+        with self._lock:
+            self.misses += 1
+            self.raw_bytes += len(raw)
+            self.sent_bytes += len(jpeg)
+            if key not in self._entries:
+                self._entries[key] = payload
+                self._size += len(payload)
+            self._evict()
+        return payload
+
+    def _evict(self):
+        """按LRU淘汰超出数量或容量上限的条目"""
+        while self._entries and (len(self._entries) > self.max_entries or self._size > self.max_bytes):
+            _, payload = self._entries.popitem(last=False)
+            self._size -= len(payload)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        """返回命中率与节省的上传字节数"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "raw_bytes": self.raw_bytes,
+                "sent_bytes": self.sent_bytes,
+                "saved_bytes": self.raw_bytes - self.sent_bytes,
+            }
+
+
+_default_cache = ImagePayloadCache()
+
+
+def encode_image(image, model=None):
+    """使用全局缓存编码图片"""
+    return _default_cache.encode(image, model)
+
+
+def payload_stats():
+    return _default_cache.stats()
@@ -0,0 +1,137 @@
+import cv2
+import numpy as np
+
+from MobileAgent.text_grounding import ocr_regions
+from MobileAgent.text_localization import detect_and_recognize, locate_text
+
+
+def changed_tiles(prev_gray, curr_gray, tile=32, pixel_threshold=24, min_pixels=2):
+    """
+    按tile x tile分块统计灰度差超过pixel_threshold的像素数，返回变化块的布尔矩阵
+    按像素计数而不是块内平均，单个数字的笔画变化('1'->'7')也能被发现
+    """
+    h, w = curr_gray.shape
+    rows, cols = -(-h // tile), -(-w // tile)
+    pad = ((0, rows * tile - h), (0, cols * tile - w))
+    changed = np.abs(curr_gray.astype(np.int16) - prev_gray.astype(np.int16)) > pixel_threshold
+    changed = np.pad(changed, pad)
+    return changed.reshape(rows, tile, cols, tile).sum(axis=(1, 3)) >= min_pixels
+
+
+def tile_regions(mask, tile, shape, margin=1):
+    """把相邻的变化块合并为矩形区域(像素坐标)，每个区域向外扩展margin个块"""
+    if not mask.any():
+        return []
+    mask = cv2.dilate(mask.astype(np.uint8), np.ones((2 * margin + 1, 2 * margin + 1), np.uint8))
+    count, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    h, w = shape[:2]
+    regions = []
+    for i in range(1, count):
+        col, row, width, height = stats[i, :4]
+        regions.append([int(col * tile), int(row * tile), int(min((col + width) * tile, w)), int(min((row + height) * tile, h))])
+    return regions
+
+
+def merge_regions(regions):
+    """合并相互重叠的区域，避免同一文字被重复识别"""
+    merged = []
+    for region in sorted(regions):
+        for other in merged:
+            if region[0] < other[2] and region[2] > other[0] and region[1] < other[3] and region[3] > other[1]:
+                other[:] = [min(region[0], other[0]), min(region[1], other[1]), max(region[2], other[2]), max(region[3], other[3])]
+                break
+        else:
+            merged.append(list(region))
+    if len(merged) < len(regions):
+        return merge_regions(merged)
+    return merged
+
+
+def point_boxes(points):
+    """OCR四点框 -> (x1, y1, x2, y2) 数组"""
+    if len(points) == 0:
+        return np.zeros((0, 4), dtype=np.float32)
+    stacked = np.stack(points)
+    return np.concatenate([stacked.min(axis=1), stacked.max(axis=1)], axis=1)
+
+
+def intersects(boxes, region):
+    return (boxes[:, 0] < region[2]) & (boxes[:, 2] > region[0]) & (boxes[:, 1] < region[3]) & (boxes[:, 3] > region[1])
+
+
+class IncrementalOCR:
+    def __init__(self, ocr_detection, ocr_recognition, tile=32, pixel_threshold=24, min_pixels=2, max_changed_ratio=0.5):
+        """
+        只对变化区域重新OCR，未变化区域沿用已有结果
+        每个区域与它上一次被OCR时的画面比较，多帧累积的缓慢变化也会被发现
+
+        :param tile: 差分块边长(像素)
+        :param pixel_threshold: 灰度差超过该值的像素视为变化
+        :param min_pixels: 块内变化像素数达到该值视为变化块
+        :param max_changed_ratio: 变化块比例超过该值时直接整屏OCR
+        """
+        self.ocr_detection = ocr_detection
+        self.ocr_recognition = ocr_recognition
+        self.tile = tile
+        self.pixel_threshold = pixel_threshold
+        self.min_pixels = min_pixels
+        self.max_changed_ratio = max_changed_ratio
+        # 各像素最近一次被OCR时的灰度图
+        self._reference = None
+        self.points = []
+        self.texts = []
+        self.last_changed_ratio = 1.0
+
+    def reset(self):
+        self._reference = None
+        self.points = []
+        self.texts = []
+
+    def update(self, image_path):
+        """处理新一帧截图，返回(points, texts)"""
+        image_full = cv2.imread(image_path)
+        gray = cv2.cvtColor(image_full, cv2.COLOR_BGR2GRAY)
+        if self._reference is None or self._reference.shape != gray.shape:
+            return self._full(image_path, gray)
+
+        mask = changed_tiles(self._reference, gray, self.tile, self.pixel_threshold, self.min_pixels)
+        self.last_changed_ratio = float(mask.mean())
+        if self.last_changed_ratio > self.max_changed_ratio:
+            return self._full(image_path, gray)
+        if self.last_changed_ratio == 0:
+            return self.points, self.texts
+
+        regions = tile_regions(mask, self.tile, gray.shape)
+        boxes = point_boxes(self.points)
+        stale = np.zeros(len(boxes), dtype=bool)
+        for region in regions:
+            hit = intersects(boxes, region)
+            if hit.any():
+                # 区域扩展到完整覆盖被打断的旧文字框，避免文字被截断
+                region[0] = int(max(0, min(region[0], boxes[hit, 0].min())))
+                region[1] = int(max(0, min(region[1], boxes[hit, 1].min())))
+                region[2] = int(min(gray.shape[1], max(region[2], boxes[hit, 2].max())))
+                region[3] = int(min(gray.shape[0], max(region[3], boxes[hit, 3].max())))
+        regions = merge_regions(regions)
+        for region in regions:
+            stale |= intersects(boxes, region)
+            self._reference[region[1]:region[3], region[0]:region[2]] = gray[region[1]:region[3], region[0]:region[2]]
+
+        kept_points = [pts for pts, drop in zip(self.points, stale) if not drop]
+        kept_texts = [text for text, drop in zip(self.texts, stale) if not drop]
+        new_points, new_texts = ocr_regions(image_full, regions, self.ocr_detection, self.ocr_recognition)
+        self.points = kept_points + new_points
+        self.texts = kept_texts + new_texts
+        return self.points, self.texts
+
+    def _full(self, image_path, gray):
+        self._reference = gray.copy()
+        self.last_changed_ratio = 1.0
+        self.points, self.texts = detect_and_recognize(image_path, self.ocr_detection, self.ocr_recognition)
+        return self.points, self.texts
+
+    def ocr(self, image_path, prompt, x, y):
+        """与 ocr() 相同的返回格式"""
+        points, texts = self.update(image_path)
+        ih, iw = self._reference.shape
+        return locate_text(points, texts, prompt, iw, ih, x, y)
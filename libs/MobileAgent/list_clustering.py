@@ -0,0 +1,96 @@
+import hashlib
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from .hierarchy import parse_bounds
+
+
+def template_signature(node, depth=3):
+    """节点的结构模板: 类名、resource-id 与子树形状，不包含文字内容"""
+    children = [child for child in node if child.tag == "node"]
+    if depth > 0:
+        shape = tuple(template_signature(child, depth - 1) for child in children)
+    else:
+        shape = len(children)
+    return node.get("class") or "", node.get("resource-id") or "", shape
+
+
+LIST_CLASSES = ("RecyclerView", "ListView", "GridView")
+
+
+def find_clusters(hierarchy_xml, min_size=3, sample_size=2, explored=None, screen=""):
+    """
+    把列表容器下结构模板相同的兄弟节点(列表行)聚为一类，每类只保留sample_size行作为代表
+
+    :param hierarchy_xml: dump_hierarchy() 的xml
+    :param min_size: 至少多少行相同才视为重复列表
+    :param sample_size: 每类探索的代表行数
+    :param explored: {(screen, template): 已操作行数}，跨快照(滑动后)累计，只读，由 mark_operated 更新
+    :param screen: 页面签名，不同页面上模板相同的列表分别计数
+    :return: [{"key", "template", "class_path", "rows", "representatives", "covered"}]，行以bounds列表表示
+    """
+    root = ET.fromstring(hierarchy_xml.encode('utf-8') if isinstance(hierarchy_xml, str) else hierarchy_xml)
+    clusters = []
+    stack = [(root, "")]
+    while stack:
+        parent, class_path = stack.pop()
+        groups = {}
+        for child in parent:
+            if child.tag != "node":
+                continue
+            stack.append((child, f"{class_path}/{child.get('class') or ''}"))
+            box = parse_bounds(child.get("bounds"))
+            if box is None or box[2] <= box[0] or box[3] <= box[1]:
+                continue
+            groups.setdefault(template_signature(child), []).append(box)
+        if not any(name in (parent.get("class") or "") for name in LIST_CLASSES):
+            continue
+        for signature, rows in groups.items():
+            if len(rows) < min_size:
+                continue
+            template = hashlib.md5(repr((class_path, signature)).encode('utf-8')).hexdigest()[:12]
+            key = (screen, template)
+            remaining = sample_size
+            if explored is not None:
+                remaining = max(0, sample_size - explored.get(key, 0))
+            clusters.append({
+                "key": key,
+                "template": template,
+                "class_path": f"{class_path}/{signature[0]}",
+                "rows": rows,
+                "representatives": rows[:remaining],
+                "covered": rows[remaining:],
+            })
+    return clusters
+
+
+def mark_operated(clusters, box, explored):
+    """
+    元素框落在某个代表行内时，该行所属类的已操作行数加一(同一行只计一次)
+
+    :param box: 被操作元素的 (left, top, right, bottom)
+    :return: 计入的类，不属于任何代表行时返回None
+    """
+    left, top, right, bottom = box
+    for cluster in clusters:
+        operated = cluster.setdefault("operated", set())
+        for index, (row_left, row_top, row_right, row_bottom) in enumerate(cluster["representatives"]):
+            if row_left <= left and row_top <= top and right <= row_right and bottom <= row_bottom:
+                if index not in operated:
+                    operated.add(index)
+                    explored[cluster["key"]] = explored.get(cluster["key"], 0) + 1
+                return cluster
+    return None
+
+
+def covered_mask(boxes, clusters):
+    """元素框完全落在某个非代表行内时为True"""
+    boxes = np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+    covered = [row for cluster in clusters for row in cluster["covered"]]
+    if not covered or len(boxes) == 0:
+        return np.zeros(len(boxes), dtype=bool)
+    rows = np.asarray(covered, dtype=np.int32)
+    inside = (np.all(boxes[:, None, :2] >= rows[None, :, :2], axis=2)
+              & np.all(boxes[:, None, 2:] <= rows[None, :, 2:], axis=2))
+    return inside.any(axis=1)
@@ -0,0 +1,133 @@
+import time
+
+import numpy as np
+
+from .element_table import ElementTable, StringPool
+
+
+# 选择器字段 -> (元素表中的列, 匹配方式)
+SELECTOR_FIELDS = {
+    "text": ("text_ids", "equals"),
+    "textContains": ("text_ids", "contains"),
+    "className": ("class_ids", "equals"),
+    "resourceId": ("resource_ids", "equals"),
+    "description": ("desc_ids", "equals"),
+    "descriptionContains": ("desc_ids", "contains"),
+}
+
+
+class Match:
+    def __init__(self, selector_index, selector, index, bounds, text):
+        """
+        :param selector_index: 命中的是备选选择器列表中的第几个
+        :param index: 元素在快照元素表中的下标
+        :param bounds: [left, top, right, bottom]
+        """
+        self.selector_index = selector_index
+        self.selector = selector
+        self.index = index
+        self.bounds = bounds
+        self.text = text
+
+    @property
+    def center(self):
+        left, top, right, bottom = self.bounds
+        return (left + right) // 2, (top + bottom) // 2
+
+    def __repr__(self):
+        return f"Match({self.selector}, bounds={self.bounds}, text={self.text!r})"
+
+
+class Snapshot:
+    def __init__(self, hierarchy_xml):
+        """一次 dump_hierarchy() 的元素表，所有选择器都在其上本地匹配"""
+        self.hierarchy = hierarchy_xml
+        self.pool = StringPool()
+        self.table = ElementTable.from_hierarchy(hierarchy_xml, self.pool)
+
+    def selector_mask(self, selector):
+        mask = np.ones(len(self.table), dtype=bool)
+        for key, value in selector.items():
+            if key not in SELECTOR_FIELDS:
+                raise ValueError(f"不支持的选择器字段: {key}")
+            column, mode = SELECTOR_FIELDS[key]
+            ids = getattr(self.table, column)
+            if mode == "equals":
+                mask &= self.pool.match(ids, lambda s: s == value)
+            else:
+                mask &= self.pool.match(ids, lambda s: value in s)
+        return mask
+
+    def find(self, selectors, screen_size=None):
+        """
+        按顺序尝试备选选择器，返回第一个有命中的选择器的最佳元素，没有时返回None
+        同一选择器命中多个元素时优先屏幕内、可点击、最上层的元素
+        """
+        table = self.table
+        if len(table) == 0:
+            return None
+        preference = table.has_flag("clickable").astype(np.int32) * 2 + table.has_flag("enabled").astype(np.int32)
+        if screen_size:
+            preference += table.visible_mask(*screen_size).astype(np.int32) * 4
+        for selector_index, selector in enumerate(selectors):
+            candidates = np.flatnonzero(self.selector_mask(selector))
+            if len(candidates) == 0:
+                continue
+            # 偏好相同时取绘制顺序最后(最上层)的元素
+            best = candidates[np.lexsort((candidates, preference[candidates]))[-1]]
+            return Match(selector_index, selector, int(best), table.bounds[best].tolist(),
+                         table.texts([best])[0])
+        return None
+
+
+class Locator:
+    def __init__(self, device, screen_size=None):
+        """
+        多选择器定位: 一次dump解析所有备选选择器，命中后直接按坐标操作
+
+        :param device: uiautomator2 设备
+        :param screen_size: (宽, 高)，用于优先选择屏幕内的元素，None时首次使用时读取
+        """
+        self.d = device
+        self.screen_size = screen_size
+        self.last_snapshot = None
+
+    def snapshot(self):
+        if self.screen_size is None:
+            self.screen_size = self.d.window_size()
+        self.last_snapshot = Snapshot(self.d.dump_hierarchy())
+        return self.last_snapshot
+
+    def find(self, selectors, snapshot=None):
+        """在一次快照中查找，selectors 为选择器字典或其列表"""
+        if isinstance(selectors, dict):
+            selectors = [selectors]
+        snapshot = snapshot or self.snapshot()
+        return snapshot.find(selectors, self.screen_size)
+
+    def wait(self, selectors, timeout=10.0, interval=0.2, max_interval=1.0):
+        """
+        等待任一选择器出现，命中立即返回，超时返回None
+        界面未变化时逐步拉长查询间隔，界面变化后恢复为最短间隔
+        """
+        deadline = time.monotonic() + timeout
+        delay = interval
+        previous = None
+        while True:
+            snapshot = self.snapshot()
+            match = self.find(selectors, snapshot)
+            if match or time.monotonic() + delay > deadline:
+                return match
+            delay = interval if snapshot.hierarchy != previous else min(delay * 2, max_interval)
+            previous = snapshot.hierarchy
+            time.sleep(delay)
+
+    def click(self, selectors, timeout=0.0):
+        """定位并点击，返回Match；找不到时返回None"""
+        match = self.wait(selectors, timeout) if timeout else self.find(selectors)
+        if match:
+            self.d.click(*match.center)
+        return match
+
+    def exists(self, selectors, timeout=0.0):
+        return (self.wait(selectors, timeout) if timeout else self.find(selectors)) is not None
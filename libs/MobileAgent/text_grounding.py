@@ -0,0 +1,101 @@
+import xml.etree.ElementTree as ET
+
+import cv2
+import numpy as np
+
+from MobileAgent.hierarchy import OPAQUE_CLASSES, parse_hierarchy
+from MobileAgent.text_localization import detect_text, recognize_batch, locate_text, ocr
+from MobileAgent.text_matcher import best_match
+
+
+def opaque_regions(nodes, iw, ih):
+    """找出UI树没有文字描述的区域(WebView、画布、图片等)"""
+    regions = []
+    for node in nodes:
+        if node["has_text_child"] or node["text"]:
+            continue
+        if not node["class"].startswith(OPAQUE_CLASSES) and "Canvas" not in node["class"]:
+            continue
+        if node["class"] == "android.widget.ImageView" and node["desc"]:
+            continue
+        left, top, right, bottom = node["box"]
+        left, top = max(0, left), max(0, top)
+        right, bottom = min(iw, right), min(ih, bottom)
+        if right - left < 16 or bottom - top < 16:
+            continue
+        # 被其他不透明区域完全包含的区域不重复OCR
+        if any(r[0] <= left and r[1] <= top and r[2] >= right and r[3] >= bottom for r in regions):
+            continue
+        regions = [r for r in regions if not (left <= r[0] and top <= r[1] and right >= r[2] and bottom >= r[3])]
+        regions.append([left, top, right, bottom])
+    return regions
+
+
+def box_to_result(box, iw, ih, x, y):
+    text_data = [int(max(0, box[0]-10)*x/iw), int(max(0, box[1]-10)*y/ih), int(min(box[2]+10, iw)*x/iw), int(min(box[3]+10, ih)*y/ih)]
+    coordinate = [int(max(0, box[0]-300)*x/iw), int(max(0, box[1]-400)*y/ih), int(min(box[2]+300, iw)*x/iw), int(min(box[3]+400, ih)*y/ih)]
+    return text_data, coordinate
+
+
+def match_hierarchy(prompt, nodes, iw, ih, x, y):
+    """在UI树中先精确后模糊匹配prompt，返回与ocr()相同格式的结果"""
+    text_data = []
+    coordinate = []
+    for node in nodes:
+        if prompt not in (node["text"], node["desc"]):
+            continue
+        data, coor = box_to_result(node["box"], iw, ih, x, y)
+        text_data.append(data)
+        coordinate.append(coor)
+    if text_data:
+        return text_data, coordinate
+
+    labelled = [node for node in nodes if node["text"] or node["desc"]]
+    choices = [node["text"] or node["desc"] for node in labelled]
+    index, _ = best_match(prompt, choices)
+    if index < 0:
+        return [], []
+    data, coor = box_to_result(labelled[index]["box"], iw, ih, x, y)
+    return [data], [coor]
+
+
+def ocr_regions(image_full, regions, ocr_detection, ocr_recognition):
+    """只对指定区域做文字检测，所有裁剪图一次识别，检测框换算回整图坐标"""
+    points = []
+    crops = []
+    for left, top, right, bottom in regions:
+        region_points, region_crops = detect_text(np.ascontiguousarray(image_full[top:bottom, left:right]), ocr_detection)
+        offset = np.array([left, top], dtype=np.float32)
+        points.extend(pts + offset for pts in region_points)
+        crops.extend(region_crops)
+    return points, recognize_batch(ocr_recognition, crops)
+
+
+def ground_text(prompt, hierarchy_xml, image_path, ocr_detection, ocr_recognition, x, y, cache=None):
+    """
+    优先用UI树定位文字，只对UI树无法描述的区域回退到OCR；
+    UI树中没有匹配且没有这类区域时(如文字画在自定义控件里)回退到整屏OCR
+
+    :param prompt: 要点击的文字
+    :param hierarchy_xml: 与截图同一时刻的 dump_hierarchy() 结果
+    :param image_path: 截图路径
+    :return: (text_data, coordinate)，格式与 ocr() 一致
+    """
+    image_full = cv2.imread(image_path)
+    ih, iw = image_full.shape[:2]
+    try:
+        nodes = parse_hierarchy(hierarchy_xml) if hierarchy_xml else []
+    except ET.ParseError:
+        nodes = []
+    if not nodes:
+        return ocr(image_path, prompt, ocr_detection, ocr_recognition, x, y, cache)
+
+    text_data, coordinate = match_hierarchy(prompt, nodes, iw, ih, x, y)
+    if text_data:
+        return text_data, coordinate
+
+    regions = opaque_regions(nodes, iw, ih)
+    if not regions:
+        return ocr(image_path, prompt, ocr_detection, ocr_recognition, x, y, cache)
+    points, texts = ocr_regions(image_full, regions, ocr_detection, ocr_recognition)
+    return locate_text(points, texts, prompt, iw, ih, x, y)
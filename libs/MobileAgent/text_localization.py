@@ -1,6 +1,8 @@
 import cv2
 import numpy as np
-from MobileAgent.crop import crop_image, calculate_size
+from rapidfuzz.distance import LCSseq
+from MobileAgent.crop import crop_image_batch, calculate_size
+from MobileAgent.text_matcher import best_match
 from PIL import Image
 
 
@@ -18,34 +20,48 @@ def order_point(coor):
 
 
 def longest_common_substring_length(str1, str2):
-    m = len(str1)
-    n = len(str2)
-    dp = [[0] * (n + 1) for _ in range(m + 1)]
+    # 实际计算的是最长公共子序列长度
+    return LCSseq.similarity(str1, str2)
 
-    for i in range(1, m + 1):
-        for j in range(1, n + 1):
-            if str1[i - 1] == str2[j - 1]:
-                dp[i][j] = dp[i - 1][j - 1] + 1
-            else:
-                dp[i][j] = max(dp[i - 1][j], dp[i][j - 1])
 
-    return dp[m][n]
+def recognize_batch(ocr_recognition, crops):
+    if len(crops) == 0:
+        return []
+    # modelscope pipeline 支持列表输入，一次提交所有裁剪图
+    results = ocr_recognition(crops)
+    if isinstance(results, list) and len(results) == len(crops):
+        return [result['text'][0] for result in results]
+    return [ocr_recognition(crop)['text'][0] for crop in crops]
 
 
-def ocr(image_path, prompt, ocr_detection, ocr_recognition, x, y):
+def detect_text(image_full, ocr_detection, max_side=None):
+    # max_side 限制检测输入分辨率，检测框映射回原图后在原图上裁剪识别
+    scale = 1.0
+    if max_side and max(image_full.shape[:2]) > max_side:
+        scale = max_side / max(image_full.shape[:2])
+        det_input = cv2.resize(image_full, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    else:
+        det_input = image_full
+    det_result = ocr_detection(det_input)
+    det_result = det_result['polygons'] 
+    if scale != 1.0:
+        det_result = det_result / scale
+    points = [order_point(det_result[i]) for i in range(det_result.shape[0])]
+    crops = crop_image_batch(image_full, points)
+    return points, crops
+
+
+def detect_and_recognize(image_path, ocr_detection, ocr_recognition):
+    image_full = cv2.imread(image_path)
+    points, crops = detect_text(image_full, ocr_detection)
+    texts = recognize_batch(ocr_recognition, crops)
+    return points, texts
+
+
+def locate_text(points, texts, prompt, iw, ih, x, y):
     text_data = []
     coordinate = []
-    image = Image.open(image_path)
-    iw, ih = image.size
-    
-    image_full = cv2.imread(image_path)
-    det_result = ocr_detection(image_full)
-    det_result = det_result['polygons'] 
-    for i in range(det_result.shape[0]):
-        pts = order_point(det_result[i])
-        image_crop = crop_image(image_full, pts)
-        result = ocr_recognition(image_crop)['text'][0]
-        
+    for pts, result in zip(points, texts):
         if result == prompt:
             box = [int(e) for e in list(pts.reshape(-1))]
             box = [box[0], box[1], box[4], box[5]]
@@ -56,44 +72,27 @@ def ocr(image_path, prompt, ocr_detection, ocr_recognition, x, y):
             text_data.append([int(max(0, box[0]-10)*x/iw), int(max(0, box[1]-10)*y/ih), int(min(box[2]+10, iw)*x/iw), int(min(box[3]+10, ih)*y/ih)])
             coordinate.append([int(max(0, box[0]-300)*x/iw), int(max(0, box[1]-400)*y/ih), int(min(box[2]+300, iw)*x/iw), int(min(box[3]+400, ih)*y/ih)])
     
-    max_length = 0
     if len(text_data) == 0:
-        for i in range(det_result.shape[0]):
-            pts = order_point(det_result[i])
-            image_crop = crop_image(image_full, pts)
-            result = ocr_recognition(image_crop)['text'][0]
-            
-            if len(result) < 0.3 * len(prompt):
-                continue
-            
-            if result in prompt:
-                now_length = len(result)
-            else:
-                now_length = longest_common_substring_length(result, prompt)
-            
-            if now_length > max_length:
-                max_length = now_length
-                box = [int(e) for e in list(pts.reshape(-1))]
-                box = [box[0], box[1], box[4], box[5]]
-                
-                text_data = [[int(max(0, box[0]-10)*x/iw), int(max(0, box[1]-10)*y/ih), int(min(box[2]+10, iw)*x/iw), int(min(box[3]+10, ih)*y/ih)]]
-                coordinate = [[int(max(0, box[0]-300)*x/iw), int(max(0, box[1]-400)*y/ih), int(min(box[2]+300, iw)*x/iw), int(min(box[3]+400, ih)*y/ih)]]
-
-        if len(prompt) <= 10:
-            if max_length >= 0.8*len(prompt):
-                return text_data, coordinate
-            else:
-                return [], []
-        elif (len(prompt) > 10) and (len(prompt) <= 20):
-            if max_length >= 0.5*len(prompt):
-                return text_data, coordinate
-            else:
-                return [], []
-        else:
-            if max_length >= 0.4*len(prompt):
-                return text_data, coordinate
-            else:
-                return [], []
+        index, _ = best_match(prompt, texts)
+        if index < 0:
+            return [], []
+        box = [int(e) for e in list(points[index].reshape(-1))]
+        box = [box[0], box[1], box[4], box[5]]
+        text_data = [[int(max(0, box[0]-10)*x/iw), int(max(0, box[1]-10)*y/ih), int(min(box[2]+10, iw)*x/iw), int(min(box[3]+10, ih)*y/ih)]]
+        coordinate = [[int(max(0, box[0]-300)*x/iw), int(max(0, box[1]-400)*y/ih), int(min(box[2]+300, iw)*x/iw), int(min(box[3]+400, ih)*y/ih)]]
+
+    return text_data, coordinate
+
+
+def ocr(image_path, prompt, ocr_detection, ocr_recognition, x, y, cache=None):
+    image = Image.open(image_path)
+    iw, ih = image.size
     
+    # 识别结果与prompt无关，同一画面的不同查询可复用缓存
+    if cache is None:
+        points, texts = detect_and_recognize(image_path, ocr_detection, ocr_recognition)
     else:
-        return text_data, coordinate
\ No newline at end of file
+        key = cache.make_key("ocr", (ocr_detection, ocr_recognition), cache.image_key(image), ())
+        points, texts = cache.get_or_compute(key, lambda: detect_and_recognize(image_path, ocr_detection, ocr_recognition))
+
+    return locate_text(points, texts, prompt, iw, ih, x, y)
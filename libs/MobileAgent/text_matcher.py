@@ -0,0 +1,63 @@
+import numpy as np
+from rapidfuzz import fuzz, process
+from rapidfuzz.distance import LCSseq
+
+
+# 评分函数及其满分: None 表示以查询串长度为满分(最长公共子序列长度)
+SCORERS = {
+    "lcs": (LCSseq.similarity, None),
+    "ratio": (fuzz.ratio, 100.0),
+    "partial_ratio": (fuzz.partial_ratio, 100.0),
+    "token_set_ratio": (fuzz.token_set_ratio, 100.0),
+}
+
+
+def threshold_for(query):
+    """与ocr()一致的按长度分段的匹配阈值"""
+    if len(query) <= 10:
+        return 0.8
+    elif len(query) <= 20:
+        return 0.5
+    else:
+        return 0.4
+
+
+def score(query, choices, scorer="lcs"):
+    """一次向量化计算query与所有候选文本的归一化得分(0~1)"""
+    if len(choices) == 0 or len(query) == 0:
+        return np.zeros(len(choices), dtype=np.float32)
+    func, full_score = SCORERS[scorer]
+    scores = process.cdist([query], choices, scorer=func, dtype=np.float32, workers=1)[0]
+    return scores / (full_score or len(query))
+
+
+def best_match(query, choices, scorer="lcs", min_length_ratio=0.3, threshold=None):
+    """
+    返回最佳匹配的下标与得分，未达到阈值时下标为-1
+
+    :param query: 要查找的文本
+    :param choices: OCR结果或UI树中的文本列表
+    :param scorer: SCORERS中的评分函数名
+    :param min_length_ratio: 候选文本长度低于query长度该比例时忽略
+    :param threshold: 匹配阈值，默认按query长度取threshold_for
+    """
+    if len(choices) == 0:
+        return -1, 0.0
+    scores = score(query, choices, scorer)
+    lengths = np.fromiter((len(c) for c in choices), dtype=np.int32, count=len(choices))
+    scores[lengths < min_length_ratio * len(query)] = -1
+    index = int(np.argmax(scores))
+    if threshold is None:
+        threshold = threshold_for(query)
+    if scores[index] <= 0 or scores[index] < threshold:
+        return -1, float(max(scores[index], 0))
+    return index, float(scores[index])
+
+
+def match_all(query, choices, scorer="lcs", threshold=None):
+    """返回所有达到阈值的候选下标(按得分降序)"""
+    scores = score(query, choices, scorer)
+    if threshold is None:
+        threshold = threshold_for(query)
+    indexes = np.nonzero(scores >= threshold)[0]
+    return indexes[np.argsort(-scores[indexes], kind="stable")].tolist()
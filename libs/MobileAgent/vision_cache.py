@@ -0,0 +1,202 @@
+import hashlib
+import os
+import pickle
+import threading
+import weakref
+from collections import OrderedDict
+
+from MobileAgent.image_hash import content_hash
+
+
+# 不落盘的key前缀: 模型权重无法确认时结果只在本进程内缓存
+MEMORY_ONLY = "mem:"
+
+_weights_fingerprints = weakref.WeakKeyDictionary()
+
+
+def weights_path(model):
+    """
+    模型权重所在的文件或目录，找不到时返回None
+    依次查找 weights_path 属性(如 load_models 为CLIP设置的)、model_dir 属性与 modelscope pipeline 的 model.model_dir
+    """
+    for owner in (model, getattr(model, "model", None)):
+        for attr in ("weights_path", "model_dir"):
+            path = getattr(owner, attr, None)
+            if isinstance(path, str) and os.path.exists(path):
+                return path
+    return None
+
+
+def path_fingerprint(path):
+    """权重文件(目录下所有文件)的路径、大小与修改时间"""
+    if os.path.isfile(path):
+        stat = os.stat(path)
+        return f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    total, latest, count = 0, 0, 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            stat = os.stat(os.path.join(root, name))
+            total, latest, count = total + stat.st_size, max(latest, stat.st_mtime_ns), count + 1
+    return f"{os.path.abspath(path)}:{count}:{total}:{latest}"
+
+
+def weights_fingerprint(model):
+    """
+    已加载模型的权重指纹，每个模型对象只计算一次(加载后磁盘上的权重变化不影响已加载的模型)
+    找不到权重路径时返回None
+    """
+    try:
+        return _weights_fingerprints[model]
+    except (KeyError, TypeError):
+        pass
+    path = weights_path(model)
+    fingerprint = path_fingerprint(path) if path else None
+    try:
+        _weights_fingerprints[model] = fingerprint
+    except TypeError:
+        pass
+    return fingerprint
+
+
+def model_identity(model):
+    """
+    模型标识: model_name属性或类名 + 权重指纹
+    任一模型的权重无法确认时返回None，对应结果不写入磁盘层
+    """
+    if isinstance(model, (tuple, list)):
+        identities = [model_identity(m) for m in model]
+        return None if None in identities else "+".join(identities)
+    fingerprint = weights_fingerprint(model)
+    if fingerprint is None:
+        return None
+    name = getattr(model, "model_name", None) or f"{type(model).__module__}.{type(model).__qualname__}"
+    return f"{name}@{fingerprint}"
+
+
+class VisionCache:
+    def __init__(self, cache_dir=None, max_entries=256, max_disk_bytes=512 * 1024 * 1024):
+        """
+        视觉模型推理结果缓存: 进程内LRU + 可选的磁盘层
+        图片按解码后像素的精确哈希作key，只差一个数字的画面(时钟、计数)也不会命中彼此的结果
+
+        :param cache_dir: 磁盘缓存目录，为None时只使用内存
+        :param max_entries: 内存LRU最大条目数
+        :param max_disk_bytes: 磁盘缓存总大小上限，超出后按最久未使用淘汰
+        """
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_size = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._disk_size = sum(entry.stat().st_size for entry in os.scandir(cache_dir) if entry.is_file())
+
+    def image_key(self, image):
+        return content_hash(image)
+
+    def make_key(self, operation, model, image_keys, params):
+        """
+        由操作名、模型标识、图片哈希与参数生成缓存key
+        模型权重无法确认时按对象id生成只在内存中使用的key
+        """
+        if isinstance(image_keys, str):
+            image_keys = [image_keys]
+        identity = model_identity(model)
+        if identity is None:
+            raw = repr((operation, id(model), tuple(image_keys), params))
+            return MEMORY_ONLY + hashlib.sha1(raw.encode('utf-8')).hexdigest()
+        raw = repr((operation, identity, tuple(image_keys), params))
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+        value = self._disk_get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._memory_put(key, value)
+        return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._memory_put(key, value)
+        self._disk_put(key, value)
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def _memory_put(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _disk_get(self, key):
+        if not self.cache_dir or key.startswith(MEMORY_ONLY):
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+            os.utime(path)
+            return value
+        except Exception:
+            # 文件不存在、写入不完整或由不兼容的版本写入，均视为未命中
+            return None
+
+    def _disk_put(self, key, value):
+        if not self.cache_dir or key.startswith(MEMORY_ONLY):
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        size = os.path.getsize(tmp_path)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._disk_size += size
+            if self._disk_size > self.max_disk_bytes:
+                self._evict_disk()
+
+    def _evict_disk(self):
+        """按访问时间淘汰磁盘缓存直到低于上限的90%"""
+        entries = [entry for entry in os.scandir(self.cache_dir) if entry.is_file() and entry.name.endswith('.pkl')]
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        self._disk_size = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if self._disk_size <= self.max_disk_bytes * 0.9:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                self._disk_size -= size
+            except OSError:
+                continue
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._memory),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "disk_bytes": self._disk_size,
+            }
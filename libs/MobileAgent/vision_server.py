@@ -0,0 +1,302 @@
+import argparse
+import os
+import queue
+import secrets
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing.connection import Client, Listener
+
+import cv2
+import torch
+
+from MobileAgent.crop import load_image, encode_icons, best_icon
+from MobileAgent.icon_localization import det
+from MobileAgent.text_localization import detect_text, recognize_batch, locate_text
+
+
+DEFAULT_ADDRESS = ('127.0.0.1', 6070)
+AUTHKEY_ENV = 'AUTOPILOTQA_VISION_AUTHKEY'
+DEFAULT_AUTHKEY_FILE = os.path.expanduser('~/.autopilotqa/vision_authkey')
+
+
+def create_authkey(path=DEFAULT_AUTHKEY_FILE):
+    """
+    服务端密钥: 优先使用环境变量，否则每次启动随机生成并写入仅当前用户可读(0600)的文件
+    连接会反序列化请求，密钥不能使用固定值
+    """
+    if os.environ.get(AUTHKEY_ENV):
+        return os.environ[AUTHKEY_ENV].encode('utf-8')
+    authkey = secrets.token_hex(32).encode('utf-8')
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    if os.path.exists(path):
+        os.remove(path)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(authkey)
+    return authkey
+
+
+def read_authkey(path=DEFAULT_AUTHKEY_FILE):
+    """客户端密钥: 环境变量或服务端写出的密钥文件，都没有时抛出异常"""
+    if os.environ.get(AUTHKEY_ENV):
+        return os.environ[AUTHKEY_ENV].encode('utf-8')
+    try:
+        with open(path, 'rb') as f:
+            return f.read().strip()
+    except OSError as e:
+        raise RuntimeError(f"找不到视觉模型服务密钥，请设置 {AUTHKEY_ENV} 或先启动服务生成 {path}") from e
+
+
+def parse_address(address):
+    """'host:port' 为TCP地址，其他字符串视为Unix socket路径"""
+    if isinstance(address, str) and ':' in address and not address.startswith('/'):
+        host, port = address.rsplit(':', 1)
+        return host, int(port)
+    return address
+
+
+def load_models(device="cpu"):
+    """加载GroundingDINO、OCR检测/识别与CLIP模型"""
+    import clip
+    from modelscope import snapshot_download
+    from modelscope.pipelines import pipeline
+    from modelscope.utils.constant import Tasks
+
+    groundingdino_dir = snapshot_download('AI-ModelScope/GroundingDINO', revision='v1.0.0')
+    groundingdino_model = pipeline('grounding-dino-task', model=groundingdino_dir)
+    ocr_detection = pipeline(Tasks.ocr_detection, model='damo/cv_resnet18_ocr-detection-line-level_damo')
+    ocr_recognition = pipeline(Tasks.ocr_recognition, model='damo/cv_convnextTiny_ocr-recognition-document_damo')
+    clip_model, clip_preprocess = clip.load("ViT-B/32", device=device)
+    # clip.load 默认下载到 ~/.cache/clip，记录权重路径供推理缓存校验
+    clip_model.weights_path = os.path.expanduser("~/.cache/clip/ViT-B-32.pt")
+    return {
+        "groundingdino_model": groundingdino_model,
+        "ocr_detection": ocr_detection,
+        "ocr_recognition": ocr_recognition,
+        "clip_model": clip_model,
+        "clip_preprocess": clip_preprocess,
+    }
+
+
+class MicroBatcher:
+    def __init__(self, handler, max_batch=8, max_wait=0.01):
+        """
+        收集请求组成小批次后统一交给handler处理
+
+        :param handler: 接收请求参数列表，返回等长结果列表，单个请求失败时对应位置返回异常对象
+        :param max_batch: 单批最大请求数
+        :param max_wait: 第一个请求到达后最多等待的秒数
+        """
+        self.handler = handler
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, kwargs):
+        future = Future()
+        self._queue.put((kwargs, future))
+        return future
+
+    def _handle(self, batch):
+        """
+        返回与batch等长的结果，单个请求的结果可以是异常
+        整批失败时逐个重试，出错的请求只影响自己
+        """
+        requests = [kwargs for kwargs, _ in batch]
+        try:
+            return self.handler(requests)
+        except Exception as e:
+            if len(requests) == 1:
+                return [e]
+        results = []
+        for request in requests:
+            try:
+                results.extend(self.handler([request]))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            for (_, future), result in zip(batch, self._handle(batch)):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+
+class VisionModelServer:
+    def __init__(self, models, address=DEFAULT_ADDRESS, authkey=None, max_batch=8, max_wait=0.01):
+        """
+        常驻视觉模型服务，多个遍历/Agent进程共享一份已加载的模型
+        只有OCR识别与CLIP编码跨请求合批；GroundingDINO pipeline 只接受单张图，det 在批内逐个执行
+
+        :param models: load_models() 返回的模型字典
+        :param address: ('host', port) 或 Unix socket 路径
+        :param authkey: 连接鉴权密钥，None时由 create_authkey() 生成
+        :param max_batch: 单批最大请求数
+        :param max_wait: 组批最大等待秒数
+        """
+        self.models = models
+        self.address = address
+        self.authkey = authkey or create_authkey()
+        self._batchers = {
+            "det": MicroBatcher(self._handle_det, max_batch, max_wait),
+            "ocr": MicroBatcher(self._handle_ocr, max_batch, max_wait),
+            "clip_for_icon": MicroBatcher(self._handle_clip, max_batch, max_wait),
+        }
+
+    def _handle_det(self, requests):
+        # GroundingDINO pipeline 只接受单张图，批内顺序执行以避免多线程争用模型
+        results = []
+        for request in requests:
+            try:
+                results.append(det(request["image_path"], request["caption"], self.models["groundingdino_model"],
+                                   request.get("box_threshold", 0.05), request.get("text_threshold", 0.5)))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def _handle_ocr(self, requests):
+        # 各请求分别检测，所有裁剪图合并为一次识别；读图或检测失败的请求单独返回错误
+        results = [None] * len(requests)
+        detected = []
+        all_crops = []
+        for index, request in enumerate(requests):
+            try:
+                image_full = cv2.imread(request["image_path"])
+                if image_full is None:
+                    raise ValueError(f"无法读取图片: {request['image_path']}")
+                points, crops = detect_text(image_full, self.models["ocr_detection"])
+            except Exception as e:
+                results[index] = e
+                continue
+            detected.append((index, points, image_full.shape, len(all_crops), len(crops)))
+            all_crops.extend(crops)
+        all_texts = recognize_batch(self.models["ocr_recognition"], all_crops) if all_crops else []
+
+        for index, points, shape, start, count in detected:
+            request = requests[index]
+            texts = all_texts[start:start + count]
+            ih, iw = shape[:2]
+            try:
+                results[index] = locate_text(points, texts, request["prompt"], iw, ih, request["x"], request["y"])
+            except Exception as e:
+                results[index] = e
+        return results
+
+    def _handle_clip(self, requests):
+        # 所有请求的候选图拼成一批编码，再按各自prompt打分
+        results = [None] * len(requests)
+        images = []
+        spans = []
+        for index, request in enumerate(requests):
+            try:
+                loaded = [load_image(image) for image in request["images"]]
+                if not loaded:
+                    raise ValueError("没有候选图片")
+            except Exception as e:
+                results[index] = e
+                continue
+            spans.append((index, len(images), len(loaded)))
+            images.extend(loaded)
+        if not spans:
+            return results
+        clip_model = self.models["clip_model"]
+        image_features = encode_icons(clip_model, self.models["clip_preprocess"], images)
+        for index, start, count in spans:
+            try:
+                results[index] = best_icon(clip_model, image_features[start:start + count], requests[index]["prompt"])
+            except Exception as e:
+                results[index] = e
+        return results
+
+    def _serve_connection(self, conn):
+        with conn:
+            while True:
+                try:
+                    request_id, operation, kwargs = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    result = self._batchers[operation].submit(kwargs).result()
+                    conn.send((request_id, True, result))
+                except Exception as e:
+                    conn.send((request_id, False, f"{type(e).__name__}: {e}"))
+
+    def serve_forever(self):
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.remove(self.address)
+        with Listener(self.address, authkey=self.authkey) as listener:
+            print(f"视觉模型服务已启动: {self.address}")
+            while True:
+                conn = listener.accept()
+                threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+
+class VisionClient:
+    def __init__(self, address=DEFAULT_ADDRESS, authkey=None):
+        """
+        连接常驻视觉模型服务，接口与 det / ocr / clip_for_icon 一致(不需要传模型)
+
+        :param authkey: 连接鉴权密钥，None时由 read_authkey() 读取
+        """
+        self._conn = Client(address, authkey=authkey or read_authkey())
+        self._lock = threading.Lock()
+        self._request_id = 0
+
+    def _call(self, operation, **kwargs):
+        with self._lock:
+            self._request_id += 1
+            self._conn.send((self._request_id, operation, kwargs))
+            _, ok, result = self._conn.recv()
+        if not ok:
+            raise RuntimeError(f"视觉模型服务调用失败 {operation}: {result}")
+        return result
+
+    def det(self, image_path, caption, box_threshold=0.05, text_threshold=0.5):
+        return self._call("det", image_path=os.path.abspath(image_path), caption=caption,
+                          box_threshold=box_threshold, text_threshold=text_threshold)
+
+    def ocr(self, image_path, prompt, x, y):
+        return self._call("ocr", image_path=os.path.abspath(image_path), prompt=prompt, x=x, y=y)
+
+    def clip_for_icon(self, images, prompt):
+        # 候选图以PIL图片传输，避免依赖共享的临时目录
+        images = [load_image(image).convert("RGB") for image in images]
+        return self._call("clip_for_icon", images=images, prompt=prompt)
+
+    def close(self):
+        self._conn.close()
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--address", type=str, default=f"{DEFAULT_ADDRESS[0]}:{DEFAULT_ADDRESS[1]}",
+                        help="host:port 或 Unix socket 路径")
+    parser.add_argument("--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=10)
+    parser.add_argument("--authkey-file", type=str, default=DEFAULT_AUTHKEY_FILE,
+                        help=f"未设置 {AUTHKEY_ENV} 时随机生成的密钥写入该文件(0600)，客户端从中读取")
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = get_args()
+    server = VisionModelServer(load_models(args.device), parse_address(args.address), create_authkey(args.authkey_file),
+                               max_batch=args.max_batch, max_wait=args.max_wait_ms / 1000)
+    server.serve_forever()
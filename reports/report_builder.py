@@ -0,0 +1,295 @@
+import argparse
+import hashlib
+import html
+import json
+import math
+import os
+import threading
+import time
+
+
+class DistinctCounter:
+    def __init__(self, precision=10):
+        """
+        HyperLogLog 近似去重计数，内存固定为 2**precision 字节，误差约 1.04/sqrt(2**precision)
+        """
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(self.size)
+
+    def add(self, value):
+        digest = int.from_bytes(hashlib.md5(str(value).encode('utf-8')).digest()[:8], 'big')
+        index = digest >> (64 - self.precision)
+        rest = (digest << self.precision) & ((1 << 64) - 1)
+        rank = 64 - self.precision + 1 if rest == 0 else 65 - rest.bit_length()
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        m = self.size
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+class RunningStats:
+    def __init__(self):
+        """报告汇总指标，全部为增量累计值"""
+        self.started_at = None
+        self.last_ts = None
+        self.current_depth = None
+        self.snapshots = 0
+        self.screens = DistinctCounter()
+        self.elements = DistinctCounter()
+        self.actions = 0
+        self.operations = {}
+        self.effects = {}
+        self.recoveries = 0
+        self.errors = 0
+        self.anomalies = {}
+        self.depth_seconds = {}
+
+    def add_event(self, event):
+        ts = event.get("ts")
+        if ts is not None:
+            if self.started_at is None:
+                self.started_at = ts
+            if self.last_ts is not None and self.current_depth is not None:
+                # 两个事件之间的时间计入当前所在深度
+                key = str(self.current_depth)
+                self.depth_seconds[key] = self.depth_seconds.get(key, 0.0) + max(0.0, ts - self.last_ts)
+            self.last_ts = ts
+        if event.get("depth") is not None:
+            self.current_depth = event["depth"]
+
+        kind = event.get("type")
+        if kind == "snapshot":
+            self.snapshots += 1
+            self.screens.add(event.get("window_hash") or event.get("screenshot"))
+        elif kind == "action":
+            self.actions += 1
+            operation = event.get("op") or "none"
+            self.operations[operation] = self.operations.get(operation, 0) + 1
+            element = event.get("element")
+            if element:
+                self.elements.add((element.get("class"), element.get("rid"), element.get("text")))
+        elif kind == "transition":
+            effect = event.get("effect")
+            self.effects[effect] = self.effects.get(effect, 0) + 1
+        elif kind == "recovery":
+            self.recoveries += 1
+        elif kind == "error":
+            self.errors += 1
+
+    def add_anomaly(self, record):
+        for flag in record.get("flags", []):
+            self.anomalies[flag["type"]] = self.anomalies.get(flag["type"], 0) + 1
+
+    def summary(self):
+        duration = 0.0 if self.started_at is None else self.last_ts - self.started_at
+        return {
+            "duration_seconds": round(duration, 1),
+            "snapshots": self.snapshots,
+            "screens": self.screens.count(),
+            "elements": self.elements.count(),
+            "actions": self.actions,
+            "operations": dict(self.operations),
+            "effects": dict(self.effects),
+            "recoveries": self.recoveries,
+            "errors": self.errors,
+            "anomalies": dict(self.anomalies),
+            "seconds_per_depth": {depth: round(seconds, 1) for depth, seconds in sorted(self.depth_seconds.items())},
+        }
+
+
+PAGE_STYLE = """<style>
+body{font-family:sans-serif;margin:16px}table{border-collapse:collapse}td,th{border:1px solid #ccc;padding:4px 8px;vertical-align:top}
+.error{background:#fdd}.recovery{background:#ffe}.anomaly{background:#fdd}img{max-width:160px}
+</style>"""
+
+
+class ReportBuilder:
+    def __init__(self, report_dir, run_dir=None, page_size=200, flush_interval=5.0):
+        """
+        增量生成分页HTML/JSON报告，运行过程中即可查看，内存占用与运行时长无关
+
+        :param report_dir: 报告输出目录，index.html / summary.json / page_NNNN.html / page_NNNN.jsonl
+        :param run_dir: 遍历输出目录，用于增量读取 anomalies.jsonl 与计算截图相对路径
+        :param page_size: 每页记录数，写满的页翻页时补上下一页链接后不再改写
+        :param flush_interval: 当前页与首页的最短重写间隔(秒)
+        """
+        self.report_dir = report_dir
+        self.run_dir = run_dir
+        self.page_size = page_size
+        self.flush_interval = flush_interval
+        self.stats = RunningStats()
+        self.page_number = 1
+        self.rows = []  # 当前页的记录，最多page_size条
+        self._anomaly_offset = 0
+        self._last_flush = 0.0
+        self._lock = threading.Lock()
+        self.finished = False
+        os.makedirs(report_dir, exist_ok=True)
+        for name in os.listdir(report_dir):
+            if name.startswith("page_"):
+                # 上一次运行留下的分页
+                os.remove(os.path.join(report_dir, name))
+
+    def __call__(self, event):
+        """可直接作为 EventLog 的订阅者"""
+        self.consume(event)
+
+    def consume(self, event):
+        with self._lock:
+            self.stats.add_event(event)
+            if event.get("level", 20) >= 20 and event.get("type") != "level":
+                self._append(event)
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self._flush()
+
+    def consume_anomaly(self, record):
+        with self._lock:
+            self._add_anomaly(record)
+
+    def _add_anomaly(self, record):
+        self.stats.add_anomaly(record)
+        self._append(dict(record, type="anomaly", ts=record.get("captured_at")))
+
+    def _append(self, row):
+        if len(self.rows) >= self.page_size:
+            # 有新记录才翻页，写满的页此时补上下一页链接，最后一页不会指向不存在的文件
+            self._write_page(has_next=True)
+            self.page_number += 1
+            self.rows = []
+        self.rows.append(row)
+        with open(self._page_path("jsonl"), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+
+    def _tail_anomalies(self):
+        """读取 anomalies.jsonl 中上次之后新增的行"""
+        if not self.run_dir:
+            return
+        path = os.path.join(self.run_dir, "anomalies.jsonl")
+        if not os.path.exists(path) or os.path.getsize(path) <= self._anomaly_offset:
+            return
+        with open(path, encoding='utf-8') as f:
+            f.seek(self._anomaly_offset)
+            while True:
+                line = f.readline()
+                if not line.endswith("\n"):
+                    break  # 尚未写完的行留到下次
+                self._anomaly_offset = f.tell()
+                if line.strip():
+                    self._add_anomaly(json.loads(line))
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        self._tail_anomalies()
+        self._write_page()
+        self._write_index()
+        self._last_flush = time.monotonic()
+
+    def _page_path(self, extension):
+        return os.path.join(self.report_dir, f"page_{self.page_number:04d}.{extension}")
+
+    def _relative(self, path):
+        if not path:
+            return ""
+        return os.path.relpath(os.path.abspath(path), os.path.abspath(self.report_dir))
+
+    def _render_row(self, row):
+        kind = row.get("type", "")
+        stamp = time.strftime("%H:%M:%S", time.localtime(row["ts"])) if row.get("ts") else ""
+        if kind == "snapshot":
+            image = html.escape(self._relative(row.get("screenshot")))
+            detail = f'<a href="{image}"><img loading="lazy" src="{image}"></a>'
+        elif kind == "anomaly":
+            image = html.escape(self._relative(row.get("screenshot")))
+            flags = ", ".join(flag["type"] for flag in row.get("flags", []))
+            detail = f'{html.escape(flags)} <a href="{image}">{html.escape(os.path.basename(image))}</a>'
+        else:
+            fields = {key: value for key, value in row.items() if key not in ("ts", "seq", "type", "level")}
+            detail = html.escape(json.dumps(fields, ensure_ascii=False, default=str))
+        return f'<tr class="{html.escape(kind)}"><td>{stamp}</td><td>{html.escape(kind)}</td><td>{detail}</td></tr>'
+
+    def _write_page(self, has_next=False):
+        if not self.rows:
+            return
+        previous = f'<a href="page_{self.page_number - 1:04d}.html">上一页</a> ' if self.page_number > 1 else ""
+        following = f' <a href="page_{self.page_number + 1:04d}.html">下一页</a>' if has_next else ""
+        content = (f"<html><head><meta charset='utf-8'>{PAGE_STYLE}</head><body>"
+                   f"<p><a href='index.html'>汇总</a> {previous}第{self.page_number}页{following}</p>"
+                   "<table><tr><th>时间</th><th>类型</th><th>内容</th></tr>"
+                   + "".join(self._render_row(row) for row in self.rows)
+                   + "</table></body></html>")
+        self._atomic_write(self._page_path("html"), content)
+
+    def _write_index(self):
+        summary = self.summary()
+        self._atomic_write(os.path.join(self.report_dir, "summary.json"),
+                           json.dumps(summary, ensure_ascii=False, indent=2))
+        items = "".join(f"<tr><th>{html.escape(key)}</th><td>{html.escape(json.dumps(value, ensure_ascii=False))}</td></tr>"
+                        for key, value in summary.items())
+        pages = " ".join(f'<a href="page_{number:04d}.html">{number}</a>' for number in range(1, self.page_number + 1))
+        refresh = "" if summary["finished"] else "<meta http-equiv='refresh' content='10'>"
+        content = (f"<html><head><meta charset='utf-8'>{refresh}{PAGE_STYLE}</head><body>"
+                   f"<h2>遍历测试报告</h2><table>{items}</table><p>记录分页: {pages}</p></body></html>")
+        self._atomic_write(os.path.join(self.report_dir, "index.html"), content)
+
+    @staticmethod
+    def _atomic_write(path, content):
+        # 先写临时文件再替换，运行中打开报告不会读到半个文件
+        temp_path = path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(temp_path, path)
+
+    def summary(self):
+        return dict(self.stats.summary(), pages=self.page_number, finished=self.finished)
+
+    def show_summary(self):
+        for key, value in self.summary().items():
+            print(f"{key}: {value}")
+
+    def close(self):
+        """写出最后一页与最终汇总"""
+        with self._lock:
+            self.finished = True
+            self._flush()
+
+
+def iter_event_files(run_dir, filename="events.jsonl"):
+    """按时间顺序返回事件文件: 轮转的历史文件(编号大的更早)在前"""
+    path = os.path.join(run_dir, filename)
+    rotated = []
+    index = 1
+    while os.path.exists(f"{path}.{index}"):
+        rotated.append(f"{path}.{index}")
+        index += 1
+    return list(reversed(rotated)) + ([path] if os.path.exists(path) else [])
+
+
+def build_report(run_dir, report_dir=None, page_size=200):
+    """离线逐行读取一次遍历的事件日志生成报告"""
+    builder = ReportBuilder(report_dir or os.path.join(run_dir, "report"), run_dir, page_size, flush_interval=float("inf"))
+    for path in iter_event_files(run_dir):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    builder.consume(json.loads(line))
+    builder.close()
+    return builder
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="由遍历输出目录生成报告")
+    parser.add_argument("run_dir")
+    parser.add_argument("--out", default=None, help="报告目录，默认 run_dir/report")
+    parser.add_argument("--page-size", type=int, default=200)
+    args = parser.parse_args()
+    build_report(args.run_dir, args.out, args.page_size).show_summary()
@@ -2,12 +2,16 @@ import argparse
 import os
 
 from libs.MobileAgent.AndroidUITraverser import AndroidUITraverser
+from reports.report_builder import ReportBuilder
 def get_args():
     parser = argparse.ArgumentParser()
     parser.add_argument("--sn", type=str, default=None)
     parser.add_argument("--depth", type=int ,default=3)
     parser.add_argument("--app", type=str,help="app name")
     parser.add_argument("--out", type=str, help="output dir")
+    parser.add_argument("--cluster-sample", type=int, default=None, help="重复列表行每类探索的行数")
+    parser.add_argument("--log-level", type=str, default="info", help="事件日志级别 debug/info/warning/error")
+    parser.add_argument("--time-budget", type=float, default=None, help="遍历时间预算(分钟)，按新颖度优先探索")
     args = parser.parse_args()
     return args
 def excute_LLM_test_task():
@@ -26,7 +30,10 @@ if __name__ == '__main__':
         output_dir=args.out,
         test_texts=test_texts,
         app_identifier=args.app,
-        max_depth=args.depth #配置遍历层数
+        max_depth=args.depth, #配置遍历层数
+        cluster_sample_size=args.cluster_sample,
+        time_budget=args.time_budget * 60 if args.time_budget else None,
+        log_level=args.log_level
 
 
     )
@@ -39,6 +46,12 @@ if __name__ == '__main__':
 
     # 方式3: 通过应用名启动并遍历
     #traverser.traverse_app_with_depth('com.android.settings', max_depth=2)
+    # 遍历过程中增量生成报告: output_dir/report/index.html
+    test_report = ReportBuilder(os.path.join(traverser.output_dir, "report"), traverser.output_dir)
+    traverser.events.subscribe(test_report)
     main_window=traverser.start_main_window()
     traverser.handle_current_level(1)
+    traverser.close()
+    test_report.close()
+    test_report.show_summary()
     print("\n遍历完成，输出保存在:", os.path.abspath(traverser.output_dir))
\ No newline at end of file
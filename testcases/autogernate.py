@@ -1 +1,32 @@
-#TODO 通常是测试编写各模块测试用例 计划通过AI生成测试用例
\ No newline at end of file
+#通常是测试编写各模块测试用例 这里把遍历时发现的页面路径(output_dir/programs.jsonl)直接作为回归用例回放
+import argparse
+
+import uiautomator2 as u2
+
+from libs.MobileAgent.action_program import ReplayEngine, load_programs
+from testcases.device_pool import DevicePoolRunner, TestSpec
+
+
+def build_suite(programs_path, verify=True):
+    """每个操作程序一个用例，可交给 DevicePoolRunner 在设备池上并行执行"""
+    specs = []
+    for program in load_programs(programs_path):
+        def run(serial, program=program):
+            result = ReplayEngine(u2.connect(serial), verify=verify).run(program)
+            if not result["passed"]:
+                print(f"[{serial}] {program['name']} 回放失败: 第{result['failed_step']}步 {result['error']}")
+            return result["passed"]
+        specs.append(TestSpec(program["name"], run))
+    return specs
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="回放遍历生成的操作程序")
+    parser.add_argument("programs", help="遍历输出目录下的 programs.jsonl")
+    parser.add_argument("--serials", nargs="*", default=None, help="设备序列号，默认使用adb devices中的全部设备")
+    parser.add_argument("--no-verify", action="store_true", help="跳过每步的页面指纹检查，只校验最终页面")
+    parser.add_argument("--out", default="replay_results")
+    args = parser.parse_args()
+    runner = DevicePoolRunner(args.serials, history_path="replay_durations.json", output_dir=args.out)
+    results = runner.run(build_suite(args.programs, verify=not args.no_verify))
+    exit(0 if all(result["passed"] for result in results) else 1)
@@ -0,0 +1,219 @@
+import argparse
+import json
+import os
+import queue
+import subprocess
+import threading
+import time
+import traceback
+
+import uiautomator2 as u2
+
+
+def discover_serials():
+    """返回 adb devices 中状态为device的序列号"""
+    output = subprocess.run(['adb', 'devices'], capture_output=True, text=True).stdout
+    serials = []
+    for line in output.splitlines()[1:]:
+        parts = line.split()
+        if len(parts) >= 2 and parts[1] == 'device':
+            serials.append(parts[0])
+    return serials
+
+
+class TestSpec:
+    def __init__(self, name, run, packages=None):
+        """
+        :param name: 用例名，同时作为历史耗时的key
+        :param run: run(serial) -> bool，在租到的设备上执行用例
+        :param packages: 执行前需要清除数据的应用包名
+        """
+        self.name = name
+        self.run = run
+        self.packages = packages or []
+
+
+class DurationHistory:
+    def __init__(self, path, default=60.0, alpha=0.5):
+        """
+        用例历史耗时(指数滑动平均)，用于负载均衡
+
+        :param default: 没有历史记录时的预估耗时(秒)
+        :param alpha: 新一次耗时的权重
+        """
+        self.path = path
+        self.default = default
+        self.alpha = alpha
+        self.durations = {}
+        if path and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.durations = json.load(f)
+
+    def estimate(self, name):
+        return self.durations.get(name, self.default)
+
+    def update(self, name, seconds):
+        previous = self.durations.get(name)
+        self.durations[name] = seconds if previous is None else self.alpha * seconds + (1 - self.alpha) * previous
+
+    def save(self):
+        if not self.path:
+            return
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(self.durations, f, ensure_ascii=False, indent=2)
+
+
+def isolate_device(serial, packages=()):
+    """用例执行前把设备恢复到干净状态: 停止所有应用、清除指定应用数据、回到桌面"""
+    d = u2.connect(serial)
+    d.app_stop_all()
+    for package in packages:
+        d.app_clear(package)
+    d.press('home')
+    return d
+
+
+class DevicePoolRunner:
+    def __init__(self, serials=None, history_path='test_durations.json', output_dir='test_results', max_device_failures=2):
+        """
+        在设备池上并行执行用例，每个用例租用一台设备
+
+        :param serials: 设备序列号，None表示自动发现
+        :param history_path: 历史耗时文件
+        :param output_dir: 合并后的结果写入 output_dir/results.json
+        :param max_device_failures: 同一准备错误在该数量的不同用例上出现时视为设备故障，设备移出设备池
+        """
+        self.serials = serials or discover_serials()
+        if not self.serials:
+            raise RuntimeError("没有可用的设备")
+        self.history = DurationHistory(history_path)
+        self.output_dir = output_dir
+        self.max_device_failures = max_device_failures
+        self.results = []
+        self.removed = set()
+        self._isolation_failures = {}  # (serial, 错误) -> 因该错误记为失败的用例
+        self._lock = threading.Lock()
+
+    def run(self, specs):
+        """执行全部用例，返回按用例名排序的结果列表"""
+        # 最长预估耗时优先，空闲设备依次领取，近似最优的负载均衡
+        ordered = sorted(specs, key=lambda spec: self.history.estimate(spec.name), reverse=True)
+        pending = queue.Queue()
+        for spec in ordered:
+            pending.put(spec)
+        print(f"设备池: {self.serials}, 用例 {len(ordered)} 个, "
+              f"预估串行耗时 {sum(self.history.estimate(spec.name) for spec in ordered):.0f}s")
+
+        started = time.time()
+        active = list(self.serials)
+        while active and not pending.empty():
+            # 准备失败的设备会把用例交还队列，此时其他设备可能已经退出，需要再启动一轮
+            workers = [threading.Thread(target=self._worker, args=(serial, pending), daemon=True) for serial in active]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            active = [serial for serial in active if serial not in self.removed]
+        # 所有设备都被移出设备池时剩余的用例记为未执行
+        while not pending.empty():
+            spec = pending.get_nowait()
+            self._record(spec, None, False, 0.0, "没有可用的设备")
+
+        self.history.save()
+        self.results.sort(key=lambda result: result["name"])
+        self._write_results(time.time() - started)
+        return self.results
+
+    def _worker(self, serial, pending):
+        while True:
+            try:
+                spec = pending.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                isolate_device(serial, spec.packages)
+            except Exception as e:
+                if self._isolation_failed(serial, spec, e, pending):
+                    print(f"[{serial}] 移出设备池")
+                    return
+                continue
+            print(f"[{serial}] 开始 {spec.name}")
+            started = time.time()
+            error = None
+            try:
+                passed = bool(spec.run(serial))
+            except Exception:
+                passed, error = False, traceback.format_exc()
+            duration = time.time() - started
+            self._record(spec, serial, passed, duration, error)
+            print(f"[{serial}] {'通过' if passed else '失败'} {spec.name} ({duration:.1f}s)")
+
+    def _isolation_failed(self, serial, spec, exc, pending):
+        """
+        设备准备失败: 同一错误已在max_device_failures个不同用例上出现时视为设备故障，
+        移出设备并把这些用例交还队列；否则视为用例本身的问题(如包名错误)，记为失败并保留设备
+
+        :return: 设备是否被移出设备池
+        """
+        message = f"{type(exc).__name__}: {exc}"
+        print(f"[{serial}] 准备 {spec.name} 失败: {message}")
+        with self._lock:
+            failed = self._isolation_failures.setdefault((serial, message), [])
+            if len({failed_spec.name for failed_spec, _ in failed} | {spec.name}) < self.max_device_failures:
+                result = {"name": spec.name, "serial": serial, "passed": False, "duration": 0.0,
+                          "error": f"设备准备失败: {message}"}
+                self.results.append(result)
+                failed.append((spec, result))
+                return False
+            # 设备故障: 之前因同一错误记为失败的用例撤销结果，与当前用例一起交给其他设备
+            self.removed.add(serial)
+            del self._isolation_failures[(serial, message)]
+            withdrawn = [id(result) for _, result in failed]
+            self.results = [result for result in self.results if id(result) not in withdrawn]
+            retry = [failed_spec for failed_spec, _ in failed] + [spec]
+        for retry_spec in retry:
+            pending.put(retry_spec)
+        return True
+
+    def _record(self, spec, serial, passed, duration, error):
+        with self._lock:
+            self.results.append({"name": spec.name, "serial": serial, "passed": passed,
+                                 "duration": round(duration, 2), "error": error})
+            if serial is not None:
+                self.history.update(spec.name, duration)
+
+    def _write_results(self, wall_time):
+        os.makedirs(self.output_dir, exist_ok=True)
+        summary = {
+            "devices": self.serials,
+            "wall_time": round(wall_time, 2),
+            "total_duration": round(sum(result["duration"] for result in self.results), 2),
+            "passed": sum(1 for result in self.results if result["passed"]),
+            "failed": sum(1 for result in self.results if not result["passed"]),
+            "results": self.results,
+        }
+        with open(os.path.join(self.output_dir, "results.json"), 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"完成: 通过 {summary['passed']}, 失败 {summary['failed']}, "
+              f"墙钟耗时 {summary['wall_time']}s (用例总耗时 {summary['total_duration']}s)")
+
+
+def settings_google(serial):
+    # settingtest 依赖本地的 config/contant.py，用到时再导入
+    from testcases.settingtest import SettingsGoogleTest
+    return SettingsGoogleTest(serial).run_test()
+
+
+DEFAULT_SUITE = [
+    TestSpec("settings_google", settings_google),
+]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="在设备池上并行执行测试用例")
+    parser.add_argument("--serials", nargs="*", default=None, help="设备序列号，默认使用adb devices中的全部设备")
+    parser.add_argument("--history", default="test_durations.json")
+    parser.add_argument("--out", default="test_results")
+    args = parser.parse_args()
+    results = DevicePoolRunner(args.serials, args.history, args.out).run(DEFAULT_SUITE)
+    exit(0 if all(result["passed"] for result in results) else 1)
@@ -4,6 +4,7 @@ import time
 from typing import Optional
 from config.contant import DS_API_KEY
 from libs.MobileAgent.api import inference_chat
+from libs.MobileAgent.locator import Locator
 class SettingsGoogleTest:
     def __init__(self, device_serial: Optional[str] = None):
         """
@@ -11,7 +12,7 @@ class SettingsGoogleTest:
         :param device_serial: 设备序列号，如果是USB连接的单设备可以为None
         """
         self.d = u2.connect(device_serial) if device_serial else u2.connect()
-        self.d.implicitly_wait(10)  # 设置隐式等待时间
+        self.locator = Locator(self.d)  # 备选选择器在一次UI树快照中解析，替代隐式等待
 
     def open_settings(self):
         """打开系统设置"""
@@ -35,22 +36,21 @@ class SettingsGoogleTest:
             {"textContains": "Google"}
         ]
 
-        for entry in google_entries:
-            if self.d(**entry).exists:
-                print(f"找到Google入口: {entry}")
-                element_info=self.d(**entry).info
-                print(element_info)
-                self.d(**entry).click()
-                time.sleep(3)
-                current_ui_tree=self.d.dump_hierarchy(compressed=True)
-                time.sleep(1)
-                print(current_ui_tree)
-                timestamp = time.strftime("%Y%m%d_%H%M%S")
-                self.d.screenshot(f"settings_test_failure_{timestamp}.png")
-                res=inference_chat(f" 我现在操作的元素信息时{element_info}\n 操作后UI树是{current_ui_tree} 请判断是否异常",DS_API_KEY)
-                time.sleep(2)
-                print(res)
-                return True
+        match = self.locator.wait(google_entries, timeout=10)
+        if match:
+            print(f"找到Google入口: {match}")
+            element_info = {"selector": match.selector, "text": match.text, "bounds": match.bounds}
+            self.d.click(*match.center)
+            time.sleep(3)
+            current_ui_tree=self.d.dump_hierarchy(compressed=True)
+            time.sleep(1)
+            print(current_ui_tree)
+            timestamp = time.strftime("%Y%m%d_%H%M%S")
+            self.d.screenshot(f"settings_test_failure_{timestamp}.png")
+            res=inference_chat(f" 我现在操作的元素信息时{element_info}\n 操作后UI树是{current_ui_tree} 请判断是否异常",DS_API_KEY)
+            time.sleep(2)
+            print(res)
+            return True
 
         # 如果没找到，尝试滚动查找
         return False
@@ -63,10 +63,10 @@ class SettingsGoogleTest:
             {"textContains": "Google services"}
         ]
 
-        for indicator in indicators:
-            if self.d(**indicator).exists:
-                print(f"确认在Google设置页面，标识: {indicator}")
-                return True
+        match = self.locator.wait(indicators, timeout=5)
+        if match:
+            print(f"确认在Google设置页面，标识: {match.selector}")
+            return True
         return False
 
     def press_back_and_verify(self):
@@ -76,7 +76,7 @@ class SettingsGoogleTest:
         time.sleep(2)
 
         # 验证是否返回主设置
-        if self.d(text="Settings").exists or self.d(description="Settings").exists:
+        if self.locator.wait([{"text": "Settings"}, {"description": "Settings"}], timeout=2):
             print("成功返回主设置页面")
             return True
 
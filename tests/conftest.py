@@ -0,0 +1,108 @@
+import itertools
+import os
+import sys
+
+# 测试按仓库根目录导入 libs.MobileAgent / testcases，视觉模块内部按 MobileAgent.xxx 导入，需要 libs 目录
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "libs"))
+
+
+import pytest
+from PIL import Image
+
+
+class FakeDevice:
+    """uiautomator2 设备的最小替身: 当前UI树、截图与当前应用都可由测试直接设置"""
+    def __init__(self, hierarchy="<hierarchy/>", package="com.example", activity=".Main"):
+        self.hierarchy = hierarchy
+        self.image = Image.new("RGB", (1080, 2400), (255, 255, 255))
+        self.app = {"package": package, "activity": activity}
+        self.serial = "fake-serial"
+        self.calls = []
+
+    def dump_hierarchy(self):
+        return self.hierarchy
+
+    def screenshot(self):
+        return self.image
+
+    def app_current(self):
+        return dict(self.app)
+
+    def window_size(self):
+        return self.image.size
+
+    def press(self, key):
+        self.calls.append(("press", key))
+
+    def click(self, x, y):
+        self.calls.append(("click", x, y))
+
+    def swipe(self, *args, **kwargs):
+        self.calls.append(("swipe",) + args)
+
+    def app_stop_all(self):
+        self.calls.append(("app_stop_all",))
+
+    def app_start(self, *args, **kwargs):
+        self.calls.append(("app_start",) + args)
+
+
+class FakeMeta:
+    def __init__(self, width=1080, height=2400):
+        self.width, self.height, self.size = width, height, (width, height)
+
+    def observe_hierarchy(self, hierarchy):
+        pass
+
+
+@pytest.fixture
+def make_traverser(tmp_path):
+    """不连接设备构造 AndroidUITraverser，只初始化被测逻辑用到的属性"""
+    pytest.importorskip("uiautomator2")
+    pytest.importorskip("pyshine")
+    from MobileAgent.AndroidUITraverser import AndroidUITraverser
+    from MobileAgent.action_program import ProgramWriter
+    from MobileAgent.async_device import AsyncDevice, SyncDevice
+    from MobileAgent.event_log import EventLog
+    from MobileAgent.image_hash import HashIndex
+
+    created = []
+
+    def make(device=None, **attrs):
+        traverser = AndroidUITraverser.__new__(AndroidUITraverser)
+        traverser.d = device or FakeDevice()
+        traverser.device = SyncDevice(AsyncDevice(traverser.d))
+        traverser.output_dir = str(tmp_path)
+        traverser.visited_hashes = set()
+        traverser.screen_hash_index = HashIndex(max_distance=6)
+        traverser.last_hierarchy = None
+        traverser.last_capture = None
+        traverser.snapshot_table = None
+        traverser.cluster_sample_size = None
+        traverser.cluster_explored = {}
+        traverser.list_clusters = []
+        traverser.cluster_covered_count = 0
+        traverser.device_meta = FakeMeta(*traverser.d.image.size)
+        traverser.visited_elements = set()
+        traverser.system_blacklist = []
+        traverser.max_depth = 3
+        traverser.events = EventLog(None, console_level=None)
+        traverser.anomaly_analyzer = None
+        traverser.snapshot_seq = 0
+        traverser.artifact_numbers = itertools.count(1)
+        traverser.input_since_snapshot = False
+        traverser.scheduler = None
+        traverser.programs = ProgramWriter(str(tmp_path))
+        traverser.action_path = []
+        traverser.xpath_accepts_source = True
+        for name, value in attrs.items():
+            setattr(traverser, name, value)
+        created.append(traverser)
+        return traverser
+
+    yield make
+    for traverser in created:
+        traverser.device.close()
+        traverser.events.close()
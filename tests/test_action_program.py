@@ -0,0 +1,99 @@
+import hashlib
+
+import numpy as np
+from PIL import Image
+
+from conftest import FakeDevice
+from libs.MobileAgent.action_program import (ProgramWriter, ReplayEngine, final_screen, find_node, load_programs,
+                                             make_step, screen_fingerprint)
+from test_hierarchy_diff import settings_page
+
+HOME = settings_page([f"Network {i}" for i in range(10)])
+WIFI = settings_page([f"Wi-Fi option {i}" for i in range(10)])
+BLUETOOTH = settings_page([f"Bluetooth option {i}" for i in range(10)])
+MAIN_APP = {"package": "com.example", "activity": ".Settings"}
+SUB_APP = {"package": "com.example", "activity": ".SubSettings"}
+ROW0 = {"className": "android.widget.TextView", "text": "Network 0", "resourceId": "",
+        "bounds": {"left": 20, "top": 20, "right": 800, "bottom": 100}}
+
+
+def picture(seed):
+    rng = np.random.default_rng(seed)
+    return Image.fromarray(np.kron(rng.integers(0, 256, (12, 6, 3), dtype=np.uint8), np.ones((200, 180, 1), dtype=np.uint8)))
+
+
+def md5(text):
+    return hashlib.md5(text.encode('utf-8')).hexdigest()
+
+
+class ReplayDevice(FakeDevice):
+    """点击第一行(任意列表位置)后进入 Wi-Fi 子页面"""
+    def __init__(self, image):
+        super().__init__(HOME, activity=".Settings")
+        self.image = image
+        self.dumps = 0
+
+    def dump_hierarchy(self):
+        self.dumps += 1
+        return self.hierarchy
+
+    def click(self, x, y):
+        super().click(x, y)
+        if 20 <= x <= 800 and y < 100:
+            self.hierarchy, self.app, self.image = WIFI, dict(SUB_APP), picture(2)
+
+
+def program(final_hierarchy=WIFI):
+    step = make_step("click", ROW0, screen_fingerprint(MAIN_APP, picture(1)))
+    return {"name": "path_0001", "app": "com.example", "steps": [step],
+            "final": final_screen(SUB_APP, False, md5(final_hierarchy))}
+
+
+def test_fingerprint_hit_taps_cached_point_without_dumping():
+    device = ReplayDevice(picture(1))
+    result = ReplayEngine(device, settle=0, launch_wait=0).run(program())
+    assert result["passed"] and result["fallbacks"] == 0
+    assert ("click", 410, 60) in device.calls
+    # 只有最终校验dump一次UI树
+    assert device.dumps == 1
+
+
+def test_fingerprint_miss_is_resolved_by_selector():
+    # 画面与录制时不同(如主题变化)，按选择器在一次dump中定位
+    device = ReplayDevice(picture(7))
+    result = ReplayEngine(device, settle=0, launch_wait=0).run(program())
+    assert result["passed"] and result["fallbacks"] == 1
+    assert device.dumps == 2
+
+
+def test_final_screen_mismatch_fails():
+    # 结构与窗口都相同、文字不同的子页面不算同一最终页面
+    result = ReplayEngine(ReplayDevice(picture(1)), settle=0, launch_wait=0).run(program(BLUETOOTH))
+    assert not result["passed"] and result["error"] == "最终页面与录制时不一致"
+
+
+def test_missing_selector_reports_failed_step():
+    device = ReplayDevice(picture(7))
+    step = make_step("click", dict(ROW0, text="Gone"), screen_fingerprint(MAIN_APP, picture(1)))
+    result = ReplayEngine(device, settle=0, launch_wait=0).run(dict(program(), steps=[step]))
+    assert not result["passed"] and result["failed_step"] == 0
+
+
+def test_find_node():
+    assert find_node(HOME, {"text": "Network 3"}) == [20, 620, 800, 700]
+    assert find_node(HOME, {"text": "Network 3", "className": "android.widget.Button"}) is None
+    assert find_node(HOME, {}) is None
+
+
+def test_writer_keeps_same_layout_sub_pages_apart(tmp_path):
+    writer = ProgramWriter(str(tmp_path))
+    step = make_step("click", ROW0, screen_fingerprint(MAIN_APP, picture(1)))
+    assert writer.write("com.example", [step], final_screen(SUB_APP, False, md5(WIFI)))
+    assert writer.write("com.example", [step], final_screen(SUB_APP, False, md5(BLUETOOTH)))
+    assert not writer.write("com.example", [step, step], final_screen(SUB_APP, False, md5(WIFI)))
+    programs = load_programs(writer.path)
+    assert [p["name"] for p in programs] == ["path_0001", "path_0002"]
+    # 续写时沿用已记录的页面
+    reopened = ProgramWriter(str(tmp_path))
+    assert not reopened.write("com.example", [step], final_screen(SUB_APP, False, md5(BLUETOOTH)))
+    assert reopened.write("com.example", [step], final_screen(dict(SUB_APP, activity=".Other"), False, md5(WIFI)))
@@ -0,0 +1,66 @@
+import json
+import os
+import random
+
+from PIL import Image
+
+from libs.MobileAgent.anomaly import AnomalyAnalyzer
+
+
+def write_frames(tmp_path, colors):
+    paths = []
+    for index, color in enumerate(colors, 1):
+        path = str(tmp_path / f"frame{index}.png")
+        image = Image.new("RGB", (120, 200), color)
+        image.paste((255 - color[0], 90, 30), (10, 10, 60, 60))
+        image.save(path)
+        paths.append(path)
+    return paths
+
+
+def read_flags(tmp_path):
+    path = tmp_path / "anomalies.jsonl"
+    if not path.exists():
+        return []
+    with open(path, encoding='utf-8') as f:
+        return [(os.path.basename(record["screenshot"]), flag["type"])
+                for record in map(json.loads, f) for flag in record["flags"]]
+
+
+def test_worker_pool_uses_spawn(tmp_path):
+    analyzer = AnomalyAnalyzer(str(tmp_path), workers=1)
+    try:
+        assert analyzer._pool._mp_context.get_start_method() == "spawn"
+    finally:
+        analyzer.close()
+
+
+def test_frames_are_analyzed_in_capture_order(tmp_path):
+    # 第1帧不同，之后4帧相同: 按截图顺序，第5帧是连续第3次输入后画面不变
+    paths = write_frames(tmp_path, [(10, 120, 200)] + [(200, 120, 10)] * 4)
+    analyzer = AnomalyAnalyzer(str(tmp_path), workers=2, freeze_frames=3)
+    order = list(range(1, 6))
+    random.Random(39).shuffle(order)
+    for seq in order:
+        analyzer.submit(paths[seq - 1], seq=seq, after_input=True)
+    analyzer.close()
+    assert read_flags(tmp_path) == [("frame5.png", "frozen")]
+
+
+def test_static_screen_without_input_is_not_frozen(tmp_path):
+    paths = write_frames(tmp_path, [(200, 120, 10)] * 5)
+    analyzer = AnomalyAnalyzer(str(tmp_path), workers=1, freeze_frames=3)
+    for seq, path in enumerate(paths, 1):
+        analyzer.submit(path, seq=seq, after_input=False)
+    analyzer.close()
+    assert read_flags(tmp_path) == []
+
+
+def test_discarded_sequence_does_not_stall(tmp_path):
+    paths = write_frames(tmp_path, [(200, 120, 10)] * 5)
+    analyzer = AnomalyAnalyzer(str(tmp_path), workers=1, freeze_frames=3)
+    analyzer.discard(2)
+    for seq in (5, 4, 3, 1):
+        analyzer.submit(paths[seq - 1], seq=seq, after_input=True)
+    analyzer.close()
+    assert read_flags(tmp_path) == [("frame5.png", "frozen")]
@@ -0,0 +1,94 @@
+import base64
+import gzip
+import io
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+from libs.MobileAgent import api_service
+from libs.MobileAgent.api_service import MobileAgentClient, MobileAgentServerError
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if self.headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        request = json.loads(body)
+        self.server.requests.append((dict(self.headers), request))
+        status = 500 if request["input"]["query"] == "fail" else 200
+        reply = json.dumps({"action": "tap", "query": request["input"]["query"]}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def screenshot(tmp_path):
+    path = tmp_path / "screen.png"
+    Image.new("RGB", (64, 128), (200, 30, 30)).save(path)
+    return str(path)
+
+
+def test_get_action_keeps_response_contract(stub_server, screenshot):
+    server, url = stub_server
+    response = api_service.get_action(screenshot, "open settings", "s1", url, "token")
+    assert response.status_code == 200
+    assert response.json()["query"] == "open settings"
+    # 非2xx不抛异常，由调用方自行检查
+    assert api_service.get_action(screenshot, "fail", "s1", url, "token").status_code == 500
+    headers, request = server.requests[0]
+    assert headers["Authorization"] == "token"
+    assert "Content-Encoding" not in headers
+    assert request["input"]["session_id"] == "s1" and request["input"]["screenshot"]
+    api_service.close_clients()
+    assert not api_service._clients
+
+
+def test_client_gzip_is_opt_in_and_get_result_raises(stub_server, screenshot):
+    server, url = stub_server
+    with MobileAgentClient(url, "token", compress=True, max_metrics=2) as client:
+        assert client.get_result(screenshot, "a", "s1")["action"] == "tap"
+        with pytest.raises(MobileAgentServerError) as error:
+            client.get_result(screenshot, "fail", "s1")
+        assert error.value.status_code == 500
+        assert client.submit(screenshot, "b", "s2").result().status_code == 200
+        # 耗时记录只保留最近 max_metrics 步
+        assert len(client.metrics) == 2
+        assert client.metrics[-1]["sent_bytes"] < client.metrics[-1]["raw_bytes"]
+    assert all(headers.get("Content-Encoding") == "gzip" for headers, _ in server.requests)
+    assert not client._sessions
+
+
+def test_screenshot_keeps_device_resolution(stub_server, tmp_path):
+    # 服务端返回的坐标基于上传的截图，截图不能被缩放
+    server, url = stub_server
+    path = tmp_path / "device.png"
+    Image.new("RGB", (1080, 2400), (20, 120, 200)).save(path)
+    with MobileAgentClient(url, "token") as client:
+        assert client.get_action(str(path), "tap", "s1").status_code == 200
+    payload = base64.b64decode(server.requests[0][1]["input"]["screenshot"])
+    assert payload[:3] == b"\xff\xd8\xff"
+    assert Image.open(io.BytesIO(payload)).size == (1080, 2400)
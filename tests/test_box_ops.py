@@ -0,0 +1,77 @@
+import numpy as np
+
+from MobileAgent.box_ops import cxcywh_to_xyxy, pad_boxes
+from MobileAgent.icon_localization import remove_boxes
+
+
+def reference_size(box):
+    return (box[2]-box[0]) * (box[3]-box[1])
+
+
+def reference_iou(box1, box2):
+    xA, yA = max(box1[0], box2[0]), max(box1[1], box2[1])
+    xB, yB = min(box1[2], box2[2]), min(box1[3], box2[3])
+    inter = max(0, xB - xA) * max(0, yB - yA)
+    return inter / (reference_size(box1) + reference_size(box2) - inter)
+
+
+def reference_remove_boxes(boxes_filt, size, iou_threshold=0.5):
+    """user-030 之前 icon_localization.remove_boxes 的双重循环"""
+    boxes_to_remove = set()
+    for i in range(len(boxes_filt)):
+        if reference_size(boxes_filt[i]) > 0.05*size[0]*size[1]:
+            boxes_to_remove.add(i)
+        for j in range(len(boxes_filt)):
+            if reference_size(boxes_filt[j]) > 0.05*size[0]*size[1]:
+                boxes_to_remove.add(j)
+            if i == j:
+                continue
+            if i in boxes_to_remove or j in boxes_to_remove:
+                continue
+            if reference_iou(boxes_filt[i], boxes_filt[j]) >= iou_threshold:
+                boxes_to_remove.add(j)
+    return [box for idx, box in enumerate(boxes_filt) if idx not in boxes_to_remove]
+
+
+def reference_convert(boxes, width, height):
+    """user-030 之前 det() 中逐行的 float32 转换与 int 截断"""
+    boxes = np.array(boxes, dtype=np.float32)
+    for i in range(len(boxes)):
+        boxes[i] = boxes[i] * np.array([width, height, width, height], dtype=np.float32)
+        boxes[i][:2] -= boxes[i][2:] / 2
+        boxes[i][2:] += boxes[i][:2]
+    return boxes.astype(np.int32).tolist()
+
+
+def random_boxes(rng, count, width, height):
+    x1 = rng.integers(0, width - 10, count)
+    y1 = rng.integers(0, height - 10, count)
+    w = rng.integers(1, width // 3, count)
+    h = rng.integers(1, height // 3, count)
+    boxes = np.stack([x1, y1, np.minimum(x1 + w, width), np.minimum(y1 + h, height)], axis=1)
+    # 加入重复与近似重复的框，覆盖NMS抑制路径
+    duplicates = boxes[rng.integers(0, count, count // 3)] + rng.integers(-3, 4, (count // 3, 4))
+    return np.concatenate([boxes, duplicates]).tolist()
+
+
+def test_remove_boxes_matches_reference():
+    rng = np.random.default_rng(30)
+    size = (1080, 2400)
+    assert remove_boxes([], size) == []
+    for _ in range(200):
+        boxes = random_boxes(rng, int(rng.integers(1, 40)), *size)
+        for threshold in (0.3, 0.5):
+            assert remove_boxes(boxes, size, threshold) == reference_remove_boxes(boxes, size, threshold)
+
+
+def test_box_conversion_and_padding_match_reference():
+    rng = np.random.default_rng(31)
+    width, height = 1080, 2400
+    for _ in range(100):
+        boxes = rng.random((int(rng.integers(1, 30)), 4), dtype=np.float32) * 0.5
+        converted = cxcywh_to_xyxy(boxes, width, height)
+        assert converted.tolist() == reference_convert(boxes, width, height)
+        for pad in (10, 25):
+            expected = [[max(0, b[0]-pad), max(0, b[1]-pad), min(b[2]+pad, width), min(b[3]+pad, height)]
+                        for b in converted.tolist()]
+            assert pad_boxes(converted, pad, width, height).tolist() == expected
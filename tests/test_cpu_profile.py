@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("clip")
+from MobileAgent.cpu_profile import CPUInferenceProfile, DEFAULT_FIXTURES, load_fixtures, rescale_boxes
+from MobileAgent.icon_localization import det
+
+
+class FakeTensor:
+    def __init__(self, array):
+        self.array = array
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.array
+
+
+class FakeGroundingDINO:
+    """按归一化坐标返回固定检测框，与输入分辨率无关"""
+    def __init__(self, boxes):
+        self.boxes = np.asarray(boxes, dtype=np.float32)
+
+    def __call__(self, inputs):
+        return {"boxes": FakeTensor(self.boxes)}
+
+
+def test_fixtures_resolve_to_committed_images():
+    fixtures = load_fixtures(DEFAULT_FIXTURES)
+    assert fixtures
+    for fixture in fixtures:
+        assert os.path.exists(fixture["image"])
+        assert fixture["texts"] and fixture["icons"]
+
+
+def test_downscaled_det_pads_in_original_pixels():
+    image_path = load_fixtures(DEFAULT_FIXTURES)[0]["image"]
+    model = FakeGroundingDINO([[0.125, 0.3, 0.05, 0.02], [0.5, 0.5, 0.1, 0.03]])
+    base_data, base_coordinate = det(image_path, "icon", model)
+    data, coordinate = CPUInferenceProfile(det_max_side=1024).det(image_path, "icon", model)
+    # 原图与缩小图上的检测框只差取整，留边仍是原图的10/25像素
+    assert np.abs(np.array(data) - np.array(base_data)).max() <= 3
+    assert np.abs(np.array(coordinate) - np.array(base_coordinate)).max() <= 3
+    assert (np.array(coordinate)[:, 2:] - np.array(data)[:, 2:]).tolist() == [[15, 15], [15, 15]]
+
+
+def test_rescale_boxes_clamps_to_image():
+    assert rescale_boxes([[10, 20, 500, 1000]], 2.5, (1080, 2400)).tolist() == [[25, 50, 1080, 2400]]
+
+
+def test_default_threads_use_physical_cores(monkeypatch):
+    monkeypatch.setattr("os.cpu_count", lambda: 16)
+    monkeypatch.setattr("psutil.cpu_count", lambda logical=True: 16 if logical else 8)
+    assert CPUInferenceProfile().num_threads == 8
+    assert CPUInferenceProfile(num_threads=3).num_threads == 3
+    # 部分平台取不到物理核数
+    monkeypatch.setattr("psutil.cpu_count", lambda logical=True: 16 if logical else None)
+    assert CPUInferenceProfile().num_threads == 16
@@ -0,0 +1,84 @@
+import math
+
+import cv2
+import numpy as np
+import pytest
+
+# crop 模块在导入时加载CLIP
+pytest.importorskip("torch")
+pytest.importorskip("clip")
+from MobileAgent.crop import crop_image, crop_image_batch, order_quads
+
+
+def reference_crop_image(img, position):
+    """user-037 之前的 crop_image: 冒泡排序四点后统一做透视变换"""
+    def distance(x1, y1, x2, y2):
+        return math.sqrt(pow(x1 - x2, 2) + pow(y1 - y2, 2))
+    position = position.tolist()
+    for i in range(4):
+        for j in range(i+1, 4):
+            if position[i][0] > position[j][0]:
+                position[i], position[j] = position[j], position[i]
+    if position[0][1] > position[1][1]:
+        position[0], position[1] = position[1], position[0]
+    if position[2][1] > position[3][1]:
+        position[2], position[3] = position[3], position[2]
+    corners = np.array([position[0], position[2], position[1], position[3]], np.float32)
+    (x1, y1), (x2, y2), (x4, y4), (x3, y3) = corners.tolist()
+    img_width = distance((x1+x4)/2, (y1+y4)/2, (x2+x3)/2, (y2+y3)/2)
+    img_height = distance((x1+x2)/2, (y1+y2)/2, (x4+x3)/2, (y4+y3)/2)
+    corners_trans = np.array([[0, 0], [img_width - 1, 0], [0, img_height - 1], [img_width - 1, img_height - 1]], np.float32)
+    transform = cv2.getPerspectiveTransform(corners, corners_trans)
+    return cv2.warpPerspective(img, transform, (int(img_width), int(img_height)))
+
+
+def rotated_quad(rng, width, height):
+    cx, cy = rng.uniform(100, width - 100), rng.uniform(60, height - 60)
+    w, h, angle = rng.uniform(20, 180), rng.uniform(10, 50), rng.uniform(0.1, 0.6) * rng.choice([-1, 1])
+    corners = np.array([[-w, -h], [w, -h], [w, h], [-w, h]]) / 2
+    rotation = np.array([[math.cos(angle), -math.sin(angle)], [math.sin(angle), math.cos(angle)]])
+    quad = corners @ rotation.T + [cx, cy]
+    return quad[rng.permutation(4)].astype(np.float32)
+
+
+@pytest.fixture
+def screenshot():
+    rng = np.random.default_rng(37)
+    return rng.integers(0, 256, (600, 400, 3), dtype=np.uint8)
+
+
+def test_rotated_quads_match_reference(screenshot):
+    rng = np.random.default_rng(1)
+    quads = [rotated_quad(rng, 400, 600) for _ in range(50)]
+    for quad, crop in zip(quads, crop_image_batch(screenshot, quads)):
+        assert np.array_equal(crop, reference_crop_image(screenshot, quad))
+    assert np.array_equal(crop_image(screenshot, quads[0]), reference_crop_image(screenshot, quads[0]))
+
+
+def test_quad_order_matches_reference():
+    rng = np.random.default_rng(2)
+    for _ in range(100):
+        quad = rotated_quad(rng, 400, 600)
+        position = quad.tolist()
+        for i in range(4):
+            for j in range(i+1, 4):
+                if position[i][0] > position[j][0]:
+                    position[i], position[j] = position[j], position[i]
+        left = sorted(position[:2], key=lambda p: p[1])
+        right = sorted(position[2:], key=lambda p: p[1])
+        assert order_quads([quad])[0].tolist() == [left[0], right[0], left[1], right[1]]
+
+
+def test_axis_aligned_slices_match_reference_size_and_content():
+    # 水平矩形走切片而非透视变换: 尺寸一致，像素只差透视变换(w-1)/w缩放带来的插值
+    y, x = np.mgrid[0:600, 0:400]
+    smooth = np.stack([x * 0.5, y * 0.4, (x + y) * 0.25], axis=-1).astype(np.uint8)
+    rng = np.random.default_rng(3)
+    for _ in range(50):
+        x1, y1 = int(rng.integers(0, 300)), int(rng.integers(0, 500))
+        x2, y2 = x1 + int(rng.integers(20, 100)), y1 + int(rng.integers(10, 100))
+        quad = np.array([[x2, y2], [x1, y1], [x2, y1], [x1, y2]], np.float32)
+        crop = crop_image(smooth, quad)
+        expected = reference_crop_image(smooth, quad)
+        assert crop.shape == expected.shape
+        assert np.abs(crop.astype(int) - expected.astype(int)).max() <= 1
@@ -0,0 +1,87 @@
+import pytest
+
+from libs.MobileAgent import device_metadata
+from libs.MobileAgent.device_metadata import DeviceMetadata, for_device, invalidate
+
+
+class Shell:
+    output = "Physical density: 440"
+
+
+class MetaDevice:
+    def __init__(self, apps, serial="meta-serial", size=(1080, 2400)):
+        self.apps = apps
+        self.serial = serial
+        self.size = size
+        self.info = {"displayRotation": 0, "sdkInt": 33}
+
+    def window_size(self):
+        return self.size
+
+    def shell(self, command):
+        return Shell()
+
+    def app_list(self):
+        return list(self.apps)
+
+
+APPS = [{"package": "com.android.settings", "name": "Settings"},
+        {"package": "com.example.settingsbackup", "name": "Settings Backup"},
+        {"package": "com.google.android.calendar", "name": "Calendar"},
+        {"package": "com.example.calculator", "name": "Calculator"},
+        {"package": "com.example.maps", "name": "Maps"},
+        {"package": "com.example.mapsgo", "name": "Mapsgo"}]
+
+
+def test_lookup_prefers_exact_then_shortest_match():
+    meta = DeviceMetadata(MetaDevice(APPS))
+    assert meta.find_package("settings") == "com.android.settings"
+    assert meta.find_package("SETTINGS BACK") == "com.example.settingsbackup"
+    # "cal" 同时包含于 Calendar 与 Calculator，取更短的应用名
+    assert meta.find_package("cal") == "com.google.android.calendar"
+    assert meta.find_package("map") == "com.example.maps"
+    assert meta.find_package("nothing") is None
+
+
+def test_lookup_is_independent_of_install_order():
+    for apps in (APPS, APPS[::-1]):
+        assert DeviceMetadata(MetaDevice(apps)).find_package("calc") == "com.example.calculator"
+
+
+def test_ambiguous_partial_match_raises():
+    apps = [{"package": "com.example.notes", "name": "Notes A"}, {"package": "com.other.notes", "name": "Notes B"}]
+    with pytest.raises(ValueError):
+        DeviceMetadata(MetaDevice(apps)).find_package("notes")
+
+
+def test_package_names_are_matched_deterministically():
+    apps = ["com.example.mail", "com.example.mailbox", "org.mail.client"]
+    meta = DeviceMetadata(MetaDevice(apps))
+    assert meta.find_package("example.mail") == "com.example.mail"
+    assert meta.find_package("mail") == "org.mail.client"
+    with pytest.raises(ValueError):
+        DeviceMetadata(MetaDevice(["com.a.mail", "com.b.mail"])).find_package("mail")
+
+
+def test_for_device_is_refreshed_on_reconnect(monkeypatch):
+    monkeypatch.setattr(device_metadata, "_devices", {})
+    first = MetaDevice(APPS)
+    meta = for_device(first)
+    assert for_device(first) is meta
+    # 同一序列号重新连接后是新的设备对象，屏幕等信息重新读取
+    reconnected = MetaDevice(APPS, size=(1440, 3200))
+    assert for_device(reconnected).size == (1440, 3200)
+    invalidate("meta-serial")
+    assert for_device(reconnected) is not meta
+    assert for_device(MetaDevice(APPS, serial="other")) is not for_device(reconnected)
+
+
+def test_package_change_is_seen_after_invalidation():
+    device = MetaDevice(APPS)
+    meta = DeviceMetadata(device)
+    assert meta.find_package("maps") == "com.example.maps"
+    # 已缓存的名称不会触发刷新，卸载并以新包名重装后需要显式失效
+    device.apps = [app for app in APPS if app["name"] != "Maps"] + [{"package": "com.other.maps", "name": "Maps"}]
+    assert meta.find_package("maps") == "com.example.maps"
+    meta.on_package_installed()
+    assert meta.find_package("maps") == "com.other.maps"
@@ -0,0 +1,48 @@
+import time
+
+import pytest
+
+pytest.importorskip("uiautomator2")
+
+from testcases import device_pool
+from testcases.device_pool import DevicePoolRunner
+
+
+def passing(serial):
+    time.sleep(0.05)
+    return True
+
+
+def run_pool(monkeypatch, tmp_path, serials, isolate, specs):
+    monkeypatch.setattr(device_pool, "isolate_device", isolate)
+    runner = DevicePoolRunner(serials, history_path=None, output_dir=str(tmp_path))
+    results = runner.run(specs)
+    return runner, {result["name"]: result for result in results}
+
+
+def test_spec_specific_isolation_error_keeps_the_device(monkeypatch, tmp_path):
+    def isolate(serial, packages=()):
+        for package in packages:
+            if package == "com.missing":
+                raise RuntimeError(f"app_clear {package}: unknown package")
+
+    specs = [device_pool.TestSpec("broken", passing, ["com.missing"])] + [device_pool.TestSpec(f"case{i}", passing) for i in range(4)]
+    runner, results = run_pool(monkeypatch, tmp_path, ["a", "b"], isolate, specs)
+    assert runner.removed == set()
+    assert not results["broken"]["passed"] and "设备准备失败" in results["broken"]["error"]
+    assert all(results[f"case{i}"]["passed"] for i in range(4))
+    assert len(results) == 5
+
+
+def test_same_error_across_specs_removes_the_device(monkeypatch, tmp_path):
+    def isolate(serial, packages=()):
+        if serial == "dead":
+            raise ConnectionError("device offline")
+        time.sleep(0.05)
+
+    specs = [device_pool.TestSpec(f"case{i}", passing) for i in range(5)]
+    runner, results = run_pool(monkeypatch, tmp_path, ["dead", "good"], isolate, specs)
+    assert runner.removed == {"dead"}
+    # 设备故障前记为失败的用例撤销结果，交给其他设备重新执行
+    assert sorted(results) == [f"case{i}" for i in range(5)]
+    assert all(result["passed"] and result["serial"] == "good" for result in results.values())
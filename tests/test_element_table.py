@@ -0,0 +1,101 @@
+import numpy as np
+
+from libs.MobileAgent.element_table import ElementTable, StringPool
+
+
+def info(resource_id, bounds, text=""):
+    left, top, right, bottom = bounds
+    return {"resourceId": resource_id, "text": text, "className": "android.widget.TextView",
+            "bounds": {"left": left, "top": top, "right": right, "bottom": bottom}}
+
+
+def test_match_evaluates_only_strings_present_in_table():
+    pool = StringPool()
+    for i in range(1000):
+        pool.intern(f"com.other:id/item_{i}")
+    infos = [info("com.android.systemui:id/clock", (0, 0, 100, 50)),
+             info("com.app:id/title", (0, 100, 500, 200)),
+             info("com.app:id/title", (0, 200, 500, 300)),
+             info("", (0, 300, 500, 400))]
+    table = ElementTable.from_infos(infos, pool)
+    seen = []
+
+    def predicate(value):
+        seen.append(value)
+        return "systemui" in value
+
+    assert pool.match(table.resource_ids, predicate).tolist() == [True, False, False, False]
+    assert sorted(seen) == ["", "com.android.systemui:id/clock", "com.app:id/title"]
+
+
+def test_blacklist_and_size_masks():
+    table = ElementTable.from_infos([info("com.android.systemui:id/clock", (0, 0, 100, 50)),
+                                     info("com.app:id/title", (0, 100, 500, 200)),
+                                     info("com.app:id/dot", (0, 300, 5, 305))])
+    keep = ~table.blacklist_mask(["systemui"]) & table.size_mask(10, 10)
+    assert keep.tolist() == [False, True, False]
+    assert table.blacklist_mask([]).tolist() == [False, False, False]
+
+
+def test_match_on_empty_table():
+    table = ElementTable.from_infos([])
+    assert table.blacklist_mask(["systemui"]).shape == (0,)
+
+
+def test_visible_mask_matches_edge_check():
+    bounds = [(0, 0, 1080, 2400), (-5, 0, 100, 100), (0, 2300, 100, 2500), (100, 100, 200, 200)]
+    table = ElementTable.from_infos([info("", b) for b in bounds])
+    expected = [all(0 <= v <= 1080 for v in (l, r)) and all(0 <= v <= 2400 for v in (t, b))
+                for l, t, r, b in bounds]
+    assert table.visible_mask(1080, 2400).tolist() == expected
+
+
+def test_hit_test_returns_topmost_node():
+    hierarchy = """<hierarchy rotation="0">
+      <node class="android.widget.FrameLayout" bounds="[0,0][1080,2400]" clickable="false">
+        <node class="android.widget.Button" text="ok" bounds="[100,100][400,300]" clickable="true" />
+        <node class="android.view.View" bounds="[0,0][1080,2400]" clickable="false" />
+      </node>
+    </hierarchy>"""
+    table = ElementTable.from_hierarchy(hierarchy)
+    assert table.hit_test(200, 200) == 2
+    assert table.hit_test(200, 200, table.has_flag("clickable")) == 1
+    assert table.texts(np.array([1])) == ["ok"]
+
+
+OVERLAY = """<hierarchy rotation="0">
+  <node class="android.widget.FrameLayout" bounds="[0,0][1080,2400]">
+    <node class="android.widget.LinearLayout" bounds="[0,100][1080,300]" clickable="true">
+      <node class="android.widget.TextView" text="Wi-Fi" bounds="[20,120][800,280]" />
+    </node>
+    <node class="android.widget.TextView" text="Bluetooth" bounds="[0,1200][1080,1400]" clickable="true" />
+    <node class="android.widget.TextView" text="Hint" bounds="[0,1400][1080,1600]" />
+    <node class="android.widget.ImageButton" content-desc="Add" bounds="[0,1180][1080,1420]" clickable="true" />
+    <node class="android.view.View" bounds="[0,1380][1080,1600]" />
+  </node>
+</hierarchy>"""
+
+
+def test_occluders_ignore_ancestors_and_non_clickable_layers():
+    table = ElementTable.from_hierarchy(OVERLAY)
+    row, text, bluetooth, hint, fab = (table.index_of(b) for b in (
+        [0, 100, 1080, 300], [20, 120, 800, 280], [0, 1200, 1080, 1400], [0, 1400, 1080, 1600], [0, 1180, 1080, 1420]))
+    assert table.is_ancestor(row, text) and not table.is_ancestor(text, row)
+    clickable = table.has_flag("clickable")
+    # 行内文字被其可点击的父节点覆盖，不算遮挡
+    assert table.occluders(text, 0.5, clickable) == []
+    assert table.occluders(bluetooth, 0.5, clickable) == [fab]
+    # 只有不可点击的节点覆盖在上方时，按可点击掩码不算遮挡
+    assert table.occluders(hint, 0.5, clickable) == []
+    assert len(table.occluders(hint, 0.5)) == 1
+
+
+def test_index_of_accepts_info_bounds_and_misses():
+    table = ElementTable.from_hierarchy(OVERLAY)
+    assert table.index_of({"left": 0, "top": 1200, "right": 1080, "bottom": 1400}) == 3
+    assert table.index_of([1, 2, 3, 4]) == -1
+
+
+def test_is_ancestor_without_parents_uses_containment():
+    table = ElementTable.from_infos([info("", (0, 0, 1080, 500)), info("", (10, 10, 100, 100))])
+    assert table.is_ancestor(0, 1) and not table.is_ancestor(1, 0)
@@ -0,0 +1,39 @@
+import json
+
+from libs.MobileAgent.event_log import DEBUG, INFO, EventLog, element_summary
+
+INFO_DICT = {"className": "android.widget.Button", "resourceId": "com.example:id/ok", "text": "OK",
+             "bounds": {"left": 1, "top": 2, "right": 3, "bottom": 4}}
+
+
+class CountingElement:
+    def __init__(self):
+        self.reads = 0
+
+    @property
+    def info(self):
+        self.reads += 1
+        return INFO_DICT
+
+
+def test_lazy_fields_are_not_built_below_the_level(tmp_path):
+    events = EventLog(str(tmp_path), level=INFO, console_level=None)
+    element = CountingElement()
+    events.debug("element", element=lambda: element_summary(element.info))
+    assert element.reads == 0
+    assert not events.enabled_for(DEBUG)
+    events.action(element=lambda: element_summary(element.info), op="click")
+    assert element.reads == 1
+    events.close()
+    with open(tmp_path / "events.jsonl", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert [r["type"] for r in records] == ["action"]
+    assert records[0]["element"] == {"class": "Button", "rid": "com.example:id/ok", "text": "OK", "bounds": [1, 2, 3, 4]}
+
+
+def test_closed_log_does_not_build_fields(tmp_path):
+    events = EventLog(str(tmp_path), level=DEBUG, console_level=None)
+    events.close()
+    element = CountingElement()
+    events.action(element=lambda: element_summary(element.info))
+    assert element.reads == 0
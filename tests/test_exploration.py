@@ -0,0 +1,74 @@
+import pytest
+
+from libs.MobileAgent.exploration import NoveltyScheduler, jaccard_distance, parts_signature
+
+
+def parts(*ids, package="com.example"):
+    return frozenset((package, "android.widget.TextView", f"{package}:id/{i}") for i in ids)
+
+
+def info(resource_id, text="", class_name="android.widget.TextView"):
+    return {"className": class_name, "resourceId": f"com.example:id/{resource_id}", "text": text}
+
+
+HOME = parts("toolbar", "list", "row", "title")
+DETAIL_A = parts("toolbar", "detail", "summary", "image")
+DETAIL_B = parts("toolbar", "detail", "summary", "image", "share")
+ABOUT = parts("logo", "version", "licenses")
+
+
+def scheduler_with(*screens):
+    scheduler = NoveltyScheduler()
+    for screen in screens:
+        scheduler.discover_screen(parts_signature(screen), screen)
+    return scheduler
+
+
+def test_jaccard_distance():
+    assert jaccard_distance(HOME, HOME) == 0.0
+    assert jaccard_distance(DETAIL_A, DETAIL_B) == pytest.approx(0.2)
+    assert jaccard_distance(frozenset(), frozenset()) == 0.0
+
+
+def test_novelty_depends_on_each_elements_own_target():
+    home = parts_signature(HOME)
+    scheduler = scheduler_with(HOME, ABOUT, DETAIL_A, DETAIL_B)
+    scheduler.record(info("row", "Item 1"), "new_screen", False, parts_signature(DETAIL_A), home)
+    scheduler.record(info("about"), "new_screen", False, parts_signature(ABOUT), home)
+    # 同一页面上的元素得分不再相同: 到达页面与已知页面几乎相同的元素新颖度低
+    row, about, unknown = (scheduler.novelty(i, home) for i in (info("row", "Item 1"), info("about"), info("help")))
+    assert unknown == 1.0
+    assert about > row
+    assert row == scheduler.screen_distance(parts_signature(DETAIL_A)) / 2
+
+
+def test_unoperated_element_uses_its_kind_history():
+    home = parts_signature(HOME)
+    scheduler = scheduler_with(HOME, DETAIL_A, DETAIL_B)
+    scheduler.record(info("row", "Item 1"), "new_screen", True, parts_signature(DETAIL_A), home)
+    assert scheduler.novelty(info("row", "Item 2"), home) == scheduler.novelty(info("row", "Item 1"), home)
+    assert scheduler.novelty(info("row", "Item 2"), home) < 1.0
+
+
+def test_distance_is_updated_when_new_screens_are_found():
+    scheduler = scheduler_with(HOME, DETAIL_A)
+    before = scheduler.screen_distance(parts_signature(DETAIL_A))
+    scheduler.visit_screen(parts_signature(DETAIL_B), DETAIL_B)
+    assert scheduler.screen_distance(parts_signature(DETAIL_A)) < before
+
+
+def test_ranking_is_updated_after_each_record():
+    home = parts_signature(HOME)
+    scheduler = scheduler_with(HOME, DETAIL_A, DETAIL_B)
+    elements = ["row 1", "row 2", "about"]
+    infos = [info("row", "Item 1"), info("row", "Item 2"), info("about", class_name="android.widget.Button")]
+    assert scheduler.order(elements, infos, home) == ["row 1", "row 2", "about"]
+
+    operated = []
+    for element in scheduler.iter_ranked(elements, infos, home):
+        operated.append(element)
+        if element == "row 1":
+            # 第一行打开的详情页与已知页面几乎相同，同类的第二行降级
+            scheduler.visit_screen(parts_signature(DETAIL_B), DETAIL_B)
+            scheduler.record(infos[0], "new_screen", False, parts_signature(DETAIL_B), home)
+    assert operated == ["row 1", "about", "row 2"]
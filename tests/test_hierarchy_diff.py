@@ -0,0 +1,71 @@
+from libs.MobileAgent.hierarchy_diff import IN_PLACE, NEW_SCREEN, NO_OP, OVERLAY, diff_hierarchies
+
+APP = {"package": "com.example", "activity": ".SubSettings"}
+
+
+def settings_page(titles, checked="false", summary="Off"):
+    items = "".join(
+        f'<node index="{i}" class="android.widget.LinearLayout" package="com.example" clickable="true" '
+        f'bounds="[0,{i * 200}][1080,{i * 200 + 190}]">'
+        f'<node index="0" class="android.widget.TextView" package="com.example" text="{titles[i]}" '
+        f'bounds="[20,{i * 200 + 20}][800,{i * 200 + 100}]" />'
+        f'<node index="1" class="android.widget.TextView" package="com.example" text="{summary if i == 0 else ""}" '
+        f'bounds="[20,{i * 200 + 100}][800,{i * 200 + 170}]" />'
+        f'<node index="2" class="android.widget.Switch" package="com.example" checked="{checked if i == 5 else "false"}" '
+        f'bounds="[900,{i * 200 + 50}][1040,{i * 200 + 140}]" /></node>'
+        for i in range(len(titles)))
+    return ('<hierarchy rotation="0"><node index="0" class="android.widget.FrameLayout" package="com.example" '
+            f'bounds="[0,0][1080,2400]"><node index="0" class="androidx.recyclerview.widget.RecyclerView" '
+            f'package="com.example" bounds="[0,0][1080,2400]">{items}</node></node></hierarchy>')
+
+
+MAIN = settings_page([f"Network {i}" for i in range(10)])
+ROW0 = {"left": 0, "top": 0, "right": 1080, "bottom": 190}
+
+
+def test_structurally_identical_sub_page_is_a_new_screen():
+    # 点击后进入的子页面与原页面结构完全相同，只有文字不同
+    sub_page = settings_page([f"Wi-Fi option {i}" for i in range(10)])
+    diff = diff_hierarchies(MAIN, sub_page, "com.example", APP, APP, ROW0)
+    assert diff["effect"] == NEW_SCREEN
+    assert not diff["added"] and not diff["removed"]
+
+
+def test_state_toggle_anywhere_is_in_place():
+    diff = diff_hierarchies(MAIN, settings_page([f"Network {i}" for i in range(10)], checked="true"),
+                            "com.example", APP, APP, ROW0)
+    assert diff["effect"] == IN_PLACE
+
+
+def test_text_change_inside_clicked_row_is_in_place():
+    after = settings_page([f"Network {i}" for i in range(10)], summary="On")
+    assert diff_hierarchies(MAIN, after, "com.example", APP, APP, ROW0)["effect"] == IN_PLACE
+    # 同样的变化若不在被点击元素的子树内，则视为新页面
+    row3 = {"left": 0, "top": 600, "right": 1080, "bottom": 790}
+    assert diff_hierarchies(MAIN, after, "com.example", APP, APP, row3)["effect"] == NEW_SCREEN
+    # 没有被点击元素信息时，文字变化不是原地变化
+    assert diff_hierarchies(MAIN, after, "com.example")["effect"] == NEW_SCREEN
+
+
+def test_large_clicked_subtree_is_not_in_place():
+    after = settings_page([f"Network {i}" for i in range(10)], summary="On")
+    whole_list = {"left": 0, "top": 0, "right": 1080, "bottom": 2400}
+    assert diff_hierarchies(MAIN, after, "com.example", APP, APP, whole_list)["effect"] == NEW_SCREEN
+    assert diff_hierarchies(MAIN, after, "com.example", APP, APP, whole_list, in_place_nodes=100)["effect"] == IN_PLACE
+
+
+def test_activity_or_package_change_is_a_new_screen():
+    toggled = settings_page([f"Network {i}" for i in range(10)], checked="true")
+    other_activity = dict(APP, activity=".WifiSettings")
+    assert diff_hierarchies(MAIN, MAIN, "com.example", APP, other_activity, ROW0)["effect"] == NEW_SCREEN
+    assert diff_hierarchies(MAIN, toggled, "com.example", APP, other_activity, ROW0)["effect"] == NEW_SCREEN
+    other_package = dict(APP, package="com.example.helper")
+    assert diff_hierarchies(MAIN, MAIN, "com.example", APP, other_package, ROW0)["effect"] == NEW_SCREEN
+    assert diff_hierarchies(MAIN, MAIN, "com.example", APP, dict(APP), ROW0)["effect"] == NO_OP
+
+
+def test_dialog_window_is_an_overlay():
+    dialog = MAIN.replace("</hierarchy>", '<node index="0" class="android.widget.FrameLayout" package="com.example" '
+                                          'bounds="[100,800][980,1600]"><node index="0" class="android.widget.Button" '
+                                          'package="com.example" text="OK" bounds="[600,1400][900,1550]" /></node></hierarchy>')
+    assert diff_hierarchies(MAIN, dialog, "com.example", APP, APP, ROW0)["effect"] == OVERLAY
@@ -0,0 +1,39 @@
+import base64
+import io
+
+import numpy as np
+from PIL import Image
+
+from libs.MobileAgent.image_payload import ImagePayloadCache, load_image
+
+
+def test_load_image_treats_arrays_as_bgr():
+    bgr = np.zeros((4, 6, 3), dtype=np.uint8)
+    bgr[..., 2] = 255  # OpenCV 中的红色
+    assert load_image(bgr).getpixel((0, 0)) == (255, 0, 0)
+
+    bgra = np.zeros((4, 6, 4), dtype=np.uint8)
+    bgra[..., 0], bgra[..., 3] = 255, 128
+    image = load_image(bgra)
+    assert image.mode == "RGBA" and image.getpixel((0, 0)) == (0, 0, 255, 128)
+
+    gray = np.full((4, 6), 77, dtype=np.uint8)
+    assert load_image(gray).getpixel((0, 0)) == 77
+
+
+def test_load_image_passes_through_pil_and_paths(tmp_path):
+    image = Image.new("RGB", (8, 8), (10, 20, 30))
+    assert load_image(image) is image
+    path = tmp_path / "image.png"
+    image.save(path)
+    assert load_image(str(path)).convert("RGB").getpixel((0, 0)) == (10, 20, 30)
+
+
+def test_payload_cache_downscales_and_hits(tmp_path):
+    path = tmp_path / "screen.png"
+    Image.new("RGB", (2000, 1000), (200, 30, 30)).save(path)
+    cache = ImagePayloadCache()
+    payload = cache.encode(str(path), "default")
+    assert cache.encode(str(path), "default") == payload
+    assert Image.open(io.BytesIO(base64.b64decode(payload))).size == (1280, 640)
+    assert cache.stats()["hits"] == 1
@@ -0,0 +1,46 @@
+import cv2
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("clip")
+from MobileAgent import incremental_ocr
+from MobileAgent.incremental_ocr import IncrementalOCR, changed_tiles
+
+
+def render(text, origin, size=(240, 320)):
+    image = np.full(size + (3,), 255, dtype=np.uint8)
+    cv2.putText(image, text, origin, cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 1)
+    return image
+
+
+# (100, 200) 处的文字跨越块边界，按块平均差时这些修改都会被漏掉
+@pytest.mark.parametrize("origin", [(40, 120), (100, 200)])
+@pytest.mark.parametrize("before,after", [("1", "7"), ("12:01", "12:07"), ("5", "6")])
+def test_single_character_edits_are_detected(before, after, origin):
+    prev_gray = cv2.cvtColor(render(before, origin), cv2.COLOR_BGR2GRAY)
+    curr_gray = cv2.cvtColor(render(after, origin), cv2.COLOR_BGR2GRAY)
+    assert changed_tiles(prev_gray, curr_gray).sum() > 0
+    assert changed_tiles(prev_gray, prev_gray).sum() == 0
+
+
+def test_slow_drift_is_compared_against_last_ocr_frame(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(incremental_ocr, "detect_and_recognize", lambda path, d, r: ([], []))
+
+    def ocr_regions(image_full, regions, d, r):
+        calls.append(regions)
+        return [], []
+    monkeypatch.setattr(incremental_ocr, "ocr_regions", ocr_regions)
+
+    engine = IncrementalOCR(None, None)
+    base = np.full((256, 256, 3), 100, dtype=np.uint8)
+    for step in range(6):
+        frame = base.copy()
+        # 每帧只变化10个灰度，低于单帧阈值，累积3帧后超过
+        frame[40:60, 40:60] = 100 + 10 * step
+        path = str(tmp_path / f"frame{step}.png")
+        cv2.imwrite(path, frame)
+        engine.update(path)
+    assert len(calls) >= 1
+    assert all(region[0] <= 40 and region[2] >= 60 for regions in calls for region in regions)
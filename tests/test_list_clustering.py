@@ -0,0 +1,46 @@
+from libs.MobileAgent.list_clustering import covered_mask, find_clusters, mark_operated
+
+
+def list_screen(rows=6, title="item"):
+    items = "".join(
+        f'<node class="android.widget.LinearLayout" resource-id="com.example:id/row" bounds="[0,{i * 200}][1080,{i * 200 + 190}]">'
+        f'<node class="android.widget.TextView" resource-id="com.example:id/title" text="{title} {i}" '
+        f'bounds="[20,{i * 200 + 20}][800,{i * 200 + 170}]" /></node>'
+        for i in range(rows))
+    return ('<hierarchy rotation="0"><node class="androidx.recyclerview.widget.RecyclerView" '
+            f'bounds="[0,0][1080,2400]">{items}</node></hierarchy>')
+
+
+def test_clustering_alone_does_not_count_rows_as_explored():
+    explored = {}
+    for _ in range(3):
+        clusters = find_clusters(list_screen(), sample_size=2, explored=explored, screen="a")
+    assert explored == {}
+    assert len(clusters) == 1 and len(clusters[0]["representatives"]) == 2
+
+
+def test_operated_rows_are_counted_once_per_row():
+    explored = {}
+    clusters = find_clusters(list_screen(), sample_size=2, explored=explored, screen="a")
+    first, second = clusters[0]["representatives"]
+    assert mark_operated(clusters, (20, first[1] + 20, 800, first[1] + 170), explored) is clusters[0]
+    assert mark_operated(clusters, first, explored) is clusters[0]
+    assert explored == {clusters[0]["key"]: 1}
+    assert mark_operated(clusters, (0, 5000, 10, 5010), explored) is None
+    mark_operated(clusters, second, explored)
+    # 滑动后的新快照中同类行全部视为已覆盖
+    after_scroll = find_clusters(list_screen(), sample_size=2, explored=explored, screen="a")
+    assert after_scroll[0]["representatives"] == []
+    assert covered_mask([(20, 20, 800, 170)], after_scroll).tolist() == [True]
+
+
+def test_explored_count_is_per_screen():
+    explored = {}
+    settings = find_clusters(list_screen(title="setting"), sample_size=1, explored=explored, screen="settings")
+    mark_operated(settings, settings[0]["representatives"][0], explored)
+    # 另一个页面上结构相同的列表仍需探索自己的代表行
+    contacts = find_clusters(list_screen(title="contact"), sample_size=1, explored=explored, screen="contacts")
+    assert contacts[0]["template"] == settings[0]["template"]
+    assert len(contacts[0]["representatives"]) == 1
+    again = find_clusters(list_screen(title="setting"), sample_size=1, explored=explored, screen="settings")
+    assert again[0]["representatives"] == []
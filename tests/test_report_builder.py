@@ -0,0 +1,76 @@
+import json
+import os
+
+from reports.report_builder import build_report
+
+
+def write_events(run_dir, events):
+    with open(os.path.join(run_dir, "events.jsonl"), "w", encoding="utf-8") as f:
+        for event in events:
+            f.write(json.dumps(event) + "\n")
+
+
+def replay_events(run_dir):
+    events = [{"ts": 100.0, "type": "level", "depth": 1}]
+    for i in range(3):
+        events.append({"ts": 101.0 + i, "type": "snapshot", "window_hash": f"w{i % 2}",
+                       "screenshot": os.path.join(run_dir, f"shot_{i}.png")})
+        events.append({"ts": 101.5 + i, "type": "action", "op": "click",
+                       "element": {"class": "Button", "rid": f"id/b{i}", "text": "OK"}})
+    events.append({"ts": 105.0, "type": "recovery"})
+    events.append({"ts": 106.0, "type": "error", "message": "boom"})
+    events.append({"ts": 106.5, "type": "debug_only", "level": 10})
+    return events
+
+
+def test_replay_writes_index_pages_and_counts(tmp_path):
+    run_dir = str(tmp_path)
+    write_events(run_dir, replay_events(run_dir))
+    with open(os.path.join(run_dir, "anomalies.jsonl"), "w", encoding="utf-8") as f:
+        f.write(json.dumps({"captured_at": 107.0, "screenshot": os.path.join(run_dir, "shot_2.png"), "flags": [{"type": "blank"}]}) + "\n")
+
+    builder = build_report(run_dir, page_size=4)
+    report_dir = tmp_path / "report"
+
+    summary = json.loads((report_dir / "summary.json").read_text(encoding="utf-8"))
+    assert summary["snapshots"] == 3
+    assert summary["screens"] == 2
+    assert summary["actions"] == 3
+    assert summary["elements"] == 3
+    assert summary["operations"] == {"click": 3}
+    assert summary["recoveries"] == 1
+    assert summary["errors"] == 1
+    assert summary["anomalies"] == {"blank": 1}
+    assert summary["duration_seconds"] == 6.5
+    assert summary["seconds_per_depth"] == {"1": 6.5}
+    assert summary["finished"] is True
+
+    # 3快照+3动作+恢复+错误+异常 = 9 条记录，每页4条共3页；level与DEBUG事件不进分页
+    assert summary["pages"] == builder.page_number == 3
+    lines = [len((report_dir / f"page_{n:04d}.jsonl").read_text(encoding="utf-8").splitlines()) for n in (1, 2, 3)]
+    assert lines == [4, 4, 1]
+
+    index = (report_dir / "index.html").read_text(encoding="utf-8")
+    assert "refresh" not in index
+    for number in (1, 2, 3):
+        assert f'page_{number:04d}.html' in index
+
+    first = (report_dir / "page_0001.html").read_text(encoding="utf-8")
+    middle = (report_dir / "page_0002.html").read_text(encoding="utf-8")
+    last = (report_dir / "page_0003.html").read_text(encoding="utf-8")
+    assert "page_0002.html" in first and "上一页" not in first
+    assert "page_0001.html" in middle and "page_0003.html" in middle
+    assert "page_0002.html" in last and "下一页" not in last
+    assert 'src="../shot_0.png"' in first
+
+
+def test_full_last_page_has_no_next_link(tmp_path):
+    run_dir = str(tmp_path)
+    write_events(run_dir, [{"ts": 1.0 + i, "type": "action", "op": "click"} for i in range(4)])
+
+    builder = build_report(run_dir, page_size=2)
+
+    assert builder.page_number == 2
+    assert not (tmp_path / "report" / "page_0003.html").exists()
+    assert "下一页" not in (tmp_path / "report" / "page_0002.html").read_text(encoding="utf-8")
+    assert "page_0002.html" in (tmp_path / "report" / "page_0001.html").read_text(encoding="utf-8")
@@ -0,0 +1,89 @@
+import cv2
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("clip")
+from MobileAgent.text_grounding import ground_text, match_hierarchy, opaque_regions
+from MobileAgent.hierarchy import parse_hierarchy
+
+W, H = 1080, 2400
+
+
+def node(cls, bounds, text="", desc=""):
+    return f'<node class="{cls}" text="{text}" content-desc="{desc}" bounds="{bounds}" />'
+
+
+def hierarchy(*nodes):
+    return ('<hierarchy rotation="0"><node class="android.widget.FrameLayout" bounds="[0,0][1080,2400]">'
+            + "".join(nodes) + '</node></hierarchy>')
+
+
+SETTINGS = hierarchy(node("android.widget.TextView", "[0,0][1080,300]", "Network"),
+                     node("android.widget.TextView", "[40,320][400,380]", "Network"),
+                     node("android.widget.TextView", "[40,400][400,480]", "Wi-Fi"),
+                     node("android.widget.TextView", "[40,500][600,580]", "Bluetooth device"))
+WEB = hierarchy(node("android.widget.TextView", "[40,100][400,180]", "Terms"),
+                node("android.webkit.WebView", "[0,1200][1080,2400]"))
+
+
+class FakeOCR:
+    """检测返回相对输入图的一个文字框，识别返回固定文字，并记录检测输入的尺寸"""
+    def __init__(self, text="Accept"):
+        self.text = text
+        self.inputs = []
+
+    def detect(self, image):
+        self.inputs.append(image.shape[:2])
+        return {"polygons": np.array([[10, 10, 200, 10, 200, 60, 10, 60]], dtype=np.float32)}
+
+    def recognize(self, crops):
+        return [{"text": [self.text]} for _ in crops]
+
+
+@pytest.fixture
+def screenshot(tmp_path):
+    path = str(tmp_path / "screen.png")
+    cv2.imwrite(path, np.full((H, W, 3), 255, dtype=np.uint8))
+    return path
+
+
+def expected(box):
+    return ([max(0, box[0] - 10), max(0, box[1] - 10), min(box[2] + 10, W), min(box[3] + 10, H)],
+            [max(0, box[0] - 300), max(0, box[1] - 400), min(box[2] + 300, W), min(box[3] + 400, H)])
+
+
+def test_exact_hierarchy_hit_skips_ocr(screenshot):
+    engine = FakeOCR()
+    text_data, coordinate = ground_text("Wi-Fi", SETTINGS, screenshot, engine.detect, engine.recognize, W, H)
+    assert (text_data[0], coordinate[0]) == expected((40, 400, 400, 480))
+    # 大块文字节点同样精确命中
+    text_data, _ = ground_text("Network", SETTINGS, screenshot, engine.detect, engine.recognize, W, H)
+    assert text_data == [expected((0, 0, 1080, 300))[0], expected((40, 320, 400, 380))[0]]
+    assert engine.inputs == []
+
+
+def test_fuzzy_hierarchy_hit(screenshot):
+    engine = FakeOCR()
+    text_data, _ = ground_text("Bluetooth devices", SETTINGS, screenshot, engine.detect, engine.recognize, W, H)
+    assert text_data == [expected((40, 500, 600, 580))[0]]
+    assert engine.inputs == []
+
+
+def test_opaque_region_is_ocrd_and_mapped_back(screenshot):
+    nodes = parse_hierarchy(WEB)
+    assert opaque_regions(nodes, W, H) == [[0, 1200, 1080, 2400]]
+    assert match_hierarchy("Accept", nodes, W, H, W, H) == ([], [])
+    engine = FakeOCR()
+    text_data, coordinate = ground_text("Accept", WEB, screenshot, engine.detect, engine.recognize, W, H)
+    # 只检测WebView区域，检测框加上区域偏移
+    assert engine.inputs == [(1200, 1080)]
+    assert (text_data[0], coordinate[0]) == expected((10, 1210, 200, 1260))
+
+
+@pytest.mark.parametrize("tree", [None, "", "<hierarchy", SETTINGS])
+def test_full_screen_ocr_without_tree_or_match(screenshot, tree):
+    engine = FakeOCR("Accept")
+    text_data, _ = ground_text("Accept", tree, screenshot, engine.detect, engine.recognize, W, H)
+    assert engine.inputs == [(H, W)]
+    assert text_data == [expected((10, 10, 200, 60))[0]]
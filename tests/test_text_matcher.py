@@ -0,0 +1,67 @@
+import random
+
+from rapidfuzz.distance import LCSseq
+
+from libs.MobileAgent.text_matcher import best_match
+
+
+def reference_lcs(str1, str2):
+    """user-029 之前 text_localization 中的实现"""
+    m, n = len(str1), len(str2)
+    dp = [[0] * (n + 1) for _ in range(m + 1)]
+    for i in range(1, m + 1):
+        for j in range(1, n + 1):
+            if str1[i - 1] == str2[j - 1]:
+                dp[i][j] = dp[i - 1][j - 1] + 1
+            else:
+                dp[i][j] = max(dp[i - 1][j], dp[i][j - 1])
+    return dp[m][n]
+
+
+def reference_best_match(prompt, texts):
+    """user-029 之前 ocr() 中的逐个比较与按长度分段的阈值，返回选中的下标或-1"""
+    max_length, chosen = 0, -1
+    for index, result in enumerate(texts):
+        if len(result) < 0.3 * len(prompt):
+            continue
+        now_length = len(result) if result in prompt else reference_lcs(result, prompt)
+        if now_length > max_length:
+            max_length, chosen = now_length, index
+    if len(prompt) <= 10:
+        ratio = 0.8
+    elif len(prompt) <= 20:
+        ratio = 0.5
+    else:
+        ratio = 0.4
+    return chosen if max_length >= ratio * len(prompt) else -1
+
+
+def random_texts(rng, alphabet, count):
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 25))) for _ in range(count)]
+
+
+def test_best_match_matches_reference_on_fixed_inputs():
+    rng = random.Random(29)
+    alphabet = "abcde设置网络蓝牙 "
+    cases = [
+        ("设置", ["设", "设置", "系统设置", "网络"]),
+        ("Bluetooth", ["Bluetoot", "Bluetooth", "Blue tooth", "WLAN"]),
+        ("Network & internet", ["Network", "internet", "Network & Internet", "Apps"]),
+        ("Connected devices and accessibility options", ["Connected devices", "accessibility", "options"]),
+        ("abc", []),
+        ("abc", ["", "x", "yz"]),
+    ]
+    for _ in range(300):
+        prompt = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 30)))
+        cases.append((prompt, random_texts(rng, alphabet, rng.randint(0, 12)) + [prompt[:rng.randint(0, len(prompt))]]))
+    for prompt, texts in cases:
+        index, _ = best_match(prompt, texts)
+        assert index == reference_best_match(prompt, texts), (prompt, texts)
+
+
+def test_lcs_similarity_matches_reference():
+    # text_localization.longest_common_substring_length 委托给 LCSseq.similarity
+    rng = random.Random(7)
+    for _ in range(200):
+        a, b = random_texts(rng, "abc设置", 2)
+        assert LCSseq.similarity(a, b) == reference_lcs(a, b)
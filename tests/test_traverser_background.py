@@ -0,0 +1,94 @@
+import os
+import time
+
+from conftest import FakeDevice
+from test_hierarchy_diff import MAIN, settings_page
+
+
+class RecordingAnalyzer:
+    def __init__(self):
+        self.submitted, self.discarded = [], []
+
+    def submit(self, screenshot_path, hierarchy_path=None, action=None, seq=None, after_input=True):
+        self.submitted.append(seq)
+
+    def discard(self, seq):
+        self.discarded.append(seq)
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def record_errors(traverser):
+    errors = []
+    traverser.events.error = lambda **fields: errors.append(fields)
+    return errors
+
+
+def test_failed_background_write_is_logged_and_not_analyzed(make_traverser, tmp_path):
+    traverser = make_traverser(FakeDevice(MAIN))
+    errors = record_errors(traverser)
+    traverser.anomaly_analyzer = analyzer = RecordingAnalyzer()
+    traverser.dump_current_state("ok")
+    traverser.output_dir = str(tmp_path / "missing")
+    traverser.dump_current_state("broken")
+    assert wait_for(lambda: len(analyzer.submitted) + len(analyzer.discarded) == 2)
+    assert analyzer.submitted == [1] and analyzer.discarded == [2]
+    assert [error["stage"] for error in errors] == ["write_artifacts"]
+
+
+def test_failed_label_drawing_is_logged(make_traverser):
+    traverser = make_traverser(FakeDevice(MAIN))
+    errors = record_errors(traverser)
+    traverser.xpath_all = lambda query, hierarchy: []
+
+    def draw(*args):
+        raise OSError("disk full")
+    traverser.draw_bbox_multi = draw
+    assert traverser.get_all_interactable_elements() == []
+    assert wait_for(lambda: errors)
+    assert errors == [{"stage": "draw_labels", "message": "disk full"}]
+    assert traverser.last_capture == (traverser.d.app_current(), MAIN, traverser.d.image)
+
+
+def test_state_after_in_place_action_is_reused_for_the_next_element(make_traverser, monkeypatch):
+    monkeypatch.setattr("time.sleep", lambda seconds: None)
+    device = FakeDevice(MAIN, activity=".SubSettings")
+    dumps = []
+    dump = device.dump_hierarchy
+    device.dump_hierarchy = lambda: dumps.append(1) or dump()
+    traverser = make_traverser(device)
+    traverser.handle_current_level = lambda depth: None
+    row = {"left": 0, "top": 0, "right": 1080, "bottom": 190}
+    element = type("Element", (), {"info": {"bounds": row, "resourceId": "", "text": "",
+                                            "className": "android.widget.LinearLayout"}})()
+
+    def toggle(element):
+        device.hierarchy = settings_page([f"Network {i}" for i in range(10)], checked="true")
+        return "click"
+    traverser.operate_element_based_on_type = toggle
+    before = (device.app_current(), MAIN, device.image)
+    after = traverser.operate_with_recovery(element, 1, 0, before=before)
+    # 已读取的操作前状态不再重新读取，只读取一次操作后的UI树
+    assert len(dumps) == 1
+    assert after == (device.app_current(), device.hierarchy, device.image)
+
+    def open_page(element):
+        device.hierarchy, device.app = settings_page([f"Option {i}" for i in range(10)]), {"package": "com.example", "activity": ".Detail"}
+        return "click"
+    traverser.operate_element_based_on_type = open_page
+    assert traverser.operate_with_recovery(element, 1, 0, before=after) is None
+
+
+def test_snapshots_in_the_same_second_get_distinct_files(make_traverser, monkeypatch):
+    monkeypatch.setattr("time.time", lambda: 1700000000.0)
+    traverser = make_traverser(FakeDevice(MAIN))
+    first = traverser.dump_current_state("page")
+    second = traverser.dump_current_state("page")
+    tree = traverser.save_ui_tree("page")
+    assert len({*first, *second, tree}) == 5
+    assert wait_for(lambda: all(os.path.exists(path) for path in (*first, *second)))
@@ -0,0 +1,152 @@
+import numpy as np
+from PIL import Image
+
+from conftest import FakeDevice
+from libs.MobileAgent.device_metadata import DeviceMetadata
+from test_device_metadata import APPS, MetaDevice
+
+WEBVIEW = ('<hierarchy rotation="0"><node index="0" class="android.webkit.WebView" package="com.example" '
+           'text="" resource-id="" content-desc="" bounds="[0,0][1080,2400]" /></hierarchy>')
+SETTINGS = ('<hierarchy rotation="0">' + "".join(
+    f'<node index="{i}" class="android.widget.TextView" package="com.example" text="item {i}" '
+    f'resource-id="com.example:id/title" content-desc="" bounds="[0,{i * 100}][1080,{i * 100 + 90}]" />'
+    for i in range(5)) + '</hierarchy>')
+
+
+def canvas(seed, noise=0):
+    rng = np.random.default_rng(seed)
+    blocks = rng.integers(0, 256, (12, 6, 3), dtype=np.uint8)
+    image = np.kron(blocks, np.ones((200, 180, 1), dtype=np.uint8))
+    if noise:
+        image = np.clip(image.astype(int) + rng.integers(-noise, noise + 1, image.shape), 0, 255).astype(np.uint8)
+    return Image.fromarray(image)
+
+
+def test_webview_screens_match_within_hamming_distance(make_traverser):
+    traverser = make_traverser(FakeDevice(WEBVIEW))
+    assert not traverser.is_screen_visited(WEBVIEW, canvas(1))
+    traverser.get_window_hash(canvas(1), WEBVIEW)
+    # 同一画面的轻微像素差异(动画、光标)仍视为已访问，不同画面不受影响
+    assert traverser.is_screen_visited(WEBVIEW, canvas(1, noise=8))
+    assert not traverser.is_screen_visited(WEBVIEW, canvas(2))
+
+
+def test_informative_screens_use_the_hierarchy(make_traverser):
+    traverser = make_traverser(FakeDevice(SETTINGS))
+    traverser.get_window_hash(canvas(1), SETTINGS)
+    assert traverser.is_screen_visited(SETTINGS, canvas(2))
+    assert not traverser.is_screen_visited(SETTINGS.replace("item 4", "item 5"), canvas(1))
+
+
+def test_action_reaching_a_visited_screen_is_not_explored_again(make_traverser, monkeypatch):
+    monkeypatch.setattr("time.sleep", lambda seconds: None)
+    device = FakeDevice(SETTINGS)
+    traverser = make_traverser(device)
+    traverser.get_window_hash(device.image, SETTINGS)
+    recursed, resets = [], []
+    traverser.handle_current_level = recursed.append
+    traverser.reset_to_before_window = lambda window, swipes: resets.append(window)
+
+    def operate(element):
+        # 操作后进入的 WebView 页面已经访问过
+        device.hierarchy, device.app = WEBVIEW, {"package": "com.example", "activity": ".Web"}
+        device.image = canvas(3)
+        return "click"
+    traverser.operate_element_based_on_type = operate
+    traverser.get_window_hash(canvas(3), WEBVIEW)
+
+    element = type("Element", (), {"info": {"bounds": {"left": 0, "top": 0, "right": 100, "bottom": 90},
+                                            "resourceId": "com.example:id/title", "text": "item 0",
+                                            "className": "android.widget.TextView"}})()
+    traverser.operate_with_recovery(element, 1, 0)
+    assert recursed == []
+    assert resets == ["com.example/.Main"]
+
+
+def test_list_rows_are_counted_per_screen_after_operation(make_traverser, monkeypatch):
+    from test_list_clustering import list_screen
+
+    monkeypatch.setattr("time.sleep", lambda seconds: None)
+    device = FakeDevice(list_screen(title="setting"), activity=".Settings")
+    traverser = make_traverser(device, cluster_sample_size=1)
+    traverser.handle_current_level = lambda depth: None
+    traverser.last_hierarchy = device.hierarchy
+    traverser.update_list_clusters(".Settings")
+    clusters = traverser.list_clusters
+    assert len(clusters[0]["representatives"]) == 1 and traverser.cluster_explored == {}
+
+    row = clusters[0]["representatives"][0]
+    element = type("Element", (), {"info": {"bounds": {"left": 20, "top": row[1] + 20, "right": 800, "bottom": row[1] + 170},
+                                            "resourceId": "com.example:id/title", "text": "setting 0",
+                                            "className": "android.widget.TextView"}})()
+
+    def operate(element):
+        device.hierarchy, device.app = SETTINGS, {"package": "com.example", "activity": ".Detail"}
+        return "click"
+    traverser.operate_element_based_on_type = operate
+    traverser.operate_with_recovery(element, 1, 0, clusters)
+    assert traverser.cluster_explored == {clusters[0]["key"]: 1}
+
+    # 同一页面滑动后不再有代表行，另一个页面上结构相同的列表单独计数
+    traverser.update_list_clusters(".Settings")
+    assert traverser.list_clusters[0]["representatives"] == []
+    traverser.last_hierarchy = list_screen(title="contact")
+    traverser.update_list_clusters(".Contacts")
+    assert len(traverser.list_clusters[0]["representatives"]) == 1
+
+
+def test_structurally_identical_sub_page_is_explored(make_traverser, monkeypatch):
+    from test_hierarchy_diff import MAIN, settings_page
+
+    monkeypatch.setattr("time.sleep", lambda seconds: None)
+    device = FakeDevice(MAIN, activity=".SubSettings")
+    traverser = make_traverser(device)
+    recursed = []
+    traverser.handle_current_level = recursed.append
+
+    def operate(element):
+        # 同一activity内打开的子页面，布局与原页面相同
+        device.hierarchy = settings_page([f"Wi-Fi option {i}" for i in range(10)])
+        return "click"
+    traverser.operate_element_based_on_type = operate
+    element = type("Element", (), {"info": {"bounds": {"left": 0, "top": 0, "right": 1080, "bottom": 190},
+                                            "resourceId": "", "text": "", "className": "android.widget.LinearLayout"}})()
+    traverser.operate_with_recovery(element, 1, 0)
+    assert recursed == [2]
+
+
+def test_snapshot_table_drives_occlusion_and_point_lookup(make_traverser):
+    from test_element_table import OVERLAY
+
+    traverser = make_traverser(FakeDevice(OVERLAY))
+    traverser.xpath_all = lambda query, hierarchy: []
+    traverser.get_all_interactable_elements()
+    assert traverser.element_at(500, 1300) == 5
+    assert traverser.element_at(500, 1300, clickable_only=True) == 5
+    assert traverser.element_at(500, 200, clickable_only=True) == 1
+
+    def element(bounds):
+        left, top, right, bottom = bounds
+        return type("Element", (), {"info": {"resourceId": "", "text": "", "className": "android.widget.TextView",
+                                             "bounds": {"left": left, "top": top, "right": right, "bottom": bottom}}})()
+    wifi, bluetooth = element((0, 100, 1080, 300)), element((0, 1200, 1080, 1400))
+    # 被悬浮按钮遮挡的元素不再探索
+    assert traverser.filter_elements([wifi, bluetooth]) == [wifi]
+
+
+def test_start_app_reindexes_when_the_cached_package_is_gone(make_traverser):
+    installed = MetaDevice(APPS)
+    traverser = make_traverser(FakeDevice(SETTINGS))
+    traverser.device_meta = DeviceMetadata(installed)
+    assert traverser.device_meta.find_package("Maps") == "com.example.maps"
+    installed.apps = [app for app in APPS if app["name"] != "Maps"] + [{"package": "com.other.maps", "name": "Maps"}]
+
+    def app_start(package, *args):
+        if package == "com.example.maps":
+            raise RuntimeError("package not installed")
+        traverser.d.calls.append(("app_start", package))
+    traverser.d.app_start = app_start
+
+    assert traverser.start_app("Maps")
+    assert traverser.d.calls[-1] == ("app_start", "com.other.maps")
+    assert not traverser.start_app("Calendar Pro")
@@ -0,0 +1,61 @@
+import os
+
+import cv2
+import numpy as np
+
+from MobileAgent.vision_cache import MEMORY_ONLY, VisionCache
+
+
+class FakeModel:
+    def __init__(self, model_dir=None):
+        if model_dir:
+            self.model_dir = model_dir
+
+
+def clock_screen(text):
+    image = np.full((200, 400, 3), 255, dtype=np.uint8)
+    cv2.putText(image, text, (20, 100), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 1)
+    return image
+
+
+def test_screens_differing_only_in_text_get_different_keys():
+    cache = VisionCache()
+    assert cache.image_key(clock_screen("12:01")) != cache.image_key(clock_screen("12:07"))
+    assert cache.image_key(clock_screen("12:01")) == cache.image_key(clock_screen("12:01"))
+
+
+def test_weights_change_invalidates_disk_entries(tmp_path):
+    weights = tmp_path / "weights"
+    weights.mkdir()
+    (weights / "model.bin").write_bytes(b"v1")
+    cache_dir = str(tmp_path / "cache")
+    cache = VisionCache(cache_dir)
+    image_key = cache.image_key(clock_screen("1"))
+
+    key = cache.make_key("det", FakeModel(str(weights)), image_key, ())
+    cache.put(key, "v1 result")
+    assert VisionCache(cache_dir).get(key) == "v1 result"
+
+    (weights / "model.bin").write_bytes(b"v2 weights")
+    os.utime(weights / "model.bin", ns=(1, 1))
+    new_key = cache.make_key("det", FakeModel(str(weights)), image_key, ())
+    assert new_key != key
+    assert VisionCache(cache_dir).get(new_key) is None
+
+
+def test_models_without_weights_are_memory_only(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache = VisionCache(str(cache_dir))
+    model = FakeModel()
+    key = cache.make_key("clip", (model, FakeModel(str(tmp_path))), "image", "prompt")
+    assert key.startswith(MEMORY_ONLY)
+    cache.put(key, 1)
+    assert cache.get(key) == 1
+    assert not os.listdir(cache_dir)
+
+
+def test_corrupt_disk_entry_is_a_miss(tmp_path):
+    cache = VisionCache(str(tmp_path))
+    (tmp_path / "deadbeef.pkl").write_bytes(b"\x80\x05garbage")
+    assert cache.get("deadbeef") is None
+    assert cache.stats()["misses"] == 1
@@ -0,0 +1,49 @@
+import os
+import stat
+import threading
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("clip")
+from MobileAgent import vision_server
+from MobileAgent.vision_server import AUTHKEY_ENV, MicroBatcher, create_authkey, read_authkey
+
+
+def test_authkey_is_random_and_private(tmp_path, monkeypatch):
+    monkeypatch.delenv(AUTHKEY_ENV, raising=False)
+    path = str(tmp_path / "keys" / "vision_authkey")
+    with pytest.raises(RuntimeError):
+        read_authkey(path)
+    first = create_authkey(path)
+    assert read_authkey(path) == first
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert create_authkey(path) != first
+    monkeypatch.setenv(AUTHKEY_ENV, "from-env")
+    assert create_authkey(path) == read_authkey(path) == b"from-env"
+    assert not hasattr(vision_server, "DEFAULT_AUTHKEY")
+
+
+def test_bad_request_does_not_fail_the_batch():
+    release = threading.Event()
+
+    def handler(requests):
+        release.wait(5)
+        if any(request["value"] is None for request in requests):
+            raise ValueError("bad request")
+        return [request["value"] * 2 for request in requests]
+
+    batcher = MicroBatcher(handler, max_batch=8, max_wait=0.2)
+    futures = [batcher.submit({"value": value}) for value in (1, None, 3)]
+    release.set()
+    assert futures[0].result(5) == 2
+    assert futures[2].result(5) == 6
+    with pytest.raises(ValueError):
+        futures[1].result(5)
+
+
+def test_handler_can_return_per_request_errors():
+    batcher = MicroBatcher(lambda requests: [ValueError("x") if r["bad"] else "ok" for r in requests], max_wait=0.1)
+    good, bad = batcher.submit({"bad": False}), batcher.submit({"bad": True})
+    assert good.result(5) == "ok"
+    assert isinstance(bad.exception(5), ValueError)